@@ -1,75 +1,189 @@
 """
 This script connects to a MongoDB database, retrieves data, performs some transformations on it, and saves the transformed data to a CSV file. 
 
-The script first connects to a MongoDB database using the MONGO_URI and MONGO_DATABASE environment variables. It then retrieves data from the 'scrapy_bogota_apartments' collection and stores it in a pandas DataFrame. 
+The script first connects to a MongoDB database using the MONGO_URI and MONGO_DATABASE environment variables. It then reads the raw collection with a batched, projected cursor in chunks of ETL_CHUNK_SIZE documents (5000 by default), so memory stays bounded as the collection grows.
 
-The script then performs two transformations on the data. First, it explodes the 'imagenes' column and saves the resulting DataFrame to a CSV file. Second, it extracts several features from the 'featured_interior', 'featured_zona_comun', 'featured_exterior', and 'featured_sector' columns and saves the resulting DataFrame to a CSV file.
+The script then performs two transformations on each chunk. First, it streams the 'imagenes' column into the images Parquet file (one row group per chunk, see src/images.py). Second, it extracts several features from the 'caracteristicas' column and appends the result to the apartments Feather file, typed with the schema of src/interchange.py.
 
-The resulting CSV files are saved in the 'data/processed' and 'data/interim' directories, respectively.
+The resulting images and apartments files are saved in the 'data/processed' and 'data/interim' directories, respectively. With ETL_EXPORT_CSV=1 the images are also exported to 'data/processed/images.csv' for the public release.
+
+The complete amenity vocabulary of both portals is also encoded, chunk by chunk, as a sparse matrix saved to 'data/processed/amenities.npz' with its vocabulary in 'data/processed/amenities_vocabulary.csv' (see src/amenities.py).
+
+With ETL_INCREMENTAL=1 only the listings seen since the last run's watermark whose content hash changed are transformed; the images of those listings are merged into the existing images file (see src/incremental.py).
+
+The transformation is the `transform_apartments` function, which streams the chunks to the apartments Feather file; `initial_transformations` reads that file back, memory-mapped, so the in-process pipeline (data_pipeline.py) can pass the apartments to the next stage. Running this file only streams the collection of the environment variables to the files.
 
 The script requires the following packages to be installed: src, dotenv, logging, pandas, pymongo, os.
 """
-from src import extract_features
+from src import amenities, extract_features, images, incremental, interchange, mongo_reader, project
 from dotenv import load_dotenv
 import logging
 import pandas as pd
 import pymongo
 import os
 
-load_dotenv()
-
-filename = f'logs/01_initial_transformations.log'
-
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
-
-# verificar si etoy dentro de la carpeta notebooks o no
-if os.getcwd().split('/')[-1] == 'ETL':
-    os.chdir('..')
-
-# Connect to MongoDB
-logging.info('Connecting to MongoDB')
-
-try:
-    client = pymongo.MongoClient(os.getenv('MONGO_URI'))
-    db = client[os.getenv('MONGO_DATABASE')]
-    collection = db[os.getenv('MONGO_COLLECTION_RAW')]
-    logging.info('Connected to MongoDB')
-
-except pymongo.errors.ConnectionFailure as error:
-    logging.error(error)
-    exit(1)
-
-# Get data from MongoDB
-df = pd.DataFrame(list(collection.find()))
-df = df.drop(columns=['_id'], axis=1)
-
-# Transformations
-logging.info('Transforming data (explode images)')
-images_explode = df.explode('imagenes')
-images_explode = images_explode.dropna(subset=['imagenes'])
-
-images_df = images_explode[['codigo', 'imagenes']].rename(columns={'imagenes': 'url_imagen'})
-images_df.to_csv('data/processed/images.csv', index=False)
-logging.info(f'Images saved, shape: {images_df.shape}')
-
-df = df.drop(columns=['imagenes'], axis=1)
-
-logging.info('Transforming data (extract features)')
-df['jacuzzi'] = df.caracteristicas.apply(extract_features.check_jacuzzi)
-df['piso'] = df.caracteristicas.apply(extract_features.extract_piso)
-df['closets'] = df.caracteristicas.apply(extract_features.extract_closets)
-df['chimenea'] = df.caracteristicas.apply(extract_features.check_chimeny)
-df['permite_mascotas'] = df.caracteristicas.apply(extract_features.check_mascotas)
-df['gimnasio'] = df.caracteristicas.apply(extract_features.check_gimnasio)
-df['ascensor'] = df.caracteristicas.apply(extract_features.check_ascensor)
-df['conjunto_cerrado'] = df.caracteristicas.apply(extract_features.check_conjunto_cerrado)
-df['piscina'] = df.caracteristicas.apply(extract_features.check_piscina)
-df['salon_comunal'] = df.caracteristicas.apply(extract_features.check_salon_comunal)
-df['terraza'] = df.caracteristicas.apply(extract_features.check_terraza)
-df['vigilancia'] = df.caracteristicas.apply(extract_features.check_vigilancia)
-
-
-df = df.drop(columns=['caracteristicas'], axis=1)
-
-df.to_csv('data/interim/apartments.csv', index=False)
-logging.info(f'Data saved, shape: {df.shape}')
\ No newline at end of file
+CHUNK_SIZE = 5000 # documentos por chunk si no se define ETL_CHUNK_SIZE
+IMAGES_DELTA_PATH = 'data/interim/images_delta.parquet'
+
+def transform_features(df):
+    """
+    Extracts the amenity features of a chunk from its 'caracteristicas' column.
+
+    Args:
+    - df (pd.DataFrame): The chunk.
+
+    Returns:
+    - pd.DataFrame: The chunk without 'imagenes' and 'caracteristicas' and with one column per feature.
+    """
+    df = df.drop(columns=['imagenes'])
+
+    features = extract_features.extract_all_features(df['caracteristicas'])
+    return pd.concat([df.drop(columns=['caracteristicas']), features], axis=1)
+
+def select_changed(chunk, hashes):
+    """
+    Keeps the rows of a chunk whose content hash differs from the one of the last incremental run.
+
+    Args:
+    - chunk (pd.DataFrame): The chunk.
+    - hashes (dict): The content hash of every known listing, updated in place.
+
+    Returns:
+    - pd.DataFrame: The new or modified listings.
+    """
+    codigos = chunk['codigo'].astype(str)
+    chunk_hashes = [incremental.content_hash(record) for record in chunk.to_dict('records')]
+    changed = [hashes.get(codigo) != digest for codigo, digest in zip(codigos, chunk_hashes)]
+    hashes.update((codigo, digest) for codigo, digest, is_changed in zip(codigos, chunk_hashes, changed) if is_changed)
+    return chunk.loc[changed]
+
+def get_chunk_size() -> int:
+    """
+    Returns the number of documents per chunk, the ETL_CHUNK_SIZE environment variable or CHUNK_SIZE.
+    """
+    return int(os.getenv('ETL_CHUNK_SIZE', CHUNK_SIZE))
+
+def transform_apartments(collection, chunk_size=None):
+    """
+    Reads the raw collection in chunks and saves the images, the amenity matrix and the apartments with
+    their features. Only one chunk is held in memory at a time.
+
+    Args:
+    - collection (pymongo.collection.Collection): The raw collection.
+    - chunk_size (int): The number of documents per chunk, get_chunk_size() by default.
+
+    Returns:
+    - str: The apartments Feather file.
+    """
+    if chunk_size is None:
+        chunk_size = get_chunk_size()
+
+    # In incremental mode only the listings seen since the watermark are read, and only the
+    # ones whose content changed go on to the next stages
+    incremental_mode = incremental.is_enabled()
+    query = {}
+    images_target = images.IMAGES_PATH
+    vocabulary = {}
+    if incremental_mode:
+        watermark = incremental.read_watermark()
+        query = incremental.watermark_query(watermark)
+        hashes = incremental.load_hashes()
+        new_watermark = None
+        delta = []
+        images_target = IMAGES_DELTA_PATH
+        vocabulary = amenities.read_vocabulary()
+        logging.info(f'Incremental mode, watermark: {watermark}')
+
+    # Get data from MongoDB, chunk by chunk
+    logging.info(f'Transforming data in chunks of {chunk_size} documents (images, features)')
+    images_writer = images.ImagesWriter(images_target)
+    apartments_writer = interchange.FrameWriter(interchange.INTERIM_PATH)
+    amenity_parts = []
+    for chunk in mongo_reader.read_chunks(collection, chunk_size, query):
+        if incremental_mode:
+            seen = pd.to_datetime(pd.concat([chunk['last_view'], chunk['datetime']]), errors='coerce').max()
+            if pd.notna(seen) and (new_watermark is None or seen > new_watermark):
+                new_watermark = seen.to_pydatetime()
+
+            chunk = select_changed(chunk, hashes)
+            delta += list(chunk['codigo'].astype(str))
+            if chunk.empty:
+                continue
+
+        images_writer.write(chunk['codigo'], chunk['imagenes'])
+
+        amenity_parts.append(amenities.encode(chunk['codigo'], chunk['caracteristicas'], vocabulary))
+
+        df = transform_features(chunk)
+        apartments_writer.write(df)
+
+        logging.info(f'{apartments_writer.rows} apartments transformed so far')
+
+    empty = transform_features(mongo_reader.to_frame([]))
+    images_writer.close()
+    apartments_writer.close(list(empty.columns))
+
+    amenity_rows = amenities.concat(amenity_parts)
+    if incremental_mode:
+        existing_rows = amenities.drop_rows(amenities.read_rows(), set(delta))
+        amenity_rows = amenities.concat([existing_rows, amenity_rows])
+    amenities.save(amenity_rows, vocabulary)
+    logging.info(f'Amenity matrix saved, rows: {len(amenity_rows["codigo"])}, terms: {len(vocabulary)}')
+
+    if incremental_mode:
+        images.merge_images(images.IMAGES_PATH, IMAGES_DELTA_PATH, set(delta))
+        incremental.save_pending(new_watermark, hashes, delta)
+        logging.info(f'Incremental delta: {len(delta)} new or modified apartments')
+
+    if interchange.is_csv_export_enabled():
+        images.export_csv()
+        logging.info(f'Images exported to {images.IMAGES_CSV_PATH}')
+
+    logging.info(f'Images saved, rows: {images_writer.rows}')
+    logging.info(f'Data saved, rows: {apartments_writer.rows}')
+
+    return interchange.INTERIM_PATH
+
+def initial_transformations(collection, chunk_size=None):
+    """
+    Transforms the raw collection (see `transform_apartments`) and returns the apartments read back,
+    memory-mapped, from the Feather file.
+
+    Args:
+    - collection (pymongo.collection.Collection): The raw collection.
+    - chunk_size (int): The number of documents per chunk, get_chunk_size() by default.
+
+    Returns:
+    - pd.DataFrame: The transformed apartments, with the dtypes of src/interchange.py.
+    """
+    return interchange.read_frame(transform_apartments(collection, chunk_size))
+
+def main():
+    # Trabajar desde la raiz del proyecto, donde estan los logs, los datos y el paquete bogota_lotes
+    project.use_project_root()
+    load_dotenv()
+
+    filename = f'logs/01_initial_transformations.log'
+
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
+
+    from bogota_lotes.indexes import ensure_indexes
+
+    # Connect to MongoDB
+    logging.info('Connecting to MongoDB')
+
+    try:
+        client = pymongo.MongoClient(os.getenv('MONGO_URI'))
+        db = client[os.getenv('MONGO_DATABASE')]
+        collection = db[os.getenv('MONGO_COLLECTION_RAW')]
+        logging.info('Connected to MongoDB')
+        ensure_indexes(collection)
+
+    except pymongo.errors.ConnectionFailure as error:
+        logging.error(error)
+        exit(1)
+
+    transform_apartments(collection)
+
+if __name__ == '__main__':
+    main()
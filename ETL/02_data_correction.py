@@ -1,103 +1,94 @@
 """
-This script imports data from CSV files, performs data correction and enrichment, and exports the cleaned data to a new CSV file.
-The script first imports apartment data from a CSV file and shapefiles containing information about Bogota's localities and neighborhoods.
+This script imports the interim apartments, performs data correction and enrichment, and exports the cleaned data back to the interim file.
+The script first imports the apartment data and the shapefiles containing information about Bogota's localities and neighborhoods.
 It then performs data correction and enrichment, including adding missing locality and neighborhood information to apartments, removing apartments with invalid locality or neighborhood information, and dropping duplicates.
-Finally, the cleaned data is exported to a new CSV file.
+Finally, the cleaned data is exported to the interim file.
+
+The layers are loaded by `load_zones` and the correction is the `correct_apartments` function, so the in-process pipeline (data_pipeline.py) can share the layers and pass the apartments in memory.
 """
-from src import data_enrichment, data_correction
-from unidecode import unidecode
+from src import data_correction, interchange, layer_cache, project, quality_rules, zone_grid
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
 import pandas as pd
 import geopandas as gpd
 import warnings
-import os
 
 warnings.filterwarnings('ignore')
 
-filename = f'logs/02_data_correction.log'
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
+def load_zones():
+    """
+    Loads the localidades and barrios layers (with the names normalized) from the layer cache, and their
+    zone grid.
+
+    Returns:
+    - dict: The 'localidades', 'barrios' and 'grid' of the zones.
+    """
+    logging.info('Importando datos externos...')
+    # Capas normalizadas, se vuelven a leer de los archivos fuente solo si cambian (ver src/layer_cache.py)
+    localidades = layer_cache.load_layer('localidades')
+    barrios = layer_cache.load_layer('barrios')
 
-# verificar si etoy dentro de la carpeta notebooks o no
-if os.getcwd().split('/')[-1] == 'ETL':
-    logging.info('Cambiando directorio de trabajo')
-    os.chdir('..')
+    # Grilla de localidades y barrios, se reconstruye solo si cambian los archivos (ver src/zone_grid.py)
+    grid = zone_grid.load_grid(localidades, barrios, [layer_cache.LOCALIDADES_PATH, layer_cache.BARRIOS_PATH])
 
-load_dotenv()
+    return {'localidades': localidades, 'barrios': barrios, 'grid': grid}
 
-def normalize_text(text):
+def correct_apartments(apartments, zones):
     """
-    This function takes a string as input and returns a normalized version of the string.
-    The normalization process involves converting any accented characters to their unaccented
-    equivalents and converting the resulting string to uppercase. If an error occurs during
-    the normalization process, the original string is returned.
-    
+    Adds the localidad and barrio of the apartments, corrects their locations, drops the apartments that
+    break the quality rules and the duplicates, and saves them to the interim file.
+
     Args:
-    - text (str): The string to be normalized.
-    
+    - apartments (pd.DataFrame): The apartments of stage 01.
+    - zones (dict): The layers returned by `load_zones`.
+
     Returns:
-    - str: The normalized version of the input string, or the original string if an error occurs.
+    - pd.DataFrame: The corrected apartments.
     """
-    try:
-        return unidecode(text).upper()
-    except:
-        return text
-
-# Importar Datos
-logging.info('Importando datos...')
-apartments = pd.read_csv('data/interim/apartments.csv')
-apartments['coords_modified'] = False # Para saber si se modificó la coordenada original
-
-logging.info('Importando datos externos...')
-localidades = gpd.read_file('data/external/localidades_bogota/loca.shp')
-barrios = gpd.read_file('data/external/barrios_bogota/barrios.geojson')
-
-# Data Corection
-logging.info('Corrigiendo datos... (esto puede tardar un rato)')
-apartments['localidad'] = apartments.apply(data_enrichment.get_localidad, axis=1, localidades=localidades)
-apartments = apartments.dropna(subset=['localidad', 'sector'], how='all')
-apartments.drop(apartments.loc[apartments['estrato'] == 7].index, inplace=True)
-
-# Agregando barrios, segun las coordenadas de los apartamentos
-barrios['barriocomu'] = barrios['barriocomu'].apply(normalize_text)
-barrios['localidad'] = barrios['localidad'].apply(normalize_text)
-barrios.localidad.unique()
-
-barrios.loc[barrios['localidad'] == 'RAFAEL URIBE', 'localidad'] = 'RAFAEL URIBE URIBE'
-barrios.loc[barrios['localidad'].isna(), 'localidad'] = 'SUBA'
-
-apartments['barrio'] = apartments.apply(data_enrichment.get_barrio, axis=1, barrios=barrios)
-
-apartments = apartments.apply(data_correction.correction_ubication, axis=1, barrios=barrios, localidades=localidades)
-
-conditions = {
-    'KENNEDY': [6, 5],
-    'RAFAEL URIBE URIBE': [6, 5],
-    'LA PAZ CENTRAL': [6],
-    'BOSA': [6, 5, 4],
-    'USME': [6, 5, 4, 3],
-    'SAN CRISTOBAL': [6, 5, 4],
-    'CIUDAD BOLIVAR': [6, 5, 4],
-    'FONTIBON': [6],
-    'LOS MARTIRES': [6, 5, 1],
-    'SANTA FE': [6, 5],
-    'TUNJUELITO': [6, 5, 4],
-    'BARRIOS UNIDOS': [1, 2, 6],
-    'TEUSAQUILLO': [1, 2, 6],
-    'ANTONIO NARIÑO': [1, 5, 6],
-    'CANDELARIA': [6, 5, 4],
-}
-
-for loc, estratos in conditions.items():
-    for estrato in estratos:
-        out = apartments.loc[(apartments['localidad'] == loc) & (apartments['estrato'] == estrato)]
-        apartments = apartments.drop(out.index)
-
-
-apartments.dropna(subset=['localidad', 'barrio'], how='all', inplace=True)
-
-
-# del apartments['direccion']
-apartments = apartments.drop_duplicates(subset=['codigo'], keep='first')
-apartments.to_csv('data/interim/apartments.csv', index=False)
\ No newline at end of file
+    apartments = apartments.copy()
+    apartments['coords_modified'] = False # Para saber si se modificó la coordenada original
+
+    # En modo incremental el delta puede estar vacio
+    if apartments.empty:
+        logging.info('No hay apartamentos para corregir')
+        interchange.write_frame(apartments, interchange.INTERIM_PATH)
+        return apartments
+
+    localidades, barrios = zones['localidades'], zones['barrios']
+
+    # Data Corection
+    logging.info('Corrigiendo datos...')
+    # Agregando localidades y barrios, segun las coordenadas de los apartamentos
+    apartments['localidad'], apartments['barrio'] = zone_grid.get_zones(apartments, localidades, barrios, zones['grid'])
+
+    apartments = data_correction.correct_locations(apartments, barrios, localidades)
+
+    # Reglas de calidad (ubicacion, estrato 7, estratos atipicos por localidad), ver src/quality_rules.py
+    apartments = quality_rules.apply_rules(apartments, quality_rules.APARTMENT_RULES)
+
+    # del apartments['direccion']
+    apartments = apartments.drop_duplicates(subset=['codigo'], keep='first')
+    interchange.write_frame(apartments, interchange.INTERIM_PATH)
+    return apartments
+
+def main():
+    # Trabajar desde la raiz del proyecto, a la que son relativas las rutas de los logs y los datos
+    project.use_project_root()
+
+    filename = f'logs/02_data_correction.log'
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
+
+    load_dotenv()
+
+    # Importar Datos
+    logging.info('Importando datos...')
+    apartments = interchange.read_frame(interchange.INTERIM_PATH)
+    if apartments.empty:
+        correct_apartments(apartments, None)
+        return
+
+    correct_apartments(apartments, load_zones())
+
+if __name__ == '__main__':
+    main()
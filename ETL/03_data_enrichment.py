@@ -1,33 +1,16 @@
+"""
+This script enriches the corrected apartments with the nearest TransMilenio station and park, the distances to the nearest stations, SITP bus stops and parks and their counts within several radii, and saves the processed data.
+
+The layers are loaded by `load_transmilenio`, `load_parks` and `load_sitp` and the enrichment is the `enrich_apartments` function, so the in-process pipeline (data_pipeline.py) can load the layers concurrently and pass the apartments in memory.
+"""
+from src import incremental, interchange, layer_cache, nearest, project, proximity, transmilenio
 from dotenv import load_dotenv
 from unidecode import unidecode
 import math
-import pymongo
 import logging
-import requests
 import numpy as np
 import pandas as pd
-import os
-
-if os.getcwd().split('/')[-1] == 'ETL':
-    logging.info('Cambiando directorio de trabajo')
-    os.chdir('..')
-
-load_dotenv()
-
-filename = f'logs/03_data_enrichment.log'
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
 
-# Connect to MongoDB
-logging.info('Connecting to MongoDB')
-try:
-    client = pymongo.MongoClient(os.getenv('MONGO_URI'))
-    db = client[os.getenv('MONGO_DATABASE')]
-    collection = db[os.getenv('MONGO_COLLECTION_PROCESSED')]
-    logging.info('Connected to MongoDB')
-
-except pymongo.errors.ConnectionFailure as error:
-    logging.error(error)
-    exit(1)
 
 def normalize(text):
     """
@@ -76,61 +59,69 @@ def haversine_m(lat1, lon1, lat2, lon2):
     
     return distancia
 
-# Read apartments data
-logging.info('Reading apartments data...')
-apartments = pd.read_csv('data/interim/apartments.csv', low_memory=False)
+def save_processed(apartments):
+    """
+    Saves the processed apartments. In incremental mode the apartments of this run are merged
+    into the existing processed data instead of replacing it. With ETL_EXPORT_CSV=1 the processed
+    data is also exported to CSV for the public release.
 
-# Get TransMilenio stations data
-logging.info('Getting TransMilenio stations data...')
-response = requests.get('https://gis.transmilenio.gov.co/arcgis/rest/services/Troncal/consulta_estaciones_troncales/FeatureServer/0/query?where=1%3D1&outFields=*&outSR=4326&f=json').json()
-troncal_transmilenio = pd.DataFrame(response['features'])
-troncal_transmilenio = pd.json_normalize(troncal_transmilenio['attributes'])
+    Args:
+        apartments (pandas.DataFrame): The processed apartments of this run.
+    """
+    if incremental.is_enabled():
+        merged = incremental.merge_into(interchange.PROCESSED_PATH, apartments, incremental.delta_codigos())
+        logging.info(f'Merged {len(apartments)} apartments into the processed data, total: {len(merged)}')
+    else:
+        merged = apartments
+        interchange.write_frame(apartments, interchange.PROCESSED_PATH)
 
-# Add data about TransMilenio stations
-def estacion_tm_cercana(row):
+    if interchange.is_csv_export_enabled():
+        interchange.export_csv(merged)
+
+def load_transmilenio():
     """
-    Returns the name of the TransMilenio station closest to the given latitude and longitude coordinates.
+    Gets the TransMilenio stations data last fetched from the ArcGIS service or the bundled GeoJSON, or
+    from the service when a refresh is requested (see src/transmilenio.py).
 
-    Args:
-        row (pandas.Series): A pandas Series containing the latitude and longitude coordinates.
+    Returns:
+        pandas.DataFrame: The stations, with 'nombre_estacion', 'latitud_estacion' and 'longitud_estacion' columns.
+    """
+    return transmilenio.load_stations()
+
+def load_parks():
+    """
+    Reads the parks data from the layer cache (see src/layer_cache.py).
 
     Returns:
-        str: The name of the closest TransMilenio station.
+        pandas.DataFrame: The parks.
     """
-    try:
-        distancias = []
-        for i, estacion in troncal_transmilenio.iterrows():
-            distancias.append(haversine_m(row['latitud'], row['longitud'], estacion['latitud_estacion'], estacion['longitud_estacion']))
-        return troncal_transmilenio.loc[np.argmin(distancias), 'nombre_estacion']
-    except Exception as e:
-        print(e)
-        return np.nan
-    
-def get_distancia_estacion_m(row):
+    return layer_cache.load_layer('parques')
+
+def load_sitp():
     """
-    Calculates the distance in meters between a given location (latitude and longitude) and the nearest TransMilenio station.
-    
+    Reads the SITP zonal bus stops from the layer cache (see src/layer_cache.py).
+
+    Returns:
+        pandas.DataFrame: The bus stops.
+    """
+    return layer_cache.load_layer('paraderos_sitp')
+
+# Add data about TransMilenio stations
+def estaciones_tm_cercanas(apartments, troncal_transmilenio):
+    """
+    Returns the closest TransMilenio station of every apartment and the distance to it, in a single pass
+    over a spatial index of the stations (see src/nearest.py).
+
     Args:
-    - row: a pandas Series containing the following fields:
-        - latitud: float, the latitude of the location
-        - longitud: float, the longitude of the location
-        
+        apartments (pandas.DataFrame): The apartments, with 'latitud' and 'longitud' columns.
+        troncal_transmilenio (pandas.DataFrame): The TransMilenio stations.
+
     Returns:
-    - float: the distance in meters between the location and the nearest TransMilenio station. If an error occurs during the calculation, returns np.nan.
+        tuple: The names of the closest stations and the distances in meters (NaN without coordinates).
     """
-    try:
-        distancias = []
-        for i, estacion in troncal_transmilenio.iterrows():
-            distancias.append(haversine_m(row['latitud'], row['longitud'], estacion['latitud_estacion'], estacion['longitud_estacion']))
-        return min(distancias)
-    except:
-        return np.nan
+    index = nearest.PointIndex(troncal_transmilenio['latitud_estacion'], troncal_transmilenio['longitud_estacion'])
+    return nearest.nearest_names(index, troncal_transmilenio['nombre_estacion'], apartments['latitud'], apartments['longitud'])
     
-logging.info('Adding TransMilenio stations data...')
-apartments['estacion_tm_cercana'] = apartments.apply(estacion_tm_cercana, axis=1)
-apartments['distancia_estacion_tm_m'] = apartments.apply(get_distancia_estacion_m, axis=1)
-apartments['distancia_estacion_tm_m'] = apartments['distancia_estacion_tm_m'].apply(lambda x: round(x, 2))
-
 def is_cerca_estacion(row):
     """
     Determines if a given row is close to a transportation station based on the distance to the nearest station.
@@ -146,38 +137,28 @@ def is_cerca_estacion(row):
     else:
         return 0
 
-logging.info('Adding is_cerca_estacion_tm column...')
-apartments['is_cerca_estacion_tm'] = apartments.apply(is_cerca_estacion, axis=1)
-
-logging.info('Adding parks data...')
-# Get parks data
-parques = pd.read_csv('data/external/espacios_para_deporte_bogota/directorio-parques-y-escenarios-2023-datos-abiertos-v1.0.csv')
-
-def get_distance_to_park(lat, lon, localidad = None):
+def parques_cercanos(apartments, parques):
     """
-    Calculates the distance between a given location and the nearest park.
+    Returns the closest park of every apartment and the distance to it, in a single pass over a spatial
+    index of the parks (see src/nearest.py).
 
     Parameters:
-    - lat (float): Latitude of the location.
-    - lon (float): Longitude of the location.
-    - localidad (str, optional): Name of the locality. If provided, only parks within the specified locality will be considered.
+    - apartments (pandas.DataFrame): The apartments, with 'latitud' and 'longitud' columns.
+    - parques (pandas.DataFrame): The parks.
 
     Returns:
-    - tuple: A tuple containing the name of the nearest park and the distance to it.
+    - tuple: The names of the closest parks and the distances in meters rounded to 2 decimals, None and NaN
+      if the apartment has no coordinates or the park has no type or name.
     """
-    try:
-        if localidad is not None:
-            parques_localidad = parques.loc[parques['LOCALIDAD'] == localidad]
-        else:
-            parques_localidad = parques.copy()
-
-        parques_localidad['distancia'] = parques_localidad.apply(lambda x: haversine_m(lat, lon, x['LATITUD'], x['LONGITUD']), axis=1)
-        parque_cercano = parques_localidad.loc[parques_localidad['distancia'].idxmin()]
-        nombre = 'PARQUE ' + parque_cercano['TIPO DE PARQUE'] + ' ' + parque_cercano['NOMBRE DEL PARQUE O ESCENARIO']
-        return nombre, round(parque_cercano['distancia'], 2)
-    except Exception as e:
-        print(lat, lon, localidad)
-        return None, None
+    index = nearest.PointIndex(parques['LATITUD'], parques['LONGITUD'])
+    tipos, nombres = parques['TIPO DE PARQUE'], parques['NOMBRE DEL PARQUE O ESCENARIO']
+    names = ('PARQUE ' + tipos + ' ' + nombres).astype(object).where(tipos.notna() & nombres.notna(), None)
+    names, distances = nearest.nearest_names(index, names, apartments['latitud'], apartments['longitud'])
+
+    found = pd.notna(names)
+    names = np.where(found, names, None)
+    distances = np.array([round(distance, 2) if is_found else np.nan for distance, is_found in zip(distances, found)])
+    return names, distances
     
 def is_near_park(distancia):
     """
@@ -194,10 +175,67 @@ def is_near_park(distancia):
     else:
         return 0
 
-logging.info('Adding parque_cercano and distancia_al_parque columns...')
-apartments[['parque_cercano', 'distancia_parque_m']] = apartments.apply(lambda x: get_distance_to_park(x['latitud'], x['longitud']), axis=1, result_type='expand')
-apartments['is_cerca_parque'] = apartments['distancia_parque_m'].apply(is_near_park)
+def enrich_apartments(apartments, troncal_transmilenio, parques, paraderos_sitp):
+    """
+    Adds the nearest TransMilenio station and park of the apartments and the proximity features of the
+    stations, SITP bus stops and parks (see src/proximity.py), and saves the processed data.
+
+    Args:
+        apartments (pandas.DataFrame): The corrected apartments of stage 02.
+        troncal_transmilenio (pandas.DataFrame): The TransMilenio stations.
+        parques (pandas.DataFrame): The parks.
+        paraderos_sitp (pandas.DataFrame): The SITP bus stops.
+
+    Returns:
+        pandas.DataFrame: The processed apartments.
+    """
+    # En modo incremental el delta puede estar vacio
+    if apartments.empty:
+        logging.info('No apartments to enrich')
+        save_processed(apartments)
+        return apartments
+
+    apartments = apartments.copy()
+
+    logging.info('Adding TransMilenio stations data...')
+    apartments['estacion_tm_cercana'], apartments['distancia_estacion_tm_m'] = estaciones_tm_cercanas(apartments, troncal_transmilenio)
+    apartments['distancia_estacion_tm_m'] = apartments['distancia_estacion_tm_m'].apply(lambda x: round(x, 2))
+
+    logging.info('Adding is_cerca_estacion_tm column...')
+    apartments['is_cerca_estacion_tm'] = apartments.apply(is_cerca_estacion, axis=1)
+
+    logging.info('Adding parque_cercano and distancia_al_parque columns...')
+    apartments['parque_cercano'], apartments['distancia_parque_m'] = parques_cercanos(apartments, parques)
+    apartments['is_cerca_parque'] = apartments['distancia_parque_m'].apply(is_near_park)
+
+    logging.info('Adding proximity features...')
+    layers = {'transmilenio': troncal_transmilenio, 'parques': parques, 'paraderos_sitp': paraderos_sitp}
+    apartments = pd.concat([apartments, proximity.proximity_features(apartments, layers)], axis=1)
+
+    # Save processed data
+    logging.info('Saving processed data...')
+    save_processed(apartments)
+    return apartments
+
+def main():
+    # Trabajar desde la raiz del proyecto, a la que son relativas las rutas de los logs y los datos
+    project.use_project_root()
+
+    load_dotenv()
+
+    filename = f'logs/03_data_enrichment.log'
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
+
+    # Read apartments data
+    logging.info('Reading apartments data...')
+    apartments = interchange.read_frame(interchange.INTERIM_PATH)
+
+    if apartments.empty:
+        enrich_apartments(apartments, None, None, None)
+        return
+
+    logging.info('Adding parks data...')
+    enrich_apartments(apartments, load_transmilenio(), load_parks(), load_sitp())
 
-# Save processed data
-logging.info('Saving processed data...')
-apartments.to_csv('data/processed/apartments.csv', index=False)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,66 +1,106 @@
+"""
+This script saves the processed apartments to the processed MongoDB collection.
+
+The save is the `save_apartments` function, so the in-process pipeline (data_pipeline.py) can pass the processed
+apartments and its MongoDB collection; running this file reads the processed data and saves it to the collection of
+the environment variables.
+"""
 from dotenv import load_dotenv
 from datetime import datetime
-import pandas as pd
 import pymongo
 import logging
+import sys
 import os
 
-# Cargar las variables de entorno desde el archivo .env
-load_dotenv()
-
-# Configurar el registro de eventos
-filename = 'logs/04_data_save.log'
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
+from src import incremental, interchange, project
 
-# Cambiar el directorio de trabajo si es necesario
-if os.path.basename(os.getcwd()) == 'ETL':
-    logging.info('Changing working directory')
-    os.chdir('..')
+PROCESSED_COLLECTION = 'scrapy_bogota_apartments_processed'
 
-# Iniciar el proceso y registrar el inicio
-logging.info(f'Process started at {datetime.now()}')
+def save_apartments(df, collection):
+    """
+    Saves the processed apartments to MongoDB, inserting the new ones and updating the modified ones.
 
-try:
-    # Conectar a MongoDB
-    logging.info('Connecting to MongoDB')
-    client = pymongo.MongoClient(os.getenv('MONGO_URI'))
-    db = client[os.getenv('MONGO_DATABASE')]
-    collection = db['scrapy_bogota_apartments_processed']
+    In incremental mode only the new or modified apartments are saved and, once they are, the watermark and
+    hashes of the run are committed. Errors are raised, so a failed save never commits the run.
 
-    # Ruta al archivo de datos procesados
-    PROCESSED_DATA = 'data/processed/apartments.csv'
+    Args:
+    - df (pd.DataFrame): The processed apartments.
+    - collection (pymongo.collection.Collection): The processed collection.
 
-    # Leer los datos procesados desde el archivo CSV
-    logging.info('Reading the processed data')
-    df = pd.read_csv(PROCESSED_DATA, low_memory=False)
-    logging.info('Processed data read successfully')
+    Returns:
+    - int: The number of apartments saved.
+    """
+    # En modo incremental solo se guardan los apartamentos nuevos o modificados
+    if incremental.is_enabled():
+        df = df.loc[df['codigo'].astype(str).isin(incremental.delta_codigos())]
+        logging.info(f'Incremental mode, saving {len(df)} apartments')
 
     # Guardar los datos procesados en MongoDB
     logging.info('Saving the processed data to MongoDB')
-    for index, row in df.iterrows():
+    for row in interchange.to_records(df):
         apartment = collection.find_one({'codigo': row['codigo']})
         if apartment:
-            if apartment != row.to_dict():
-                collection.update_one({'codigo': row['codigo']}, {'$set': row.to_dict()})
+            if apartment != row:
+                collection.update_one({'codigo': row['codigo']}, {'$set': row})
         else:
-            collection.insert_one(row.to_dict())
+            collection.insert_one(row)
 
     logging.info('Processed data saved successfully')
 
-except FileNotFoundError as e:
-    logging.error(f'File not found: {e}')
+    # Confirmar la marca de agua y los hashes de esta ejecucion
+    if incremental.is_enabled():
+        incremental.commit()
+
+    return len(df)
+
+def main():
+    # Trabajar desde la raiz del proyecto, donde estan los logs, los datos y el paquete bogota_lotes
+    project.use_project_root()
+
+    # Cargar las variables de entorno desde el archivo .env
+    load_dotenv()
+
+    # Configurar el registro de eventos
+    filename = 'logs/04_data_save.log'
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
+
+    from bogota_lotes.indexes import ensure_indexes, report_query_patterns
+
+    # Iniciar el proceso y registrar el inicio
+    logging.info(f'Process started at {datetime.now()}')
+
+    try:
+        # Conectar a MongoDB
+        logging.info('Connecting to MongoDB')
+        client = pymongo.MongoClient(os.getenv('MONGO_URI'))
+        collection = client[os.getenv('MONGO_DATABASE')][PROCESSED_COLLECTION]
+
+        # Crear y verificar los indices (codigo unico, website, last_view, datetime)
+        ensure_indexes(collection)
+        report_query_patterns(collection)
+
+        # Leer los datos procesados (Feather, con los tipos de src/interchange.py)
+        logging.info('Reading the processed data')
+        df = interchange.read_frame(interchange.PROCESSED_PATH)
+        logging.info('Processed data read successfully')
+
+        save_apartments(df, collection)
 
-except pd.errors.EmptyDataError as e:
-    logging.error(f'Empty data error: {e}')
+    except FileNotFoundError as e:
+        logging.error(f'File not found: {e}')
+        sys.exit(1)
 
-except Exception as e:
-    logging.error(f'An error occurred: {e}')
+    except Exception as e:
+        logging.error(f'An error occurred: {e}')
+        sys.exit(1)
 
-finally:
-    # Cerrar la conexión a MongoDB
-    if 'client' in locals():
-        logging.info('Closing the connection to MongoDB')
-        client.close()
+    finally:
+        # Cerrar la conexión a MongoDB
+        if 'client' in locals():
+            logging.info('Closing the connection to MongoDB')
+            client.close()
 
-    logging.info(f'Process finished at {datetime.now()}')
+        logging.info(f'Process finished at {datetime.now()}')
 
+if __name__ == '__main__':
+    main()
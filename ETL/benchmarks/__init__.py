@@ -0,0 +1,12 @@
+"""
+Benchmarks of the ETL. Run them as modules from the project root, where the data paths are relative, e.g.
+`python -m ETL.benchmarks.zones`.
+"""
+import sys
+import os
+
+ETL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Los modulos del ETL importan `src` desde la carpeta ETL, como los scripts de las etapas
+if ETL_DIR not in sys.path:
+    sys.path.insert(0, ETL_DIR)
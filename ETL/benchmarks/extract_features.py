@@ -0,0 +1,45 @@
+"""
+Compares the time of extract_all_features with the row-wise check_* and extract_* functions it replaced.
+
+Usage: python -m ETL.benchmarks.extract_features [rows ...]
+"""
+import sys
+
+from .layers import timed
+from src import extract_features
+import pandas as pd
+import numpy as np
+
+ROW_FUNCTIONS = [
+    extract_features.check_jacuzzi, extract_features.extract_piso, extract_features.extract_closets,
+    extract_features.check_chimeny, extract_features.check_mascotas, extract_features.check_gimnasio,
+    extract_features.check_ascensor, extract_features.check_conjunto_cerrado, extract_features.check_piscina,
+    extract_features.check_salon_comunal, extract_features.check_terraza, extract_features.check_vigilancia,
+]
+
+ITEMS = [
+    'JACUZZI', 'CHIMENEA', 'PERMITE MASCOTAS', 'GIMNASIO', 'ASCENSOR', 'CONJUNTO CERRADO', 'PISCINA',
+    'SALÓN COMUNAL', 'TERRAZA', 'VIGILANCIA 24H', 'PISO 3', 'PISO 12', 'CLOSETS 2', 'CLOSETS 4', 'BALCON',
+    'ESTUDIO', 'PATIO', 'DEPOSITO', 'COCINA INTEGRAL', 'ZONA BBQ',
+]
+
+def random_caracteristicas(n: int, seed: int = 0) -> pd.Series:
+    """
+    Returns n random lists of amenities, 5% of them NaN.
+    """
+    rng = np.random.default_rng(seed)
+    rows = [[ITEMS[i] for i in rng.choice(len(ITEMS), size=rng.integers(1, 12), replace=False)] for _ in range(n)]
+    caracteristicas = pd.Series(rows, dtype=object)
+    caracteristicas[rng.random(n) < 0.05] = np.nan
+    return caracteristicas
+
+def main(sizes: list):
+    print(f'{"rows":>9} {"row-wise (s)":>13} {"single pass (s)":>16} {"speedup":>8}')
+    for n in sizes:
+        caracteristicas = random_caracteristicas(n)
+        _, row_wise = timed(lambda: [caracteristicas.apply(function) for function in ROW_FUNCTIONS])
+        _, single = timed(extract_features.extract_all_features, caracteristicas)
+        print(f'{n:>9} {row_wise:>13.3f} {single:>16.3f} {row_wise / single:>7.1f}x')
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,52 @@
+"""
+Layers, random apartments and timing for the benchmarks. The layers are loaded with src/layer_cache.py, as stage 02
+loads them.
+"""
+from src import layer_cache
+from unidecode import unidecode
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import shapely
+import time
+import os
+
+# Zona urbana de Bogota, donde estan los apartamentos
+BOUNDS = (-74.22, 4.47, -74.01, 4.83)
+
+def timed(function, *args) -> tuple:
+    """
+    Returns the result of calling function with args and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def load_zones() -> tuple:
+    """
+    Returns the localidades and barrios from the layer cache, as stage 02 loads them. Without the barrios file, every
+    localidad is cut into ~1 km barrios.
+    """
+    localidades = layer_cache.load_layer('localidades')
+    if os.path.exists(layer_cache.BARRIOS_PATH):
+        return localidades, layer_cache.load_layer('barrios')
+
+    rows = []
+    for name, polygon in zip(localidades['LocNombre'], localidades.geometry):
+        minx, miny, maxx, maxy = polygon.bounds
+        for x in np.arange(minx, maxx, 0.01):
+            for y in np.arange(miny, maxy, 0.01):
+                part = shapely.box(x, y, x + 0.01, y + 0.01).intersection(polygon)
+                if not part.is_empty:
+                    rows.append({'barriocomu': f'{unidecode(name).upper()} {len(rows)}', 'localidad': unidecode(name).upper(), 'geometry': part})
+    barrios = layer_cache.add_bounds(gpd.GeoDataFrame(rows, geometry='geometry', crs=localidades.crs))
+    shapely.prepare(np.asarray(barrios.geometry.values))
+    return localidades, barrios
+
+def random_apartments(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns n apartments at random coordinates of the urban area.
+    """
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = BOUNDS
+    return pd.DataFrame({'longitud': rng.uniform(minx, maxx, n), 'latitud': rng.uniform(miny, maxy, n)})
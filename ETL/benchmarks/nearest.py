@@ -0,0 +1,70 @@
+"""
+Compares the time of the nearest TransMilenio station and park of stage 03 (a KD-tree, see src/nearest.py, or its
+NumPy kernel without scipy) with the row-wise search over every station and park it replaced. The row-wise search
+is only timed up to --row-wise-max apartments.
+
+Usage: python -m ETL.benchmarks.nearest [--row-wise-max N] [apartments ...]
+"""
+import argparse
+import importlib
+
+from .layers import random_apartments, timed
+from src import layer_cache, nearest, transmilenio
+import pandas as pd
+import numpy as np
+
+enrichment = importlib.import_module('03_data_enrichment')
+
+def row_wise(apartments, stations, parques) -> tuple:
+    """
+    The nearest station and park of every apartment, comparing it with every station and park.
+    """
+    def station(row):
+        distances = [enrichment.haversine_m(row['latitud'], row['longitud'], lat, lon) for lat, lon in zip(stations['latitud_estacion'], stations['longitud_estacion'])]
+        return stations['nombre_estacion'].iloc[np.argmin(distances)]
+
+    def park(row):
+        distances = [enrichment.haversine_m(row['latitud'], row['longitud'], lat, lon) for lat, lon in zip(parques['LATITUD'], parques['LONGITUD'])]
+        return np.nanargmin(distances)
+
+    return apartments.apply(station, axis=1).tolist(), apartments.apply(park, axis=1).tolist()
+
+def indexed(apartments, stations, parques) -> tuple:
+    names, _ = enrichment.estaciones_tm_cercanas(apartments, stations)
+    _, positions = nearest.PointIndex(parques['LATITUD'], parques['LONGITUD']).nearest(apartments['latitud'], apartments['longitud'])
+    return list(names), positions[:, 0].tolist()
+
+def kernel(apartments, stations, parques) -> tuple:
+    """
+    The same search as `indexed`, with the NumPy kernel used when scipy is not installed.
+    """
+    results = []
+    for latitud, longitud in ((stations['latitud_estacion'], stations['longitud_estacion']), (parques['LATITUD'], parques['LONGITUD'])):
+        index = nearest.PointIndex(latitud, longitud)
+        index.tree = index.count_tree = None
+        results.append(index.nearest(apartments['latitud'], apartments['longitud'])[1][:, 0])
+    return stations['nombre_estacion'].to_numpy()[results[0]].tolist(), results[1].tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('sizes', nargs='*', type=int, default=[10000, 100000, 1000000])
+    parser.add_argument('--row-wise-max', type=int, default=10000)
+    args = parser.parse_args()
+
+    stations = transmilenio.read_bundled()
+    parques = pd.read_csv(layer_cache.PARKS_PATH)
+    print(f'{len(stations)} stations, {len(parques)} parks')
+    print(f'{"apartments":>10} {"row-wise (s)":>13} {"kernel (s)":>11} {"kd-tree (s)":>12}')
+    for n in args.sizes:
+        apartments = random_apartments(n)
+        expected, row_wise_time = timed(row_wise, apartments, stations, parques) if n <= args.row_wise_max else (None, None)
+        kernel_result, kernel_time = timed(kernel, apartments, stations, parques)
+        result, tree_time = timed(indexed, apartments, stations, parques)
+        if result != kernel_result or expected is not None and result != expected:
+            raise AssertionError(f'The nearest stations or parks differ for {n} apartments')
+
+        row_wise_column = f'{row_wise_time:.2f}' if row_wise_time is not None else '-'
+        print(f'{n:>10} {row_wise_column:>13} {kernel_time:>11.3f} {tree_time:>12.3f}')
+
+if __name__ == '__main__':
+    main()
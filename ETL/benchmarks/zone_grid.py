@@ -0,0 +1,38 @@
+"""
+Times the zone grid: building it, loading it from the cache, and get_zones compared with the bulk get_localidades
+and get_barrios it replaces. The grid is cached in a temporary directory.
+
+Usage: python -m ETL.benchmarks.zone_grid [apartments ...]
+"""
+import tempfile
+import sys
+import os
+
+from .layers import load_zones, random_apartments, timed
+from src import data_enrichment, layer_cache, zone_grid
+import pandas as pd
+
+def bulk_zones(apartments, localidades, barrios) -> tuple:
+    localidad = data_enrichment.get_localidades(apartments, localidades)
+    return localidad, data_enrichment.get_barrios(apartments.assign(localidad=localidad), barrios)
+
+def main(sizes: list):
+    localidades, barrios = load_zones()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_path = os.path.join(cache_dir, 'zone_grid.npz')
+        grid, build_time = timed(zone_grid.load_grid, localidades, barrios, [layer_cache.LOCALIDADES_PATH, layer_cache.BARRIOS_PATH], cache_path)
+        _, load_time = timed(zone_grid.load_grid, localidades, barrios, [layer_cache.LOCALIDADES_PATH, layer_cache.BARRIOS_PATH], cache_path)
+
+    border = (grid['localidad'] == zone_grid.BORDER).mean()
+    print(f'grid {grid["localidad"].shape}, {border:.1%} border cells: built in {build_time:.2f} s, loaded in {load_time:.3f} s')
+    print(f'{"apartments":>10} {"bulk (s)":>9} {"grid (s)":>9}')
+    for n in sizes:
+        apartments = random_apartments(n)
+        expected, bulk_time = timed(bulk_zones, apartments, localidades, barrios)
+        result, grid_time = timed(zone_grid.get_zones, apartments, localidades, barrios, grid)
+        for column, expected_column in zip(result, expected):
+            pd.testing.assert_series_equal(column, expected_column)
+        print(f'{n:>10} {bulk_time:>9.3f} {grid_time:>9.3f}')
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,40 @@
+"""
+Compares the time of get_localidades and get_barrios (a bulk STRtree query) with applying get_localidad and
+get_barrio to every row. The row-wise functions are only timed up to --row-wise-max apartments.
+
+Usage: python -m ETL.benchmarks.zones [--row-wise-max N] [apartments ...]
+"""
+import argparse
+
+from .layers import load_zones, random_apartments, timed
+from src import data_enrichment
+import pandas as pd
+
+def row_wise(apartments, localidades, barrios):
+    apartments = apartments.assign(localidad=apartments.apply(data_enrichment.get_localidad, axis=1, localidades=localidades))
+    return apartments.apply(data_enrichment.get_barrio, axis=1, barrios=barrios)
+
+def bulk(apartments, localidades, barrios):
+    apartments = apartments.assign(localidad=data_enrichment.get_localidades(apartments, localidades))
+    return data_enrichment.get_barrios(apartments, barrios)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('sizes', nargs='*', type=int, default=[10000, 100000, 1000000])
+    parser.add_argument('--row-wise-max', type=int, default=10000)
+    args = parser.parse_args()
+
+    localidades, barrios = load_zones()
+    print(f'{len(localidades)} localidades, {len(barrios)} barrios')
+    print(f'{"apartments":>10} {"row-wise (s)":>13} {"bulk (s)":>9}')
+    for n in args.sizes:
+        apartments = random_apartments(n)
+        expected, row_wise_time = timed(row_wise, apartments, localidades, barrios) if n <= args.row_wise_max else (None, None)
+        result, bulk_time = timed(bulk, apartments, localidades, barrios)
+        if expected is not None:
+            pd.testing.assert_series_equal(result, expected, check_dtype=False)
+        row_wise_column = f'{row_wise_time:.2f}' if row_wise_time is not None else '-'
+        print(f'{n:>10} {row_wise_column:>13} {bulk_time:>9.3f}')
+
+if __name__ == '__main__':
+    main()
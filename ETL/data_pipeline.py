@@ -0,0 +1,207 @@
+"""
+This module runs the ETL stages in a single process, passing the DataFrames from one stage to the next in memory.
+
+Every stage is a node of a small DAG: a function called with the results of the stages it requires as keyword
+arguments. The stages share one MongoDB client and load the external layers once (the localidades, barrios and zone
+grid of stage 02, the TransMilenio stations, parks and SITP bus stops of stage 03), and independent nodes can run concurrently on a
+thread pool. The run fails fast: the first error cancels the stages that did not start and is raised to the caller.
+
+Classes:
+    Stage: A node of the pipeline.
+    Pipeline: Runs the stages in dependency order.
+
+Functions:
+    build_stages(client): Returns the stages of the ETL.
+    run_pipeline(workers, client): Runs the ETL.
+    build_layers(): Rebuilds the cache of the external layers.
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dotenv import load_dotenv
+import importlib
+import logging
+import pymongo
+import time
+import sys
+import os
+
+ETL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Los scripts de las etapas importan `src` desde la carpeta ETL
+if ETL_DIR not in sys.path:
+    sys.path.insert(0, ETL_DIR)
+
+from src import project
+
+
+class Stage(object):
+    """
+    A node of the pipeline.
+
+    Attributes:
+        name (str): The name of the stage, the key of its result.
+        func (callable): The function of the stage, called with the results of `requires` as keyword arguments.
+        requires (dict): The keyword argument of every required stage, by stage name.
+    """
+
+    def __init__(self, name, func, requires=None):
+        self.name = name
+        self.func = func
+        self.requires = dict(requires or {})
+
+    def run(self, results):
+        """
+        Runs the stage with the results of the stages it requires, logging its duration.
+
+        Args:
+            results (dict): The results of the finished stages.
+
+        Returns:
+            The result of the stage.
+        """
+        logging.info(f'Start stage {self.name}')
+        start = time.perf_counter()
+        result = self.func(**{argument: results[name] for name, argument in self.requires.items()})
+        logging.info(f'End stage {self.name} in {time.perf_counter() - start:.2f} s')
+        return result
+
+
+class Pipeline(object):
+    """
+    Runs the stages in dependency order.
+
+    Attributes:
+        stages (list): The stages, in an order in which every stage comes after the ones it requires.
+
+    Methods:
+        run(self, workers): Runs every stage and returns their results.
+    """
+
+    def __init__(self, stages):
+        names = set()
+        for stage in stages:
+            missing = set(stage.requires) - names
+            if missing:
+                raise ValueError(f'Stage {stage.name} requires unknown or later stages: {sorted(missing)}')
+            names.add(stage.name)
+        self.stages = list(stages)
+
+    def run(self, workers=1):
+        """
+        Runs every stage. With one worker the stages run one after the other in the calling thread; with more,
+        every stage whose requirements are done is submitted to a thread pool.
+
+        Args:
+            workers (int): The number of stages that can run at the same time.
+
+        Returns:
+            dict: The result of every stage, by name.
+        """
+        results = {}
+        if workers <= 1:
+            for stage in self.stages:
+                results[stage.name] = stage.run(results)
+            return results
+
+        pending = list(self.stages)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while pending or running:
+                for stage in [stage for stage in pending if set(stage.requires) <= set(results)]:
+                    pending.remove(stage)
+                    running[executor.submit(stage.run, dict(results))] = stage
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    # Falla rapido: el error se propaga y las etapas que no han empezado se cancelan
+                    results[stage.name] = future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+
+def build_stages(client):
+    """
+    Returns the stages of the ETL.
+
+    Args:
+        client (pymongo.MongoClient): The MongoDB client shared by the stages.
+
+    Returns:
+        list: The stages.
+    """
+    initial = importlib.import_module('01_initial_transformations')
+    correction = importlib.import_module('02_data_correction')
+    enrichment = importlib.import_module('03_data_enrichment')
+    save = importlib.import_module('04_data_save')
+
+    from bogota_lotes.indexes import ensure_indexes, report_query_patterns
+
+    db = client[os.getenv('MONGO_DATABASE')]
+    raw = db[os.getenv('MONGO_COLLECTION_RAW')]
+    processed = db[save.PROCESSED_COLLECTION]
+
+    def transform():
+        ensure_indexes(raw)
+        return initial.initial_transformations(raw)
+
+    def persist(apartments):
+        ensure_indexes(processed)
+        report_query_patterns(processed)
+        return save.save_apartments(apartments, processed)
+
+    return [
+        Stage('raw', transform),
+        Stage('zones', correction.load_zones),
+        Stage('transmilenio', enrichment.load_transmilenio),
+        Stage('parks', enrichment.load_parks),
+        Stage('sitp', enrichment.load_sitp),
+        Stage('corrected', correction.correct_apartments, {'raw': 'apartments', 'zones': 'zones'}),
+        Stage('enriched', enrichment.enrich_apartments, {'corrected': 'apartments', 'transmilenio': 'troncal_transmilenio', 'parks': 'parques', 'sitp': 'paraderos_sitp'}),
+        Stage('saved', persist, {'enriched': 'apartments'}),
+    ]
+
+
+def run_pipeline(workers=1, client=None):
+    """
+    Runs the ETL: initial transformations, data correction, data enrichment and data saving.
+
+    Args:
+        workers (int): The number of independent stages that can run at the same time.
+        client (pymongo.MongoClient): The MongoDB client, a new one from MONGO_URI by default.
+
+    Returns:
+        dict: The result of every stage, by name.
+    """
+    load_dotenv()
+    project.use_project_root()
+
+    own_client = client is None
+    if own_client:
+        logging.info('Connecting to MongoDB')
+        client = pymongo.MongoClient(os.getenv('MONGO_URI'))
+
+    try:
+        return Pipeline(build_stages(client)).run(workers)
+    finally:
+        if own_client:
+            logging.info('Closing the connection to MongoDB')
+            client.close()
+
+
+def build_layers():
+    """
+    Rebuilds the preprocessed cache of the external layers (see src/layer_cache.py), so the next run loads
+    them without parsing the source files.
+
+    Returns:
+        list: The cache files.
+    """
+    project.use_project_root()
+    from src import layer_cache
+
+    paths = layer_cache.build_layers()
+    for path in paths:
+        logging.info(f'Layer cached: {path}')
+    return paths
@@ -0,0 +1,200 @@
+import pandas as pd
+import numpy as np
+import unicodedata
+import re
+import os
+
+AMENITIES_PATH = 'data/processed/amenities.npz'
+VOCABULARY_PATH = 'data/processed/amenities_vocabulary.csv'
+
+# Items like 'PISO 3' or 'CLOSETS 2' are stored as the term 'PISO'/'CLOSETS' with the number as value
+NUMBERED_ITEM = re.compile(r'(.*\D) (\d{1,4})')
+
+def normalize_amenity(item):
+    """
+    Normalizes an item of the 'caracteristicas' lists into a vocabulary term.
+
+    The item is uppercased, accents and punctuation are removed and spaces are collapsed, so the
+    same amenity written differently by each portal ('SALÓN COMUNAL', 'Salon comunal') gets a
+    single term. A trailing number is split off as the value of the term.
+
+    Args:
+    - item: The item.
+
+    Returns:
+    - tuple: (term, value), term is None if the item is not a string or is empty.
+    """
+    if type(item) != str:
+        return None, 0
+
+    text = unicodedata.normalize('NFKD', item).encode('ascii', 'ignore').decode('ascii')
+    text = ' '.join(re.sub(r'[^\w\s]', ' ', text.upper()).split())
+    if not text:
+        return None, 0
+
+    match = NUMBERED_ITEM.fullmatch(text)
+    if match:
+        return match.group(1), int(match.group(2))
+    return text, 1
+
+def read_vocabulary(path: str = VOCABULARY_PATH) -> dict:
+    """
+    Returns the term ids of an existing vocabulary file, or an empty vocabulary.
+    """
+    if not os.path.exists(path):
+        return {}
+    terms = pd.read_csv(path, keep_default_na=False)['term']
+    return {term: i for i, term in enumerate(terms)}
+
+def encode(codigos: pd.Series, caracteristicas: pd.Series, vocabulary: dict) -> dict:
+    """
+    Encodes the amenities of a chunk as the rows of a CSR matrix.
+
+    The lists are exploded once and factorized, so every distinct item is normalized only once.
+    New terms are appended to `vocabulary`, so the ids of the existing terms never change. A term
+    appearing several times in a listing keeps its highest value.
+
+    Args:
+    - codigos (pd.Series): The codes of the listings.
+    - caracteristicas (pd.Series): The lists of amenities (anything that is not a list has none).
+    - vocabulary (dict): The id of every term, updated in place.
+
+    Returns:
+    - dict: The 'codigo', 'indptr', 'indices' and 'data' arrays of the rows.
+    """
+    n = len(caracteristicas)
+    values = pd.Series(caracteristicas.to_numpy(), dtype=object)
+    exploded = values[values.map(type) == list].explode()
+    rows = exploded.index.to_numpy()
+
+    # Los items vacios (listas vacias o NaN) quedan con el codigo -1, el ultimo de las tablas
+    codes, uniques = pd.factorize(exploded.to_numpy(), use_na_sentinel=True)
+    item_term = np.full(len(uniques) + 1, -1, dtype='int64')
+    item_value = np.zeros(len(uniques) + 1, dtype='int32')
+    for i, item in enumerate(uniques):
+        term, value = normalize_amenity(item)
+        if term is not None:
+            item_term[i] = vocabulary.setdefault(term, len(vocabulary))
+            item_value[i] = value
+
+    terms = item_term[codes]
+    keep = terms >= 0
+    rows, terms, data = rows[keep], terms[keep], item_value[codes][keep]
+
+    # Ordenar por fila, termino y valor, y quedarse con el ultimo (el mayor) de cada par fila-termino
+    order = np.lexsort((data, terms, rows))
+    rows, terms, data = rows[order], terms[order], data[order]
+    last = np.ones(len(rows), dtype=bool)
+    last[:-1] = (rows[1:] != rows[:-1]) | (terms[1:] != terms[:-1])
+    rows, terms, data = rows[last], terms[last], data[last]
+
+    indptr = np.zeros(n + 1, dtype='int64')
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    return {
+        'codigo': codigos.astype(str).to_numpy(dtype='U'),
+        'indptr': indptr,
+        'indices': terms.astype('int32'),
+        'data': data,
+    }
+
+def concat(parts: list) -> dict:
+    """
+    Concatenates the rows of several encoded chunks.
+
+    Args:
+    - parts (list): The encoded chunks (see `encode`).
+
+    Returns:
+    - dict: The rows of every chunk, in order.
+    """
+    if not parts:
+        return {
+            'codigo': np.array([], dtype='U'),
+            'indptr': np.zeros(1, dtype='int64'),
+            'indices': np.array([], dtype='int32'),
+            'data': np.array([], dtype='int32'),
+        }
+
+    offsets = np.cumsum([0] + [part['indptr'][-1] for part in parts[:-1]])
+    return {
+        'codigo': np.concatenate([part['codigo'] for part in parts]),
+        'indptr': np.concatenate([[0]] + [part['indptr'][1:] + offset for part, offset in zip(parts, offsets)]).astype('int64'),
+        'indices': np.concatenate([part['indices'] for part in parts]).astype('int32'),
+        'data': np.concatenate([part['data'] for part in parts]).astype('int32'),
+    }
+
+def drop_rows(part: dict, codigos: set) -> dict:
+    """
+    Removes the rows of some listings from an encoded matrix.
+
+    Args:
+    - part (dict): The encoded rows (see `encode`).
+    - codigos (set): The codes of the listings to remove.
+
+    Returns:
+    - dict: The remaining rows.
+    """
+    keep_rows = ~np.isin(part['codigo'], list(codigos))
+    lengths = np.diff(part['indptr'])
+    keep = np.repeat(keep_rows, lengths)
+
+    indptr = np.zeros(keep_rows.sum() + 1, dtype='int64')
+    np.cumsum(lengths[keep_rows], out=indptr[1:])
+    return {
+        'codigo': part['codigo'][keep_rows],
+        'indptr': indptr,
+        'indices': part['indices'][keep],
+        'data': part['data'][keep],
+    }
+
+def read_rows(path: str = AMENITIES_PATH) -> dict:
+    """
+    Returns the encoded rows of an existing amenities file, or an empty matrix.
+    """
+    if not os.path.exists(path):
+        return concat([])
+    with np.load(path, allow_pickle=False) as file:
+        return {key: file[key] for key in ('codigo', 'indptr', 'indices', 'data')}
+
+def save(part: dict, vocabulary: dict, path: str = AMENITIES_PATH, vocabulary_path: str = VOCABULARY_PATH):
+    """
+    Saves the amenity matrix as a compressed .npz file of CSR arrays, and the vocabulary as a CSV
+    file with the id, term and number of listings of every term.
+
+    Args:
+    - part (dict): The encoded rows (see `encode`).
+    - vocabulary (dict): The id of every term.
+    - path (str): The matrix file.
+    - vocabulary_path (str): The vocabulary file.
+    """
+    shape = np.array([len(part['codigo']), len(vocabulary)], dtype='int64')
+    np.savez_compressed(path, shape=shape, **part)
+
+    terms = sorted(vocabulary, key=vocabulary.get)
+    pd.DataFrame({
+        'id': range(len(terms)),
+        'term': terms,
+        'listings': np.bincount(part['indices'], minlength=len(terms)),
+    }).to_csv(vocabulary_path, index=False)
+
+def load_matrix(path: str = AMENITIES_PATH, vocabulary_path: str = VOCABULARY_PATH):
+    """
+    Loads the amenity matrix as a scipy.sparse CSR matrix (scipy is only needed here).
+
+    Args:
+    - path (str): The matrix file.
+    - vocabulary_path (str): The vocabulary file.
+
+    Returns:
+    - tuple: (matrix, codigos, terms), the rows of the matrix are the listings of `codigos` and its
+      columns the terms of `terms`.
+    """
+    from scipy import sparse
+
+    with np.load(path, allow_pickle=False) as file:
+        matrix = sparse.csr_matrix((file['data'], file['indices'], file['indptr']), shape=tuple(file['shape']))
+        codigos = file['codigo']
+
+    terms = pd.read_csv(vocabulary_path, keep_default_na=False)['term'].tolist()
+    return matrix, codigos, terms
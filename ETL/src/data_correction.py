@@ -1,6 +1,26 @@
 import numpy as np
+import logging
+import hashlib
+import shapely
 from shapely.geometry import Point
 
+RANDOM_SEED = 42
+
+# Sectores cuyas coordenadas se corrigen cuando caen fuera de su localidad: poligono de referencia
+# (barrio de 'barriocomu' o localidad de 'LocNombre'), localidad y barrio asignados
+SECTORS = {
+    'CHICO': {'layer': 'barrios', 'name': 'S.C. CHICO NORTE', 'localidad': 'CHAPINERO', 'barrio': 'S.C. CHICO NORTE'},
+    'CEDRITOS': {'layer': 'barrios', 'name': 'CEDRITOS', 'localidad': 'USAQUEN', 'barrio': 'CEDRITOS'},
+    'CHAPINERO ALTO': {'layer': 'barrios', 'name': 'S.C. CHAPINERO NORTE', 'localidad': 'CHAPINERO', 'barrio': 'S.C. CHAPINERO NORTE'},
+    'LOS ROSALES': {'layer': 'barrios', 'name': 'LOS ROSALES', 'localidad': 'CHAPINERO', 'barrio': 'LOS ROSALES'},
+    'PUENTE ARANDA': {'layer': 'localidades', 'name': 'PUENTE ARANDA', 'localidad': 'PUENTE ARANDA', 'barrio': 'PUENTE ARANDA'},
+    'SANTA BARBARA': {'layer': 'barrios', 'name': 'SANTA BARBARA OCCIDENTAL', 'localidad': 'USAQUEN', 'barrio': 'SANTA BARBARA OCCIDENTAL'},
+    'COUNTRY': {'layer': 'barrios', 'name': 'NUEVO COUNTRY', 'localidad': 'USAQUEN', 'barrio': 'NUEVO COUNTRY'},
+    'CENTRO INTERNACIONAL': {'layer': 'barrios', 'name': 'SAMPER', 'localidad': 'SANTA FE', 'barrio': 'SAMPER'},
+    'CERROS DE SUBA': {'layer': 'barrios', 'name': 'S.C. NIZA SUBA', 'localidad': 'SUBA', 'barrio': 'S.C. NIZA SUBA'},
+    'NIZA ALHAMBRA': {'layer': 'barrios', 'name': 'NIZA SUR', 'localidad': 'SUBA', 'barrio': 'NIZA SUR'},
+}
+
 def random_coords_in_polygon(polygon):
     """
     Generates random coordinates within a given polygon.
@@ -83,4 +103,106 @@ def correction_ubication(row, barrios, localidades):
             row['localidad'] = sector_dict[sector]['localidad']
             row['barrio'] = sector_dict[sector]['barrio']
 
-    return row
\ No newline at end of file
+    return row
+
+def sector_polygons(barrios, localidades) -> dict:
+    """
+    Returns the reference polygon of every sector of SECTORS (the first one with its name, as
+    correction_ubication does), looked up once.
+
+    Args:
+    - barrios: a GeoDataFrame with the barrios polygons and a 'barriocomu' column
+    - localidades: a GeoDataFrame with the localidades polygons and a 'LocNombre' column
+
+    Returns:
+    - dict: The polygon of every sector whose reference polygon exists.
+    """
+    layers = {'barrios': (barrios, 'barriocomu'), 'localidades': (localidades, 'LocNombre')}
+    polygons = {}
+    for sector, config in SECTORS.items():
+        layer, column = layers[config['layer']]
+        matches = layer.loc[layer[column] == config['name'], 'geometry']
+        if matches.empty:
+            logging.warning(f'No se encontro el poligono de {config["name"]} para el sector {sector}')
+            continue
+        polygons[sector] = matches.iloc[0]
+    return polygons
+
+def listing_rng(codigo, seed=RANDOM_SEED):
+    """
+    Returns the random generator of a listing, seeded with a hash of its codigo, so its corrected
+    coordinates are the same whichever other listings are processed with it (a full or an incremental run).
+
+    Args:
+    - codigo: the codigo of the listing
+    - seed: the seed shared by every listing
+
+    Returns:
+    - A numpy Generator.
+    """
+    digest = hashlib.sha1(f'{seed}:{codigo}'.encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+
+def random_points_in_polygon(polygon, n, rng):
+    """
+    Generates n random coordinates within a polygon with batched rejection sampling. The polygon is not
+    prepared here: the layers of src/layer_cache.py are prepared once, when they are loaded.
+
+    Args:
+    - polygon: a Shapely Polygon object
+    - n: the number of coordinates
+    - rng: a numpy Generator
+
+    Returns:
+    - x, y: arrays of n random coordinates within the polygon
+    """
+    minx, miny, maxx, maxy = polygon.bounds
+    # Proporcion del rectangulo que ocupa el poligono, para generar lotes del tamaño justo
+    ratio = max(polygon.area / ((maxx - minx) * (maxy - miny)), 0.01)
+
+    xs, ys, found = [], [], 0
+    while found < n:
+        size = int(np.ceil((n - found) / ratio * 1.2)) + 8
+        x = rng.uniform(minx, maxx, size)
+        y = rng.uniform(miny, maxy, size)
+        inside = shapely.contains_xy(polygon, x, y)
+        xs.append(x[inside])
+        ys.append(y[inside])
+        found += inside.sum()
+
+    return np.concatenate(xs)[:n], np.concatenate(ys)[:n]
+
+def correct_locations(apartments, barrios, localidades, seed=RANDOM_SEED):
+    """
+    Moves the apartments of the sectors of SECTORS whose localidad is not the one of their sector to
+    random coordinates within the sector's polygon, like applying correction_ubication to every row,
+    with the rows selected by a vectorized mask. The coordinates of every listing come from its own
+    generator (see `listing_rng`), so they only depend on its codigo and `seed`.
+
+    Args:
+    - apartments: a DataFrame with 'codigo', 'sector', 'localidad', 'barrio', 'latitud', 'longitud' and 'coords_modified' columns
+    - barrios: a GeoDataFrame with the barrios polygons
+    - localidades: a GeoDataFrame with the localidades polygons
+    - seed: the seed of the random coordinates
+
+    Returns:
+    - The corrected DataFrame.
+    """
+    apartments = apartments.copy()
+    polygons = sector_polygons(barrios, localidades)
+
+    for sector, polygon in polygons.items():
+        config = SECTORS[sector]
+        mask = (apartments['sector'] == sector) & (apartments['localidad'] != config['localidad'])
+        if not mask.any():
+            continue
+
+        points = [random_points_in_polygon(polygon, 1, listing_rng(codigo, seed)) for codigo in apartments.loc[mask, 'codigo']]
+        apartments.loc[mask, 'latitud'] = [y[0] for _, y in points]
+        apartments.loc[mask, 'longitud'] = [x[0] for x, _ in points]
+        apartments.loc[mask, 'coords_modified'] = True
+        apartments.loc[mask, 'localidad'] = config['localidad']
+        apartments.loc[mask, 'barrio'] = config['barrio']
+
+    return apartments
+
@@ -1,7 +1,9 @@
 from shapely.geometry import Point
 from unidecode import unidecode
 import geopandas as gpd
+import pandas as pd
 import numpy as np
+import shapely
 
 def get_localidad(row, localidades: gpd.GeoDataFrame) -> str:
     """
@@ -41,4 +43,97 @@ def get_barrio(row, barrios: gpd.GeoDataFrame) -> str:
             
         return np.nan
     except:
-        return np.nan
\ No newline at end of file
+        return np.nan
+
+def first_containing(longitud, latitud, geometries, allowed=None) -> np.ndarray:
+    """
+    Returns, for every point, the position of the first geometry that contains it, like the loops of
+    get_localidad and get_barrio, in a single bulk query of an STRtree over the prepared geometries.
+
+    Args:
+    - longitud (array-like): The longitudes of the points.
+    - latitud (array-like): The latitudes of the points.
+    - geometries (array-like): The polygons, in the order in which they are tested.
+    - allowed (callable, optional): Receives the point and geometry positions of the candidate pairs and
+      returns a boolean mask of the pairs to keep.
+
+    Returns:
+    - np.ndarray: The position of the geometry of every point, or -1 if no geometry contains it.
+    """
+    longitud = pd.to_numeric(pd.Series(np.asarray(longitud)), errors='coerce').to_numpy(dtype='float64')
+    latitud = pd.to_numeric(pd.Series(np.asarray(latitud)), errors='coerce').to_numpy(dtype='float64')
+    points = shapely.points(longitud, latitud)
+
+    # Los candidatos salen del arbol y se prueban contra las geometrias preparadas (point.within == polygon.contains)
+    geometries = np.asarray(geometries)
+    shapely.prepare(geometries)
+    point_idx, geometry_idx = shapely.STRtree(geometries).query(points)
+    inside = shapely.contains_xy(geometries[geometry_idx], longitud[point_idx], latitud[point_idx])
+    point_idx, geometry_idx = point_idx[inside], geometry_idx[inside]
+    if allowed is not None:
+        keep = allowed(point_idx, geometry_idx)
+        point_idx, geometry_idx = point_idx[keep], geometry_idx[keep]
+
+    result = np.full(len(points), -1, dtype='int64')
+    # Se recorren los pares de mayor a menor geometria para que la primera geometria quede de ultima
+    order = np.argsort(geometry_idx, kind='stable')[::-1]
+    result[point_idx[order]] = geometry_idx[order]
+    return result
+
+def localidad_names(localidades: gpd.GeoDataFrame) -> np.ndarray:
+    """
+    Returns the normalized names of the localidades (as get_localidad does), followed by np.nan so
+    position -1 means no localidad. Layers loaded from the cache (see layer_cache.py) already have them.
+    """
+    if 'localidad' in localidades.columns:
+        return np.append(localidades['localidad'].to_numpy(dtype=object), np.nan)
+    return np.array([unidecode(name).upper() for name in localidades['LocNombre']] + [np.nan], dtype=object)
+
+def barrio_positions(apartments: pd.DataFrame, barrios: gpd.GeoDataFrame) -> np.ndarray:
+    """
+    Returns the position of the barrio of every apartment among the barrios of its localidad, or -1.
+
+    Args:
+    - apartments (pd.DataFrame): The apartments, with 'longitud', 'latitud' and 'localidad' columns.
+    - barrios (gpd.GeoDataFrame): The barrios polygons, with a 'localidad' column.
+
+    Returns:
+    - np.ndarray: The positions.
+    """
+    apartment_localidad = apartments['localidad'].to_numpy(dtype=object)
+    barrio_localidad = barrios['localidad'].to_numpy(dtype=object)
+
+    def same_localidad(point_idx, geometry_idx):
+        # Igual que barrios['localidad'] == loca: NaN no coincide con nada
+        return pd.Series(apartment_localidad[point_idx]).eq(pd.Series(barrio_localidad[geometry_idx])).to_numpy()
+
+    return first_containing(apartments['longitud'], apartments['latitud'], barrios.geometry.values, same_localidad)
+
+def get_localidades(apartments: pd.DataFrame, localidades: gpd.GeoDataFrame) -> pd.Series:
+    """
+    Returns the localidad of every apartment, with the same results as applying get_localidad to every row.
+
+    Args:
+    - apartments (pd.DataFrame): The apartments, with 'longitud' and 'latitud' columns.
+    - localidades (gpd.GeoDataFrame): The localidades polygons.
+
+    Returns:
+    - pd.Series: The normalized localidad name of every apartment, or np.nan.
+    """
+    position = first_containing(apartments['longitud'], apartments['latitud'], localidades.geometry.values)
+    return pd.Series(localidad_names(localidades)[position], index=apartments.index, dtype=object)
+
+def get_barrios(apartments: pd.DataFrame, barrios: gpd.GeoDataFrame) -> pd.Series:
+    """
+    Returns the barrio of every apartment among the barrios of its localidad, with the same results as
+    applying get_barrio to every row.
+
+    Args:
+    - apartments (pd.DataFrame): The apartments, with 'longitud', 'latitud' and 'localidad' columns.
+    - barrios (gpd.GeoDataFrame): The barrios polygons, with 'barriocomu' and 'localidad' columns.
+
+    Returns:
+    - pd.Series: The barrio of every apartment, or np.nan.
+    """
+    names = np.append(barrios['barriocomu'].to_numpy(dtype=object), np.nan)
+    return pd.Series(names[barrio_positions(apartments, barrios)], index=apartments.index, dtype=object)
@@ -1,3 +1,4 @@
+import pandas as pd
 import numpy as np
 import re
 
@@ -203,5 +204,96 @@ def check_vigilancia(x):
         return 1 if any(re.findall(r'VIGILANCIA', str(x))) else 0
     else:
         return 0
-    
-    
\ No newline at end of file
+
+# Amenity flags extracted by extract_all_features and the exact items that set them
+AMENITY_FLAGS = {
+    'jacuzzi': ['JACUZZI'],
+    'chimenea': ['CHIMENEA'],
+    'permite_mascotas': ['PERMITE MASCOTAS', 'ADMITE MASCOTAS'],
+    'gimnasio': ['GIMNASIO'],
+    'ascensor': ['ASCENSOR'],
+    'conjunto_cerrado': ['CONJUNTO CERRADO'],
+    'piscina': ['PISCINA'],
+    'salon_comunal': ['SALÓN COMUNAL'],
+    'terraza': ['TERRAZA'],
+}
+
+def _to_int(value):
+    """
+    Converts a string to int like the extract_* functions do, returning np.nan if it fails.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _number_after(item, prefix):
+    """
+    Returns how an item decides 'piso' or 'closets' in extract_piso and extract_closets.
+
+    Args:
+    - item: An item of the 'caracteristicas' lists.
+    - prefix (str): The prefix of the item holding the number.
+
+    Returns:
+    - tuple: (decisive, value), decisive is False if the loop goes on to the next item.
+    """
+    if type(item) != str:
+        return True, np.nan
+    if not item.startswith(prefix):
+        return False, np.nan
+    parts = item.split(' ')
+    return True, _to_int(parts[1]) if len(parts) > 1 else np.nan
+
+def _first_decisive(rows, codes, decisive, values, n):
+    """
+    Returns the value of the first decisive item of every row (np.nan if there is none).
+    """
+    result = np.full(n, np.nan)
+    mask = decisive[codes]
+    first_rows, first = np.unique(rows[mask], return_index=True)
+    result[first_rows] = values[codes[mask][first]]
+    return result
+
+def extract_all_features(caracteristicas: pd.Series) -> pd.DataFrame:
+    """
+    Extracts every amenity flag plus 'piso' and 'closets' from the 'caracteristicas' column in a
+    single pass, with the same results as the check_* and extract_* functions.
+
+    The lists are exploded once and their items are factorized, so every distinct item is only
+    checked once and the features of every row are computed with NumPy indexing on the codes.
+
+    Args:
+    - caracteristicas (pd.Series): The lists of amenities (anything that is not a list has none).
+
+    Returns:
+    - pd.DataFrame: One column per feature, with the index of `caracteristicas`.
+    """
+    n = len(caracteristicas)
+    values = pd.Series(caracteristicas.to_numpy(), dtype=object)
+    exploded = values[values.map(type) == list].explode()
+    rows = exploded.index.to_numpy()
+
+    # Los items vacios (listas vacias o NaN) quedan con el codigo -1, el ultimo de las tablas
+    codes, uniques = pd.factorize(exploded.to_numpy(), use_na_sentinel=True)
+    items = list(uniques) + [np.nan]
+
+    columns = list(AMENITY_FLAGS)
+    token_column = {token: i for i, column in enumerate(columns) for token in AMENITY_FLAGS[column]}
+    item_column = np.array([token_column.get(item, -1) if type(item) == str else -1 for item in items])
+    item_vigilancia = np.array([type(item) == str and 'VIGILANCIA' in item for item in items])
+
+    flags = np.zeros((n, len(columns) + 1), dtype='int64')
+    flags[rows, item_column[codes]] = 1
+    features = pd.DataFrame(flags[:, :-1], columns=columns, index=caracteristicas.index)
+
+    for column, prefix in (('piso', 'PISO '), ('closets', 'CLOSETS')):
+        decisive, numbers = zip(*(_number_after(item, prefix) for item in items))
+        features[column] = _first_decisive(rows, codes, np.array(decisive), np.array(numbers, dtype='float64'), n)
+
+    vigilancia = np.zeros(n, dtype='int64')
+    vigilancia[rows[item_vigilancia[codes]]] = 1
+    features['vigilancia'] = vigilancia
+
+    return features[['jacuzzi', 'piso', 'closets', 'chimenea', 'permite_mascotas', 'gimnasio', 'ascensor',
+                     'conjunto_cerrado', 'piscina', 'salon_comunal', 'terraza', 'vigilancia']]
@@ -0,0 +1,134 @@
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import pyarrow as pa
+import pandas as pd
+import os
+
+IMAGES_PATH = 'data/processed/images.parquet'
+IMAGES_CSV_PATH = 'data/processed/images.csv'
+
+# Every URL is split in a shared prefix (scheme, host and directory), its own path and a shared
+# suffix (query string, e.g. habi's '?d=400x400'); the repeated columns are dictionary-encoded
+SCHEMA = pa.schema([
+    ('codigo', pa.dictionary(pa.int32(), pa.string())),
+    ('url_prefix', pa.dictionary(pa.int32(), pa.string())),
+    ('url_path', pa.string()),
+    ('url_suffix', pa.dictionary(pa.int32(), pa.string())),
+])
+
+def split_url(url: str) -> tuple:
+    """
+    Splits an image URL in its prefix (up to the last '/' of the path), path and suffix (query string).
+
+    Args:
+    - url (str): The URL.
+
+    Returns:
+    - tuple: (prefix, path, suffix), their concatenation is the URL.
+    """
+    address, mark, query = url.partition('?')
+    directory, slash, name = address.rpartition('/')
+    return directory + slash, name, mark + query
+
+class ImagesWriter(object):
+    """
+    Streams the images of the listings into a zstd-compressed Parquet file, one row group per batch.
+
+    Only the codes and image lists of every batch are read, without building an exploded frame, so
+    memory is bounded by the batch size. The file is written to `path + '.tmp'` and only replaces
+    `path` when it is closed, so a failed run never leaves a truncated file.
+
+    Args:
+    - path (str): The Parquet file.
+    """
+
+    def __init__(self, path: str = IMAGES_PATH):
+        self.path = path
+        self.rows = 0
+        self.writer = pq.ParquetWriter(path + '.tmp', SCHEMA, compression='zstd', use_dictionary=True)
+
+    def write(self, codigos, imagenes):
+        """
+        Appends the images of a batch of listings.
+
+        Args:
+        - codigos (iterable): The codes of the listings.
+        - imagenes (iterable): The image URLs of every listing (anything that is not a list has none).
+
+        Returns:
+        - int: The number of images written.
+        """
+        columns = ([], [], [], [])
+        for codigo, urls in zip(codigos, imagenes):
+            if type(urls) != list:
+                continue
+            for url in urls:
+                if type(url) != str:
+                    continue
+                prefix, path, suffix = split_url(url)
+                for column, value in zip(columns, (str(codigo), prefix, path, suffix)):
+                    column.append(value)
+
+        if columns[0]:
+            arrays = [pa.array(column, pa.string()) for column in columns]
+            arrays = [array.dictionary_encode() if field.type != pa.string() else array
+                      for array, field in zip(arrays, SCHEMA)]
+            self.writer.write_table(pa.Table.from_arrays(arrays, schema=SCHEMA))
+            self.rows += len(columns[0])
+        return len(columns[0])
+
+    def close(self):
+        """
+        Finishes the file.
+        """
+        self.writer.close()
+        os.replace(self.path + '.tmp', self.path)
+
+def read_images(path: str = IMAGES_PATH) -> pd.DataFrame:
+    """
+    Reads an images file back as a 'codigo', 'url_imagen' DataFrame.
+
+    Args:
+    - path (str): The Parquet file.
+
+    Returns:
+    - pd.DataFrame: One row per image.
+    """
+    table = pq.read_table(path)
+    url = pc.binary_join_element_wise(
+        *(table[column].cast(pa.string()) for column in ('url_prefix', 'url_path', 'url_suffix')), ''
+    )
+    return pd.DataFrame({
+        'codigo': table['codigo'].cast(pa.string()).to_pandas(),
+        'url_imagen': url.to_pandas(),
+    })
+
+def export_csv(path: str = IMAGES_PATH, csv_path: str = IMAGES_CSV_PATH):
+    """
+    Exports an images file to a 'codigo', 'url_imagen' CSV file for the public release.
+    """
+    read_images(path).to_csv(csv_path, index=False)
+
+def merge_images(path: str, delta_path: str, codigos: set):
+    """
+    Merges the images of the listings processed in an incremental run into an existing images file.
+
+    Every image of `codigos` is removed from the existing file and the images of `delta_path` are
+    appended, then the delta file is removed.
+
+    Args:
+    - path (str): The images file.
+    - delta_path (str): The images of this run.
+    - codigos (set): The codes of the listings processed in this run.
+    """
+    tables = []
+    if os.path.exists(path):
+        existing = pq.read_table(path)
+        keep = pc.invert(pc.is_in(existing['codigo'].cast(pa.string()), pa.array(list(codigos), pa.string())))
+        tables.append(existing.filter(keep))
+    tables.append(pq.read_table(delta_path))
+
+    merged = pa.concat_tables(tables).unify_dictionaries()
+    pq.write_table(merged, path + '.tmp', compression='zstd', use_dictionary=True)
+    os.replace(path + '.tmp', path)
+    os.remove(delta_path)
@@ -0,0 +1,121 @@
+from datetime import datetime
+from src import interchange
+import pandas as pd
+import hashlib
+import json
+import os
+
+STATE_DIR = 'data/interim/incremental'
+WATERMARK_PATH = os.path.join(STATE_DIR, 'watermark.json')
+HASHES_PATH = os.path.join(STATE_DIR, 'content_hashes.csv')
+DELTA_PATH = os.path.join(STATE_DIR, 'delta_codigos.csv')
+PENDING_SUFFIX = '.pending'
+
+def is_enabled() -> bool:
+    """
+    Returns True if the ETL runs in incremental mode (ETL_INCREMENTAL environment variable).
+    """
+    return os.getenv('ETL_INCREMENTAL', '').lower() in ('1', 'true', 'yes')
+
+def read_watermark():
+    """
+    Returns the `last_view`/`datetime` watermark of the last successful incremental run, or None.
+    """
+    if not os.path.exists(WATERMARK_PATH):
+        return None
+    with open(WATERMARK_PATH) as file:
+        return datetime.fromisoformat(json.load(file)['watermark'])
+
+def watermark_query(watermark) -> dict:
+    """
+    Returns the MongoDB filter of the raw documents seen or created since the watermark.
+
+    Args:
+    - watermark (datetime): The watermark, or None to read every document.
+
+    Returns:
+    - dict: The filter.
+    """
+    if watermark is None:
+        return {}
+    return {'$or': [{'last_view': {'$gte': watermark}}, {'datetime': {'$gte': watermark}}]}
+
+def content_hash(record: dict) -> str:
+    """
+    Returns a hash of the content of a listing, ignoring `last_view` (bumped on every crawl).
+
+    Args:
+    - record (dict): The listing.
+
+    Returns:
+    - str: The hex digest.
+    """
+    content = {key: value for key, value in record.items() if key != 'last_view'}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def load_hashes() -> dict:
+    """
+    Returns the content hash of every listing processed by the last successful run.
+    """
+    if not os.path.exists(HASHES_PATH):
+        return {}
+    hashes = pd.read_csv(HASHES_PATH, dtype=str)
+    return dict(zip(hashes['codigo'], hashes['hash']))
+
+def save_pending(watermark, hashes: dict, delta: list):
+    """
+    Saves the new watermark and hashes as pending, and the codes of the listings to process in this run.
+
+    The pending state only replaces the current one when the last stage calls `commit`, so a run that fails
+    half-way is fully repeated by the next one.
+
+    Args:
+    - watermark (datetime): The new watermark, or None to keep the current one.
+    - hashes (dict): The content hash of every listing.
+    - delta (list): The codes of the new or modified listings.
+    """
+    os.makedirs(STATE_DIR, exist_ok=True)
+    current = read_watermark()
+    watermark = watermark or current
+    with open(WATERMARK_PATH + PENDING_SUFFIX, 'w') as file:
+        json.dump({'watermark': watermark.isoformat() if watermark else None}, file)
+
+    pd.DataFrame({'codigo': list(hashes.keys()), 'hash': list(hashes.values())}).to_csv(HASHES_PATH + PENDING_SUFFIX, index=False)
+    pd.DataFrame({'codigo': delta}, dtype=str).to_csv(DELTA_PATH, index=False)
+
+def delta_codigos() -> set:
+    """
+    Returns the codes of the new or modified listings of the current incremental run.
+    """
+    return set(pd.read_csv(DELTA_PATH, dtype=str)['codigo'])
+
+def merge_into(path: str, delta_df: pd.DataFrame, codigos: set):
+    """
+    Merges the rows of the listings processed in this run into an existing Feather file.
+
+    Every row of `codigos` is removed from the existing file (so listings dropped by the
+    corrections disappear too) and the rows of `delta_df` are appended.
+
+    Args:
+    - path (str): The Feather file (see src/interchange.py).
+    - delta_df (pd.DataFrame): The processed rows of this run.
+    - codigos (set): The codes of the listings processed in this run.
+
+    Returns:
+    - pd.DataFrame: The merged data.
+    """
+    if os.path.exists(path):
+        existing = interchange.read_frame(path)
+        existing = existing.loc[~existing['codigo'].astype(str).isin(codigos)]
+        delta_df = pd.concat([existing, delta_df], ignore_index=True)
+
+    interchange.write_frame(delta_df, path)
+    return delta_df
+
+def commit():
+    """
+    Promotes the pending watermark and hashes once the last stage finished successfully.
+    """
+    for path in (WATERMARK_PATH, HASHES_PATH):
+        if os.path.exists(path + PENDING_SUFFIX):
+            os.replace(path + PENDING_SUFFIX, path)
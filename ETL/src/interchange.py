@@ -0,0 +1,218 @@
+from src import proximity
+import pyarrow as pa
+import pandas as pd
+import numpy as np
+import os
+
+INTERIM_PATH = 'data/interim/apartments.feather'
+PROCESSED_PATH = 'data/processed/apartments.feather'
+PROCESSED_CSV_PATH = 'data/processed/apartments.csv'
+
+# Tipos de las columnas de los apartamentos en todas las etapas del ETL
+SCHEMA = {
+    'codigo': 'string',
+    'tipo_propiedad': 'category',
+    'tipo_operacion': 'category',
+    'precio_venta': 'float64',
+    'precio_arriendo': 'float64',
+    'area': 'float64',
+    'habitaciones': 'float32',
+    'banos': 'float32',
+    'administracion': 'float64',
+    'parqueaderos': 'float32',
+    'sector': 'category',
+    'estrato': 'float32',
+    'antiguedad': 'category',
+    'estado': 'category',
+    'latitud': 'float64',
+    'longitud': 'float64',
+    'direccion': 'string',
+    'descripcion': 'string',
+    'compañia': 'category',
+    'website': 'category',
+    'datetime': 'datetime64[ns]',
+    'last_view': 'datetime64[ns]',
+    'url': 'string',
+    'timeline': 'string',
+    'jacuzzi': 'int8',
+    'piso': 'float32',
+    'closets': 'float32',
+    'chimenea': 'int8',
+    'permite_mascotas': 'int8',
+    'gimnasio': 'int8',
+    'ascensor': 'int8',
+    'conjunto_cerrado': 'int8',
+    'piscina': 'int8',
+    'salon_comunal': 'int8',
+    'terraza': 'int8',
+    'vigilancia': 'int8',
+    'coords_modified': 'bool',
+    'localidad': 'category',
+    'barrio': 'category',
+    'estacion_tm_cercana': 'category',
+    'distancia_estacion_tm_m': 'float64',
+    'is_cerca_estacion_tm': 'int8',
+    'parque_cercano': 'category',
+    'distancia_parque_m': 'float64',
+    'is_cerca_parque': 'int8',
+}
+
+# Distancias a los vecinos mas cercanos y conteos por radio de cada capa de puntos (ver src/proximity.py)
+SCHEMA.update(proximity.feature_schema())
+
+# Tipo en disco de cada tipo del esquema (las categorias se guardan como texto)
+ARROW_TYPES = {
+    'string': pa.string(),
+    'category': pa.string(),
+    'float64': pa.float64(),
+    'float32': pa.float32(),
+    'int8': pa.int8(),
+    'Int16': pa.int16(),
+    'bool': pa.bool_(),
+    'datetime64[ns]': pa.timestamp('ns'),
+}
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts the columns of a DataFrame to the dtypes declared in SCHEMA. Texts are kept as they were
+    written to the CSV files (e.g. 'timeline' is the text of the list) and columns that are not in the
+    schema are left as they are.
+
+    Args:
+    - df (pd.DataFrame): The apartments.
+
+    Returns:
+    - pd.DataFrame: The apartments with the declared dtypes.
+    """
+    df = df.copy()
+    for column, dtype in SCHEMA.items():
+        if column not in df.columns:
+            continue
+        if dtype == 'string':
+            df[column] = df[column].map(str, na_action='ignore').astype('string')
+        elif dtype == 'category':
+            df[column] = df[column].astype('string').astype('category')
+        elif dtype.startswith('datetime'):
+            df[column] = pd.to_datetime(df[column], errors='coerce').astype(dtype)
+        elif dtype == 'bool':
+            df[column] = df[column].fillna(False).astype(bool)
+        elif dtype == 'int8':
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(dtype)
+        elif dtype == 'Int16':
+            # Entero nulo: un conteo faltante (p. ej. de filas anteriores a la capa) no es 0
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    return df
+
+def arrow_schema(columns) -> pa.Schema:
+    """
+    Returns the on-disk schema of a set of columns (every column must be declared in SCHEMA).
+    """
+    return pa.schema([(column, ARROW_TYPES[SCHEMA[column]]) for column in columns])
+
+def to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Converts a DataFrame with the declared dtypes to an Arrow table with the on-disk schema.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if SCHEMA.get(column) == 'category':
+            df[column] = df[column].astype('string')
+    return pa.Table.from_pandas(df, schema=arrow_schema(df.columns), preserve_index=False)
+
+class FrameWriter(object):
+    """
+    Writes the apartments to a Feather (Arrow IPC) file batch by batch, casting every batch to the
+    declared schema. The file is written next to its destination and moved into place on close.
+
+    Args:
+    - path (str): The Feather file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.writer = None
+
+    def write(self, df: pd.DataFrame):
+        """
+        Appends a batch of apartments.
+        """
+        table = to_table(apply_schema(df))
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path + '.tmp', table.schema)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self, columns=None):
+        """
+        Finishes the file. If no batch was written, an empty file with `columns` is written.
+        """
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path + '.tmp', arrow_schema(columns or []))
+        self.writer.close()
+        os.replace(self.path + '.tmp', self.path)
+
+def write_frame(df: pd.DataFrame, path: str):
+    """
+    Writes the apartments to a Feather (Arrow IPC) file with the declared schema.
+
+    Args:
+    - df (pd.DataFrame): The apartments.
+    - path (str): The Feather file.
+    """
+    writer = FrameWriter(path)
+    if len(df.columns):
+        writer.write(df)
+    writer.close(list(df.columns))
+
+def read_frame(path: str) -> pd.DataFrame:
+    """
+    Reads the apartments from a Feather file, memory-mapped, with the declared dtypes.
+
+    Args:
+    - path (str): The Feather file.
+
+    Returns:
+    - pd.DataFrame: The apartments.
+    """
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return apply_schema(table.to_pandas())
+
+def export_csv(df: pd.DataFrame, path: str = PROCESSED_CSV_PATH):
+    """
+    Exports the apartments to a CSV file for the public release.
+    """
+    df.to_csv(path, index=False)
+
+def is_csv_export_enabled() -> bool:
+    """
+    Returns True if the processed data is also exported to CSV (ETL_EXPORT_CSV environment variable).
+    """
+    return os.getenv('ETL_EXPORT_CSV', '').lower() in ('1', 'true', 'yes')
+
+def to_records(df: pd.DataFrame) -> list:
+    """
+    Converts the apartments to a list of dicts of Python values that can be stored in MongoDB: NumPy
+    scalars become Python numbers, timestamps become datetimes and missing values become NaN (as they
+    were when the data was read from CSV).
+
+    Args:
+    - df (pd.DataFrame): The apartments.
+
+    Returns:
+    - list: One dict per apartment.
+    """
+    def to_python(value):
+        if value is None or value is pd.NA or value is pd.NaT:
+            return np.nan
+        if isinstance(value, pd.Timestamp):
+            return value.to_pydatetime()
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    columns = {column: [to_python(value) for value in df[column].astype(object)] for column in df.columns}
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
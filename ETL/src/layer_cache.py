@@ -0,0 +1,192 @@
+from unidecode import unidecode
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import hashlib
+import shapely
+import glob
+import os
+
+CACHE_DIR = 'data/interim/cache/layers'
+VERSION = 1
+
+LOCALIDADES_PATH = 'data/external/localidades_bogota/loca.shp'
+BARRIOS_PATH = 'data/external/barrios_bogota/barrios.geojson'
+PARKS_PATH = 'data/external/espacios_para_deporte_bogota/directorio-parques-y-escenarios-2023-datos-abiertos-v1.0.csv'
+SITP_PATH = 'data/external/paraderos_zonales_SITP/Paraderos_Zonales_del_SITP.csv'
+TRANSMILENIO_PATH = 'data/external/estaciones_troncales_tm/estaciones-de-transmilenio.geojson'
+
+def normalize_names(values: pd.Series) -> pd.Series:
+    """
+    Normalizes names like normalize_text (unaccented and uppercase), normalizing every distinct name once.
+    Values that are not strings are kept as they are.
+
+    Args:
+    - values (pd.Series): The names.
+
+    Returns:
+    - pd.Series: The normalized names.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    names = np.array([unidecode(name).upper() if type(name) == str else name for name in uniques] + [np.nan], dtype=object)
+    return pd.Series(names[codes], index=values.index, dtype=object)
+
+def hash_files(paths: list, digest=None):
+    """
+    Adds the source files to a hash: every file of a shapefile (.shp, .dbf, .prj...) or the file itself.
+
+    Args:
+    - paths (list): The source files.
+    - digest: The hash to update, a new sha1 by default.
+
+    Returns:
+    - The updated hash.
+    """
+    digest = digest or hashlib.sha1()
+    for path in paths:
+        stem = os.path.splitext(path)[0]
+        for source in sorted(glob.glob(glob.escape(stem) + '.*')):
+            with open(source, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(block)
+    return digest
+
+def add_bounds(layer: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """
+    Adds the 'minx', 'miny', 'maxx' and 'maxy' bounds of every geometry.
+    """
+    bounds = shapely.bounds(np.asarray(layer.geometry.values))
+    for i, column in enumerate(('minx', 'miny', 'maxx', 'maxy')):
+        layer[column] = bounds[:, i]
+    return layer
+
+def read_localidades(path: str) -> gpd.GeoDataFrame:
+    """
+    Reads the localidades polygons and adds their normalized name as 'localidad'.
+    """
+    localidades = gpd.read_file(path)
+    localidades['localidad'] = normalize_names(localidades['LocNombre'])
+    return add_bounds(localidades)
+
+def read_barrios(path: str) -> gpd.GeoDataFrame:
+    """
+    Reads the barrios polygons with normalized 'barriocomu' and 'localidad' names, and the localidad
+    corrections of stage 02.
+    """
+    barrios = gpd.read_file(path)
+    barrios['barriocomu'] = normalize_names(barrios['barriocomu'])
+    barrios['localidad'] = normalize_names(barrios['localidad'])
+
+    barrios.loc[barrios['localidad'] == 'RAFAEL URIBE', 'localidad'] = 'RAFAEL URIBE URIBE'
+    barrios.loc[barrios['localidad'].isna(), 'localidad'] = 'SUBA'
+    return add_bounds(barrios)
+
+def read_parks(path: str) -> pd.DataFrame:
+    """
+    Reads the parks and adds their normalized localidad as 'localidad'.
+    """
+    parques = pd.read_csv(path)
+    parques['localidad'] = normalize_names(parques['LOCALIDAD'])
+    return parques
+
+def read_sitp(path: str) -> pd.DataFrame:
+    """
+    Reads the SITP zonal bus stops and normalizes their localidad.
+    """
+    paraderos = pd.read_csv(path, encoding='utf-8-sig')
+    paraderos['localidad'] = normalize_names(paraderos['localidad'])
+    return paraderos
+
+def read_transmilenio(path: str) -> pd.DataFrame:
+    """
+    Reads the TransMilenio stations bundled with the repository, with the columns of the ArcGIS service
+    (see transmilenio.py).
+    """
+    stations = pd.DataFrame(gpd.read_file(path).drop(columns='geometry'))
+    stations['latitud_estacion'] = stations['coord_y']
+    stations['longitud_estacion'] = stations['coord_x']
+    return stations
+
+# Capas externas: archivo fuente, funcion que lo lee y normaliza, y si tiene geometrias
+LAYERS = {
+    'localidades': {'path': LOCALIDADES_PATH, 'read': read_localidades, 'geometry': True},
+    'barrios': {'path': BARRIOS_PATH, 'read': read_barrios, 'geometry': True},
+    'parques': {'path': PARKS_PATH, 'read': read_parks, 'geometry': False},
+    'paraderos_sitp': {'path': SITP_PATH, 'read': read_sitp, 'geometry': False},
+    'transmilenio': {'path': TRANSMILENIO_PATH, 'read': read_transmilenio, 'geometry': False},
+}
+
+def layer_key(name: str) -> str:
+    """
+    Returns the key of the cache of a layer: a hash of its source files and of the cache version.
+    """
+    digest = hashlib.sha1(f'{VERSION}:{name}'.encode('utf-8'))
+    return hash_files([LAYERS[name]['path']], digest).hexdigest()
+
+def cache_path(name: str, key: str, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Returns the cache file of a version of a layer.
+    """
+    return os.path.join(cache_dir, f'{name}-{key[:16]}.feather')
+
+def build_layer(name: str, cache_dir: str = CACHE_DIR):
+    """
+    Reads and normalizes a layer from its source file and saves it to the cache as a Feather file,
+    removing the cached versions of older sources.
+
+    Args:
+    - name (str): The layer, a key of LAYERS.
+    - cache_dir (str): The cache directory.
+
+    Returns:
+    - The layer (a GeoDataFrame, or a DataFrame for layers without geometries).
+    """
+    config = LAYERS[name]
+    layer = config['read'](config['path']).reset_index(drop=True)
+
+    path = cache_path(name, layer_key(name), cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    layer.to_feather(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    for old in glob.glob(os.path.join(glob.escape(cache_dir), f'{name}-*.feather')):
+        if old != path:
+            os.remove(old)
+    return layer
+
+def load_layer(name: str, cache_dir: str = CACHE_DIR, rebuild: bool = False):
+    """
+    Loads a layer from the cache, building it if its source files changed. The geometries come prepared,
+    so the containment tests of stage 02 skip the preparation.
+
+    Args:
+    - name (str): The layer, a key of LAYERS.
+    - cache_dir (str): The cache directory.
+    - rebuild (bool): Rebuild the cache even if it is up to date.
+
+    Returns:
+    - The layer (a GeoDataFrame, or a DataFrame for layers without geometries).
+    """
+    path = cache_path(name, layer_key(name), cache_dir)
+    if rebuild or not os.path.exists(path):
+        layer = build_layer(name, cache_dir)
+    elif LAYERS[name]['geometry']:
+        layer = gpd.read_feather(path)
+    else:
+        layer = pd.read_feather(path)
+
+    if LAYERS[name]['geometry']:
+        shapely.prepare(np.asarray(layer.geometry.values))
+    return layer
+
+def build_layers(names: list = None, cache_dir: str = CACHE_DIR) -> list:
+    """
+    Rebuilds the cache of every layer (or of `names`).
+
+    Returns:
+    - list: The cache files.
+    """
+    paths = []
+    for name in names or list(LAYERS):
+        build_layer(name, cache_dir)
+        paths.append(cache_path(name, layer_key(name), cache_dir))
+    return paths
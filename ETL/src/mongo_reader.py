@@ -0,0 +1,66 @@
+import pandas as pd
+
+# Fields of the raw documents used by the ETL, in the order of the interim CSV. Every other field (e.g. the
+# featured_* lists, duplicated in 'caracteristicas') is left out of the projection. The heavy fields are all
+# consumed: 'descripcion' and 'timeline' are columns of the processed apartments, 'imagenes' goes to the images
+# file (src/images.py) and 'caracteristicas' to the amenity features (src/extract_features.py, src/amenities.py)
+RAW_COLUMNS = [
+    'codigo', 'tipo_propiedad', 'tipo_operacion', 'precio_venta', 'precio_arriendo', 'area', 'habitaciones',
+    'banos', 'administracion', 'parqueaderos', 'sector', 'estrato', 'antiguedad', 'estado', 'latitud',
+    'longitud', 'direccion', 'caracteristicas', 'descripcion', 'compañia', 'imagenes', 'website', 'datetime',
+    'last_view', 'url', 'timeline',
+]
+
+NUMERIC_COLUMNS = [
+    'precio_venta', 'precio_arriendo', 'area', 'habitaciones', 'banos', 'administracion', 'parqueaderos',
+    'estrato', 'latitud', 'longitud',
+]
+
+def to_frame(docs: list, columns: list = RAW_COLUMNS) -> pd.DataFrame:
+    """
+    Builds a DataFrame with a fixed set of columns from a batch of raw documents.
+
+    Every chunk gets the same columns (missing fields are filled with NaN) and the numeric
+    columns are stored as float64, so chunks can be appended to the same CSV consistently.
+
+    Args:
+    - docs (list): The raw documents.
+    - columns (list): The columns of the DataFrame.
+
+    Returns:
+    - pd.DataFrame: The chunk.
+    """
+    df = pd.DataFrame.from_records(docs, columns=columns)
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    return df
+
+def read_chunks(collection, chunk_size: int = 5000, query: dict = None, columns: list = RAW_COLUMNS):
+    """
+    Reads a MongoDB collection in chunks of at most `chunk_size` documents.
+
+    Only `columns` are sent by the server (the `_id` is excluded), and only one chunk of
+    documents is held in memory at a time.
+
+    Args:
+    - collection (pymongo.collection.Collection): The collection to read.
+    - chunk_size (int): The number of documents per chunk.
+    - query (dict, optional): The filter of the documents.
+    - columns (list): The fields to read.
+
+    Yields:
+    - pd.DataFrame: The chunks.
+    """
+    projection = {column: 1 for column in columns}
+    projection['_id'] = 0
+
+    batch = []
+    for doc in collection.find(query or {}, projection, batch_size=chunk_size):
+        batch.append(doc)
+        if len(batch) >= chunk_size:
+            yield to_frame(batch, columns)
+            batch = []
+
+    if batch:
+        yield to_frame(batch, columns)
@@ -0,0 +1,188 @@
+import pandas as pd
+import numpy as np
+
+EARTH_RADIUS_M = 6371000 # radio de la tierra en metros, el mismo de haversine_m
+CHUNK_SIZE = 1 << 22 # pares apartamento-punto evaluados a la vez sin indice espacial
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Calculates the distance in meters between arrays of points with the same Haversine formula as
+    haversine_m of stage 03. The arguments broadcast against each other.
+
+    Args:
+    - lat1, lon1 (array-like): The first points, in degrees.
+    - lat2, lon2 (array-like): The second points, in degrees.
+
+    Returns:
+    - np.ndarray: The distances in meters.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype='float64')) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def unit_vectors(latitud: np.ndarray, longitud: np.ndarray) -> np.ndarray:
+    """
+    Returns the points as 3D unit vectors. The straight-line distance between two of them grows with the
+    great-circle distance, so the nearest vectors are the nearest points on the sphere.
+    """
+    lat, lon = np.radians(latitud), np.radians(longitud)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def to_degrees(values) -> np.ndarray:
+    """
+    Returns coordinates as a float array, with NaN for missing or invalid values.
+    """
+    return pd.to_numeric(pd.Series(np.asarray(values, dtype=object)), errors='coerce').to_numpy(dtype='float64')
+
+class PointIndex(object):
+    """
+    A nearest-neighbour index over a layer of points (stations, parks...).
+
+    The points are indexed in a KD-tree of unit vectors (scipy is only needed here; without it every
+    query is answered with a NumPy kernel over chunks of CHUNK_SIZE pairs) and the distances of the
+    results are computed with the Haversine formula. Points without coordinates are skipped and
+    repeated coordinates are indexed once, at their first position, so the nearest point is the
+    first one at the minimum distance, as np.argmin and idxmin return it. Counts within a radius
+    include every repeated point, and so do the neighbours of `nearest` with repeated=True.
+
+    Args:
+    - latitud (array-like): The latitudes of the points, in degrees.
+    - longitud (array-like): The longitudes of the points, in degrees.
+    - chunk_size (int): The pairs evaluated at a time by the NumPy kernel.
+    """
+
+    def __init__(self, latitud, longitud, chunk_size: int = CHUNK_SIZE):
+        latitud, longitud = to_degrees(latitud), to_degrees(longitud)
+        valid = np.flatnonzero(np.isfinite(latitud) & np.isfinite(longitud))
+        _, first = np.unique(np.column_stack([latitud[valid], longitud[valid]]), axis=0, return_index=True)
+
+        self.positions = valid[np.sort(first)]
+        self.latitud = latitud[self.positions]
+        self.longitud = longitud[self.positions]
+        self.all_positions = valid
+        self.all_latitud = latitud[valid]
+        self.all_longitud = longitud[valid]
+        self.chunk_size = chunk_size
+
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            cKDTree = None
+        self.tree = cKDTree(unit_vectors(self.latitud, self.longitud)) if cKDTree and len(self.positions) else None
+        self.count_tree = self.tree
+        if self.tree is not None and len(valid) > len(self.positions):
+            self.count_tree = cKDTree(unit_vectors(self.all_latitud, self.all_longitud))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def brute_force(self, latitud: np.ndarray, longitud: np.ndarray, k: int, points: tuple) -> np.ndarray:
+        """
+        Returns the k nearest of the (latitud, longitud) `points` to every point with the NumPy kernel,
+        comparing each point with every indexed point in chunks of rows.
+        """
+        points_lat, points_lon = points
+        rows = max(1, self.chunk_size // len(points_lat))
+        nearest = np.empty((len(latitud), k), dtype='int64')
+        for start in range(0, len(latitud), rows):
+            end = start + rows
+            distances = haversine_m(latitud[start:end, None], longitud[start:end, None], points_lat, points_lon)
+            if k == 1:
+                nearest[start:end, 0] = np.argmin(distances, axis=1)
+                continue
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < len(points_lat) else np.broadcast_to(np.arange(k), distances.shape)
+            order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1, kind='stable')
+            nearest[start:end] = np.take_along_axis(candidates, order, axis=1)
+        return nearest
+
+    def nearest(self, latitud, longitud, k: int = 1, repeated: bool = False) -> tuple:
+        """
+        Returns the k nearest points of the layer to every point, closest first.
+
+        Args:
+        - latitud (array-like): The latitudes of the points, in degrees.
+        - longitud (array-like): The longitudes of the points, in degrees.
+        - k (int): The number of neighbours.
+        - repeated (bool): Return every point at a repeated coordinate, not only the first one.
+
+        Returns:
+        - tuple: The (n, k) distances in meters and positions in the layer of the neighbours, NaN and -1
+          for points without coordinates or when the layer has less than k points.
+        """
+        latitud, longitud = to_degrees(latitud), to_degrees(longitud)
+        distances = np.full((len(latitud), k), np.nan)
+        positions = np.full((len(latitud), k), -1, dtype='int64')
+
+        if repeated:
+            tree, points_lat, points_lon, points = self.count_tree, self.all_latitud, self.all_longitud, self.all_positions
+        else:
+            tree, points_lat, points_lon, points = self.tree, self.latitud, self.longitud, self.positions
+
+        found = min(k, len(points))
+        valid = np.isfinite(latitud) & np.isfinite(longitud)
+        if not found or not valid.any():
+            return distances, positions
+
+        lat, lon = latitud[valid], longitud[valid]
+        if tree is not None:
+            _, nearest = tree.query(unit_vectors(lat, lon), k=found)
+            nearest = nearest.reshape(len(lat), found)
+        else:
+            nearest = self.brute_force(lat, lon, found, (points_lat, points_lon))
+
+        distances[valid, :found] = haversine_m(lat[:, None], lon[:, None], points_lat[nearest], points_lon[nearest])
+        positions[valid, :found] = points[nearest]
+        return distances, positions
+
+    def count_within(self, latitud, longitud, radii) -> np.ndarray:
+        """
+        Returns the number of points of the layer within every radius of every point.
+
+        Args:
+        - latitud (array-like): The latitudes of the points, in degrees.
+        - longitud (array-like): The longitudes of the points, in degrees.
+        - radii (list): The radii in meters.
+
+        Returns:
+        - np.ndarray: The (n, len(radii)) counts, 0 for points without coordinates.
+        """
+        latitud, longitud = to_degrees(latitud), to_degrees(longitud)
+        counts = np.zeros((len(latitud), len(radii)), dtype='int64')
+        valid = np.isfinite(latitud) & np.isfinite(longitud)
+        if not len(self) or not valid.any():
+            return counts
+
+        lat, lon = latitud[valid], longitud[valid]
+        if self.count_tree is not None:
+            vectors = unit_vectors(lat, lon)
+            for j, radius in enumerate(radii):
+                # Cuerda de la esfera unitaria que corresponde al radio sobre la superficie
+                chord = 2 * np.sin(radius / (2 * EARTH_RADIUS_M))
+                counts[valid, j] = self.count_tree.query_ball_point(vectors, chord, return_length=True)
+            return counts
+
+        rows = max(1, self.chunk_size // len(self.all_latitud))
+        found = np.empty((len(lat), len(radii)), dtype='int64')
+        for start in range(0, len(lat), rows):
+            end = start + rows
+            distances = haversine_m(lat[start:end, None], lon[start:end, None], self.all_latitud, self.all_longitud)
+            for j, radius in enumerate(radii):
+                found[start:end, j] = (distances <= radius).sum(axis=1)
+        counts[valid] = found
+        return counts
+
+def nearest_names(index: PointIndex, names, latitud, longitud) -> tuple:
+    """
+    Returns the name of and distance to the nearest point of a layer for every point.
+
+    Args:
+    - index (PointIndex): The index of the layer.
+    - names (array-like): The names of the points of the layer.
+    - latitud, longitud (array-like): The points, in degrees.
+
+    Returns:
+    - tuple: The names (NaN if there is none) and distances in meters.
+    """
+    distances, positions = index.nearest(latitud, longitud)
+    names = np.append(np.asarray(names, dtype=object), np.nan)
+    return names[positions[:, 0]], distances[:, 0]
@@ -0,0 +1,14 @@
+import sys
+import os
+
+# Raiz del proyecto: las rutas de datos son relativas a ella y contiene el paquete bogota_lotes
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def use_project_root():
+    """
+    Changes the working directory to the project root, to which the data paths are relative, and makes the
+    bogota_lotes package importable, wherever the ETL is run from.
+    """
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
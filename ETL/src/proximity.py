@@ -0,0 +1,77 @@
+from src import nearest
+import pandas as pd
+import numpy as np
+
+CHUNK_ROWS = 50000 # apartamentos consultados a la vez en cada capa
+
+# Capas de puntos de las caracteristicas de proximidad: columnas de coordenadas, vecinos mas cercanos
+# (distancia_<nombre>_<i>_m) y radios en metros de los conteos (n_<nombre>_<radio>m)
+PROXIMITY_LAYERS = [
+    {'name': 'estacion_tm', 'layer': 'transmilenio', 'latitud': 'latitud_estacion', 'longitud': 'longitud_estacion', 'k': 3, 'radii': [500, 1000]},
+    {'name': 'paradero_sitp', 'layer': 'paraderos_sitp', 'latitud': 'latitud', 'longitud': 'longitud', 'k': 3, 'radii': [300, 500, 1000]},
+    {'name': 'parque', 'layer': 'parques', 'latitud': 'LATITUD', 'longitud': 'LONGITUD', 'k': 3, 'radii': [500, 1000]},
+]
+
+def distance_columns(config: dict) -> list:
+    """
+    Returns the k-nearest distance columns of a layer.
+    """
+    return [f'distancia_{config["name"]}_{i}_m' for i in range(1, config['k'] + 1)]
+
+def count_columns(config: dict) -> list:
+    """
+    Returns the count columns of a layer.
+    """
+    return [f'n_{config["name"]}_{radius}m' for radius in config['radii']]
+
+def feature_schema(layers: list = PROXIMITY_LAYERS) -> dict:
+    """
+    Returns the dtypes of the proximity features, for the schema of src/interchange.py. The counts are
+    nullable, so rows processed before a layer was added keep them missing instead of 0.
+    """
+    schema = {}
+    for config in layers:
+        schema.update({column: 'float64' for column in distance_columns(config)})
+        schema.update({column: 'Int16' for column in count_columns(config)})
+    return schema
+
+def proximity_features(apartments: pd.DataFrame, layers: dict, config: list = PROXIMITY_LAYERS, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Computes the distances to the k nearest points and the number of points within several radii of
+    every apartment, for every point layer of `config`.
+
+    Every layer is indexed once (see src/nearest.py) and queried in chunks of `chunk_rows` apartments,
+    so memory is bounded by the chunk and not by apartments x points.
+
+    Args:
+    - apartments (pd.DataFrame): The apartments, with 'latitud' and 'longitud' columns.
+    - layers (dict): The point layers, by the 'layer' name of `config`.
+    - config (list): The layers and their features (see PROXIMITY_LAYERS).
+    - chunk_rows (int): The apartments queried at a time.
+
+    Returns:
+    - pd.DataFrame: The features, with the index of the apartments. Distances are in meters rounded to
+      2 decimals and counts are nullable Int16, both missing for apartments without coordinates. Points
+      at the same coordinates are counted, and are neighbours, once each.
+    """
+    latitud = nearest.to_degrees(apartments['latitud'])
+    longitud = nearest.to_degrees(apartments['longitud'])
+    # Sin ubicacion no se sabe cuantos puntos hay cerca: el conteo queda faltante, no en 0
+    missing = ~(np.isfinite(latitud) & np.isfinite(longitud))
+
+    features = {}
+    for layer in config:
+        points = layers[layer['layer']]
+        index = nearest.PointIndex(points[layer['latitud']], points[layer['longitud']])
+
+        distances = np.empty((len(apartments), layer['k']))
+        counts = np.empty((len(apartments), len(layer['radii'])), dtype='int64')
+        for start in range(0, len(apartments), chunk_rows):
+            end = start + chunk_rows
+            distances[start:end] = index.nearest(latitud[start:end], longitud[start:end], k=layer['k'], repeated=True)[0]
+            counts[start:end] = index.count_within(latitud[start:end], longitud[start:end], layer['radii'])
+
+        features.update(zip(distance_columns(layer), np.round(distances, 2).T))
+        features.update((column, pd.arrays.IntegerArray(values.astype('int16'), missing.copy())) for column, values in zip(count_columns(layer), counts.T))
+
+    return pd.DataFrame(features, index=apartments.index)
@@ -0,0 +1,100 @@
+import logging
+import pandas as pd
+import numpy as np
+
+# Estratos que no se esperan en cada localidad, se consideran datos atipicos
+ESTRATOS_ATIPICOS = {
+    'KENNEDY': [6, 5],
+    'RAFAEL URIBE URIBE': [6, 5],
+    'LA PAZ CENTRAL': [6],
+    'BOSA': [6, 5, 4],
+    'USME': [6, 5, 4, 3],
+    'SAN CRISTOBAL': [6, 5, 4],
+    'CIUDAD BOLIVAR': [6, 5, 4],
+    'FONTIBON': [6],
+    'LOS MARTIRES': [6, 5, 1],
+    'SANTA FE': [6, 5],
+    'TUNJUELITO': [6, 5, 4],
+    'BARRIOS UNIDOS': [1, 2, 6],
+    'TEUSAQUILLO': [1, 2, 6],
+    'ANTONIO NARIÑO': [1, 5, 6],
+    'CANDELARIA': [6, 5, 4],
+}
+
+# Reglas de calidad de los apartamentos de la etapa 02: cada regla describe las filas que se eliminan
+APARTMENT_RULES = [
+    {'name': 'sin_localidad_ni_sector', 'kind': 'all_null', 'columns': ['localidad', 'sector']},
+    {'name': 'estrato_7', 'kind': 'isin', 'column': 'estrato', 'values': [7]},
+    {
+        'name': 'estrato_atipico_en_localidad',
+        'kind': 'combinations',
+        'columns': ['localidad', 'estrato'],
+        'values': [(localidad, estrato) for localidad, estratos in ESTRATOS_ATIPICOS.items() for estrato in estratos],
+    },
+    {'name': 'sin_localidad_ni_barrio', 'kind': 'all_null', 'columns': ['localidad', 'barrio']},
+]
+
+def rule_mask(df: pd.DataFrame, rule: dict) -> np.ndarray:
+    """
+    Evaluates a rule over a DataFrame.
+
+    Supported kinds:
+    - all_null: every column of 'columns' is null.
+    - isin: 'column' is one of 'values'.
+    - combinations: the values of 'columns' are one of the tuples of 'values'.
+
+    Args:
+    - df (pd.DataFrame): The data.
+    - rule (dict): The rule.
+
+    Returns:
+    - np.ndarray: True for the rows the rule drops.
+    """
+    kind = rule['kind']
+    if kind == 'all_null':
+        return df[rule['columns']].isna().all(axis=1).to_numpy()
+    if kind == 'isin':
+        return df[rule['column']].isin(rule['values']).to_numpy()
+    if kind == 'combinations':
+        combinations = pd.DataFrame(rule['values'], columns=rule['columns']).drop_duplicates()
+        combinations['_match'] = True
+        matched = df[rule['columns']].merge(combinations, on=rule['columns'], how='left')['_match']
+        return matched.eq(True).to_numpy()
+    raise ValueError(f'Unknown rule kind: {kind}')
+
+def compile_rules(df: pd.DataFrame, rules: list) -> tuple:
+    """
+    Evaluates every rule and combines them into a single mask of the rows to keep.
+
+    Args:
+    - df (pd.DataFrame): The data.
+    - rules (list): The rules (see `rule_mask`).
+
+    Returns:
+    - tuple: The mask of the rows to keep and the number of rows matched by every rule.
+    """
+    drop = np.zeros(len(df), dtype=bool)
+    counts = {}
+    for rule in rules:
+        mask = rule_mask(df, rule)
+        counts[rule['name']] = int(mask.sum())
+        drop |= mask
+    return ~drop, counts
+
+def apply_rules(df: pd.DataFrame, rules: list) -> pd.DataFrame:
+    """
+    Drops the rows matched by any rule with a single selection, logging how many rows every rule matched
+    (a row matched by several rules is counted in each of them).
+
+    Args:
+    - df (pd.DataFrame): The data.
+    - rules (list): The rules (see `rule_mask`).
+
+    Returns:
+    - pd.DataFrame: The rows no rule matched.
+    """
+    keep, counts = compile_rules(df, rules)
+    for name, count in counts.items():
+        logging.info(f'Regla {name}: {count} filas')
+    logging.info(f'Filas eliminadas por las reglas de calidad: {len(df) - keep.sum()} de {len(df)}')
+    return df.loc[keep]
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from src import layer_cache
+import pandas as pd
+import requests
+import logging
+import json
+import os
+
+TRANSMILENIO_URL = 'https://gis.transmilenio.gov.co/arcgis/rest/services/Troncal/consulta_estaciones_troncales/FeatureServer/0/query?where=1%3D1&outFields=*&outSR=4326&f=json'
+CACHE_PATH = 'data/interim/cache/transmilenio.feather'
+METADATA_PATH = 'data/interim/cache/transmilenio.json'
+VERSION = 2
+TTL_DAYS = 30 # dias, si no se define ETL_TRANSMILENIO_TTL_DAYS
+TIMEOUT = 30 # segundos
+
+# Columnas de las estaciones que usa la etapa 03
+COLUMNS = ['nombre_estacion', 'latitud_estacion', 'longitud_estacion']
+
+def is_refresh_requested() -> bool:
+    """
+    Returns True if the stations must be fetched from the ArcGIS service (ETL_REFRESH_TRANSMILENIO
+    environment variable).
+    """
+    return os.getenv('ETL_REFRESH_TRANSMILENIO', '').lower() in ('1', 'true', 'yes')
+
+def get_ttl_days() -> int:
+    """
+    Returns the days after which the fetched stations are reported as stale, the ETL_TRANSMILENIO_TTL_DAYS
+    environment variable or TTL_DAYS.
+    """
+    return int(os.getenv('ETL_TRANSMILENIO_TTL_DAYS', TTL_DAYS))
+
+def validate_stations(stations: pd.DataFrame) -> pd.DataFrame:
+    """
+    Checks that the stations have every column of COLUMNS and at least one station with coordinates.
+
+    Raises:
+    - ValueError: If they do not.
+    """
+    missing = [column for column in COLUMNS if column not in stations.columns]
+    if missing:
+        raise ValueError(f'The TransMilenio stations have no {missing} columns')
+    coordinates = stations[['latitud_estacion', 'longitud_estacion']].apply(pd.to_numeric, errors='coerce')
+    if not coordinates.notna().all(axis=1).any():
+        raise ValueError('There are no TransMilenio stations with coordinates')
+    return stations
+
+def fetch_stations(url: str = TRANSMILENIO_URL) -> pd.DataFrame:
+    """
+    Gets the stations from the TransMilenio ArcGIS FeatureServer.
+
+    Returns:
+    - pd.DataFrame: The attributes of the stations, with the COLUMNS columns.
+
+    Raises:
+    - ValueError: If the payload has no stations with the COLUMNS columns.
+    """
+    response = requests.get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    features = pd.DataFrame(response.json()['features'])
+    return validate_stations(pd.json_normalize(features['attributes']))
+
+def read_bundled() -> pd.DataFrame:
+    """
+    Reads the stations bundled with the repository through the layer cache, which is rebuilt when the
+    GeoJSON file changes (see layer_cache.py).
+
+    Returns:
+    - pd.DataFrame: The stations, with the COLUMNS columns.
+    """
+    return layer_cache.load_layer('transmilenio')
+
+def read_metadata(cache_path: str = CACHE_PATH, metadata_path: str = METADATA_PATH) -> dict:
+    """
+    Returns the metadata of the stations fetched from the service, or None if there is no cache of the
+    current version.
+    """
+    if not os.path.exists(cache_path) or not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path) as file:
+        metadata = json.load(file)
+    return metadata if metadata.get('version') == VERSION else None
+
+def save_cache(stations: pd.DataFrame, source: str, cache_path: str = CACHE_PATH, metadata_path: str = METADATA_PATH):
+    """
+    Saves the stations fetched from the service to the cache with the source and time they were read.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    stations.reset_index(drop=True).to_feather(cache_path + '.tmp')
+    os.replace(cache_path + '.tmp', cache_path)
+
+    metadata = {'version': VERSION, 'source': source, 'fetched_at': datetime.now().isoformat(), 'rows': len(stations)}
+    with open(metadata_path + '.tmp', 'w') as file:
+        json.dump(metadata, file)
+    os.replace(metadata_path + '.tmp', metadata_path)
+
+def is_stale(metadata: dict, ttl_days: int = None) -> bool:
+    """
+    Returns True if the cached stations are older than the TTL, get_ttl_days() by default.
+    """
+    if ttl_days is None:
+        ttl_days = get_ttl_days()
+    return datetime.now() - datetime.fromisoformat(metadata['fetched_at']) > timedelta(days=ttl_days)
+
+def load_stations(refresh: bool = None) -> pd.DataFrame:
+    """
+    Returns the TransMilenio stations, offline first.
+
+    The stations last fetched from the ArcGIS service are read from the local cache; if they were never
+    fetched, the bundled GeoJSON is read through the layer cache, keyed by the hash of the file. The service
+    is only called when a refresh is requested, and if it fails or returns stations without the COLUMNS
+    columns the local data is used instead. Fetched stations older than the TTL are still used, with a
+    warning.
+
+    Args:
+    - refresh (bool): Fetch the stations from the service, is_refresh_requested() by default.
+
+    Returns:
+    - pd.DataFrame: The stations, with the COLUMNS columns.
+    """
+    if refresh is None:
+        refresh = is_refresh_requested()
+
+    if refresh:
+        try:
+            logging.info('Getting TransMilenio stations data from the ArcGIS service...')
+            stations = fetch_stations()
+            save_cache(stations, TRANSMILENIO_URL)
+            return stations
+        except (requests.RequestException, ValueError, KeyError) as error:
+            logging.warning(f'Could not refresh the TransMilenio stations, using the local data: {error}')
+
+    metadata = read_metadata()
+    if metadata is not None:
+        if is_stale(metadata):
+            logging.warning(f'The TransMilenio stations are from {metadata["fetched_at"]}, refresh them with --refresh-transmilenio')
+        logging.info(f'Reading TransMilenio stations from the cache ({metadata["source"]})')
+        return pd.read_feather(CACHE_PATH)
+
+    logging.info('Reading the bundled TransMilenio stations')
+    return read_bundled()
@@ -0,0 +1,170 @@
+from src import data_enrichment, layer_cache
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import hashlib
+import shapely
+import os
+
+CACHE_PATH = 'data/interim/cache/zone_grid.npz'
+CELL_SIZE = 0.0005 # grados, ~55 m en Bogota
+VERSION = 1
+
+# Valores de las celdas: la posicion del poligono, sin poligono o celda de borde
+NO_ZONE = -1
+BORDER = -2
+
+# Margen de las celdas al buscar bordes, para que el redondeo del indice de un punto nunca lo saque de su celda
+CELL_MARGIN = 1e-9
+
+def sources_hash(paths: list, barrios: gpd.GeoDataFrame, cell_size: float) -> str:
+    """
+    Returns the key of a zone grid: a hash of the source files (every file of a shapefile), of the
+    barrio-localidad relation after the corrections of stage 02 and of the grid parameters.
+
+    Args:
+    - paths (list): The localidades and barrios files.
+    - barrios (gpd.GeoDataFrame): The barrios polygons, with the corrected 'localidad' column.
+    - cell_size (float): The size of the cells in degrees.
+
+    Returns:
+    - str: The hex digest.
+    """
+    digest = layer_cache.hash_files(paths, hashlib.sha1(f'{VERSION}:{cell_size}'.encode('utf-8')))
+    digest.update('|'.join(barrios['localidad'].map(str)).encode('utf-8'))
+    return digest.hexdigest()
+
+def boundary_segments(geometries) -> np.ndarray:
+    """
+    Returns the boundaries of the polygons as single segments, so the test of every cell against them
+    only looks at the few segments near the cell.
+
+    Args:
+    - geometries (array-like): The polygons.
+
+    Returns:
+    - np.ndarray: The segments (LineStrings of two points).
+    """
+    parts = shapely.get_parts(shapely.boundary(np.asarray(geometries)))
+    coordinates, part = shapely.get_coordinates(parts, return_index=True)
+    same_part = part[1:] == part[:-1]
+    return shapely.linestrings(np.stack([coordinates[:-1][same_part], coordinates[1:][same_part]], axis=1))
+
+def build_grid(localidades: gpd.GeoDataFrame, barrios: gpd.GeoDataFrame, cell_size: float = CELL_SIZE, strip: int = 200) -> dict:
+    """
+    Builds a grid over the bounding box of the polygons in which every cell holds the localidad and
+    barrio of all of its points, or BORDER if a boundary of any polygon crosses it.
+
+    A cell that no boundary touches is either fully inside or fully outside every polygon, so the
+    zones of its center (computed like get_localidades and get_barrios) are the zones of all of its
+    points. The cells are classified in strips of columns to bound memory.
+
+    Args:
+    - localidades (gpd.GeoDataFrame): The localidades polygons.
+    - barrios (gpd.GeoDataFrame): The barrios polygons, with 'barriocomu' and 'localidad' columns.
+    - cell_size (float): The size of the cells in degrees.
+    - strip (int): The number of columns of cells classified at a time.
+
+    Returns:
+    - dict: The 'bounds', 'cell_size', 'localidad' and 'barrio' arrays of the grid.
+    """
+    bounds = np.vstack([localidades.total_bounds, barrios.total_bounds])
+    minx, miny = bounds[:, :2].min(axis=0)
+    maxx, maxy = bounds[:, 2:].max(axis=0)
+    nx = int(np.ceil((maxx - minx) / cell_size)) + 1
+    ny = int(np.ceil((maxy - miny) / cell_size)) + 1
+
+    boundaries = shapely.STRtree(boundary_segments(np.concatenate([localidades.geometry.values, barrios.geometry.values])))
+    localidad = np.empty((nx, ny), dtype='int16')
+    barrio = np.empty((nx, ny), dtype='int32')
+    names = data_enrichment.localidad_names(localidades)
+
+    for start in range(0, nx, strip):
+        ix, iy = np.meshgrid(np.arange(start, min(start + strip, nx)), np.arange(ny), indexing='ij')
+        ix, iy = ix.ravel(), iy.ravel()
+        x0, y0 = minx + ix * cell_size, miny + iy * cell_size
+
+        cells = shapely.box(x0 - CELL_MARGIN, y0 - CELL_MARGIN, x0 + cell_size + CELL_MARGIN, y0 + cell_size + CELL_MARGIN)
+        border = np.zeros(len(cells), dtype=bool)
+        border[boundaries.query(cells, predicate='intersects')[0]] = True
+
+        centers = pd.DataFrame({'longitud': x0 + cell_size / 2, 'latitud': y0 + cell_size / 2})
+        cell_localidad = data_enrichment.first_containing(centers['longitud'], centers['latitud'], localidades.geometry.values)
+        centers['localidad'] = names[cell_localidad]
+        cell_barrio = data_enrichment.barrio_positions(centers, barrios)
+
+        localidad[ix, iy] = np.where(border, BORDER, cell_localidad)
+        barrio[ix, iy] = np.where(border, BORDER, cell_barrio)
+
+    return {
+        'bounds': np.array([minx, miny]),
+        'cell_size': np.array(cell_size),
+        'localidad': localidad,
+        'barrio': barrio,
+    }
+
+def load_grid(localidades: gpd.GeoDataFrame, barrios: gpd.GeoDataFrame, paths: list, cache_path: str = CACHE_PATH, cell_size: float = CELL_SIZE) -> dict:
+    """
+    Loads the zone grid from the cache, or builds and caches it if the source files changed.
+
+    Args:
+    - localidades (gpd.GeoDataFrame): The localidades polygons.
+    - barrios (gpd.GeoDataFrame): The barrios polygons, with 'barriocomu' and 'localidad' columns.
+    - paths (list): The localidades and barrios files.
+    - cache_path (str): The cache file.
+    - cell_size (float): The size of the cells in degrees.
+
+    Returns:
+    - dict: The grid (see `build_grid`).
+    """
+    key = sources_hash(paths, barrios, cell_size)
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as file:
+            if str(file['key']) == key:
+                return {name: file[name] for name in ('bounds', 'cell_size', 'localidad', 'barrio')}
+
+    grid = build_grid(localidades, barrios, cell_size)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    np.savez_compressed(cache_path + '.tmp.npz', key=np.array(key), **grid)
+    os.replace(cache_path + '.tmp.npz', cache_path)
+    return grid
+
+def get_zones(apartments: pd.DataFrame, localidades: gpd.GeoDataFrame, barrios: gpd.GeoDataFrame, grid: dict) -> tuple:
+    """
+    Returns the localidad and barrio of every apartment, with the same results as get_localidades and
+    get_barrios: points outside the grid or in an inner cell are resolved with an array read, and only the
+    points in border cells are tested against the polygons.
+
+    Args:
+    - apartments (pd.DataFrame): The apartments, with 'longitud' and 'latitud' columns.
+    - localidades (gpd.GeoDataFrame): The localidades polygons the grid was built from.
+    - barrios (gpd.GeoDataFrame): The barrios polygons the grid was built from.
+    - grid (dict): The grid (see `load_grid`).
+
+    Returns:
+    - tuple: The localidad and barrio Series.
+    """
+    longitud = pd.to_numeric(apartments['longitud'], errors='coerce').to_numpy(dtype='float64')
+    latitud = pd.to_numeric(apartments['latitud'], errors='coerce').to_numpy(dtype='float64')
+    nx, ny = grid['localidad'].shape
+
+    with np.errstate(invalid='ignore'):
+        ix = np.floor((longitud - grid['bounds'][0]) / grid['cell_size'])
+        iy = np.floor((latitud - grid['bounds'][1]) / grid['cell_size'])
+    # La grilla cubre todos los poligonos: los puntos por fuera (o sin coordenadas) no estan en ninguno
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    ix, iy = np.where(inside, ix, 0).astype('int64'), np.where(inside, iy, 0).astype('int64')
+
+    cell_localidad = np.where(inside, grid['localidad'][ix, iy], NO_ZONE)
+    cell_barrio = np.where(inside, grid['barrio'][ix, iy], NO_ZONE)
+
+    barrio_names = np.append(barrios['barriocomu'].to_numpy(dtype=object), np.nan)
+    localidad = pd.Series(data_enrichment.localidad_names(localidades)[np.where(cell_localidad == BORDER, NO_ZONE, cell_localidad)], index=apartments.index, dtype=object)
+    barrio = pd.Series(barrio_names[np.where(cell_barrio == BORDER, NO_ZONE, cell_barrio)], index=apartments.index, dtype=object)
+
+    fallback = cell_localidad == BORDER
+    if fallback.any():
+        localidad[fallback] = data_enrichment.get_localidades(apartments.loc[fallback], localidades)
+        barrio[fallback] = data_enrichment.get_barrios(apartments.loc[fallback].assign(localidad=localidad[fallback]), barrios)
+
+    return localidad, barrio
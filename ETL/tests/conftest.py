@@ -0,0 +1,61 @@
+import sys
+import os
+
+ETL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Los modulos del ETL importan `src` desde la carpeta ETL, como los scripts de las etapas
+if ETL_DIR not in sys.path:
+    sys.path.insert(0, ETL_DIR)
+
+from unidecode import unidecode
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import shapely
+import pytest
+
+LOCALIDADES_NAMES = ['Usaquén', 'CHAPINERO', 'Santa Fe', 'San Cristóbal', 'USME', 'Tunjuelito']
+
+@pytest.fixture(scope='session')
+def localidades():
+    """
+    Six localidades: a 3 x 2 grid of squares, the third one replaced by a triangle that overlaps its neighbour,
+    so the order of the polygons decides the points in both.
+    """
+    polygons = [shapely.box(-74.2 + 0.1 * (i % 3), 4.5 + 0.1 * (i // 3), -74.1 + 0.1 * (i % 3), 4.6 + 0.1 * (i // 3)) for i in range(6)]
+    polygons[2] = shapely.Polygon([(-74.05, 4.5), (-73.9, 4.5), (-74.0, 4.65)])
+    return gpd.GeoDataFrame({'LocNombre': LOCALIDADES_NAMES}, geometry=polygons, crs='EPSG:4326')
+
+@pytest.fixture(scope='session')
+def barrios(localidades):
+    """
+    Four barrios per square localidad (its quarters), one of them with a hole, plus a barrio without localidad.
+    """
+    rows = []
+    for name, polygon in zip(localidades['LocNombre'], localidades.geometry):
+        minx, miny, maxx, maxy = polygon.bounds
+        midx, midy = (minx + maxx) / 2, (miny + maxy) / 2
+        for j, quarter in enumerate([(minx, miny, midx, midy), (midx, miny, maxx, midy), (minx, midy, midx, maxy), (midx, midy, maxx, maxy)]):
+            rows.append({'barriocomu': f'{unidecode(name).upper()} {j}', 'localidad': unidecode(name).upper(), 'geometry': shapely.box(*quarter).intersection(polygon)})
+
+    rows[0]['geometry'] = rows[0]['geometry'].difference(rows[0]['geometry'].centroid.buffer(0.01))
+    rows.append({'barriocomu': 'SIN LOCALIDAD', 'localidad': np.nan, 'geometry': shapely.box(-74.2, 4.5, -74.15, 4.55)})
+    return gpd.GeoDataFrame(rows, geometry='geometry', crs='EPSG:4326')
+
+@pytest.fixture(scope='session')
+def apartments(localidades, barrios):
+    """
+    Random points over and around the polygons, every vertex of the polygons (on their boundaries), and points
+    without valid coordinates.
+    """
+    rng = np.random.default_rng(0)
+    longitud = list(rng.uniform(-74.25, -73.85, 1500))
+    latitud = list(rng.uniform(4.45, 4.75, 1500))
+
+    vertices = shapely.get_coordinates(np.concatenate([localidades.geometry.values, barrios.geometry.values]))
+    longitud += list(vertices[:, 0])
+    latitud += list(vertices[:, 1])
+
+    longitud += [np.nan, -74.15, None, 'x', '-74.15']
+    latitud += [4.55, np.nan, 4.55, 4.55, '4.55']
+    return pd.DataFrame({'longitud': pd.Series(longitud, dtype=object), 'latitud': pd.Series(latitud, dtype=object)})
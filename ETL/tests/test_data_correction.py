@@ -0,0 +1,26 @@
+from src import data_correction
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+def cedritos():
+    barrios = gpd.GeoDataFrame({'barriocomu': ['CEDRITOS']}, geometry=[shapely.box(-74.05, 4.71, -74.03, 4.73)])
+    localidades = gpd.GeoDataFrame({'LocNombre': ['USAQUEN']}, geometry=[shapely.box(-74.1, 4.7, -74.0, 4.8)])
+    return barrios, localidades
+
+def listings(codigos):
+    return pd.DataFrame({
+        'codigo': codigos, 'sector': 'CEDRITOS', 'localidad': 'SUBA', 'barrio': None,
+        'latitud': 4.6, 'longitud': -74.1, 'coords_modified': False,
+    })
+
+def test_corrected_coordinates_only_depend_on_the_listing():
+    barrios, localidades = cedritos()
+    full = data_correction.correct_locations(listings(['A', 'B', 'C']), barrios, localidades).set_index('codigo')
+    delta = data_correction.correct_locations(listings(['C']), barrios, localidades).set_index('codigo')
+
+    # Una corrida incremental da al apartamento las mismas coordenadas que una completa
+    pd.testing.assert_frame_equal(full.loc[['C']], delta)
+    assert full['latitud'].nunique() == 3
+    assert shapely.contains_xy(barrios.geometry.iloc[0], full['longitud'], full['latitud']).all()
+    assert full['coords_modified'].all() and (full['localidad'] == 'USAQUEN').all()
@@ -0,0 +1,45 @@
+from src import data_enrichment
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import shapely
+import pytest
+import os
+
+LOCALIDADES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'external', 'localidades_bogota', 'loca.shp')
+
+def row_wise_localidades(apartments, localidades):
+    return apartments.apply(data_enrichment.get_localidad, axis=1, localidades=localidades)
+
+def row_wise_barrios(apartments, barrios):
+    return apartments.apply(data_enrichment.get_barrio, axis=1, barrios=barrios)
+
+def test_get_localidades(apartments, localidades):
+    expected = row_wise_localidades(apartments, localidades)
+    result = data_enrichment.get_localidades(apartments, localidades)
+    pd.testing.assert_series_equal(result, expected, check_dtype=False)
+    assert expected.notna().any() and expected.isna().any()
+
+def test_get_barrios(apartments, localidades, barrios):
+    apartments = apartments.assign(localidad=row_wise_localidades(apartments, localidades))
+    expected = row_wise_barrios(apartments, barrios)
+    result = data_enrichment.get_barrios(apartments, barrios)
+    pd.testing.assert_series_equal(result, expected, check_dtype=False)
+    assert expected.notna().any() and expected.isna().any()
+
+def test_first_containing_takes_the_first_polygon():
+    polygons = np.array([shapely.box(0, 0, 2, 2), shapely.box(1, 1, 3, 3), shapely.box(0, 0, 3, 3)])
+    positions = data_enrichment.first_containing([0.5, 1.5, 2.5, 2, 4], [0.5, 1.5, 2.5, 1, 4], polygons)
+    # (2, 1) esta en el borde del primer poligono y dentro del tercero
+    assert positions.tolist() == [0, 0, 1, 2, -1]
+
+def test_first_containing_without_points():
+    positions = data_enrichment.first_containing([], [], np.array([shapely.box(0, 0, 1, 1)]))
+    assert positions.tolist() == []
+
+@pytest.mark.skipif(not os.path.exists(LOCALIDADES_PATH), reason='the localidades shapefile is not available')
+def test_get_localidades_of_bogota():
+    localidades = gpd.read_file(LOCALIDADES_PATH)
+    rng = np.random.default_rng(1)
+    points = pd.DataFrame({'longitud': rng.uniform(-74.25, -73.95, 400), 'latitud': rng.uniform(4.45, 4.85, 400)})
+    pd.testing.assert_series_equal(data_enrichment.get_localidades(points, localidades), row_wise_localidades(points, localidades), check_dtype=False)
@@ -0,0 +1,89 @@
+from src import extract_features
+import pandas as pd
+import numpy as np
+import pytest
+
+# Funciones fila a fila que reemplaza extract_all_features, por columna
+ROW_FUNCTIONS = {
+    'jacuzzi': extract_features.check_jacuzzi,
+    'piso': extract_features.extract_piso,
+    'closets': extract_features.extract_closets,
+    'chimenea': extract_features.check_chimeny,
+    'permite_mascotas': extract_features.check_mascotas,
+    'gimnasio': extract_features.check_gimnasio,
+    'ascensor': extract_features.check_ascensor,
+    'conjunto_cerrado': extract_features.check_conjunto_cerrado,
+    'piscina': extract_features.check_piscina,
+    'salon_comunal': extract_features.check_salon_comunal,
+    'terraza': extract_features.check_terraza,
+    'vigilancia': extract_features.check_vigilancia,
+}
+
+ITEMS = [
+    'JACUZZI', 'CHIMENEA', 'PERMITE MASCOTAS', 'ADMITE MASCOTAS', 'GIMNASIO', 'ASCENSOR', 'CONJUNTO CERRADO',
+    'PISCINA', 'SALÓN COMUNAL', 'TERRAZA', 'VIGILANCIA', 'VIGILANCIA 24H', 'CON VIGILANCIA', 'PISO 3', 'PISO 12',
+    'PISO X', 'PISO ', 'PISO', 'PISOS 2', 'CLOSETS 2', 'CLOSETS', 'CLOSETS A', 'CLOSETS 1 2', 'BALCON', 'ESTUDIO',
+    None, np.nan, 5,
+]
+
+def row_wise_features(caracteristicas: pd.Series) -> pd.DataFrame:
+    """
+    Returns the features computed with the check_* and extract_* functions, as stage 01 used to.
+    """
+    features = pd.DataFrame({column: caracteristicas.apply(function) for column, function in ROW_FUNCTIONS.items()})
+    features['piso'] = features['piso'].astype('float64')
+    features['closets'] = features['closets'].astype('float64')
+    return features
+
+def assert_same_features(caracteristicas: pd.Series):
+    expected = row_wise_features(caracteristicas)
+    result = extract_features.extract_all_features(caracteristicas)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+@pytest.mark.parametrize('caracteristicas', [
+    [],
+    ['JACUZZI', 'PISCINA', 'TERRAZA'],
+    ['PERMITE MASCOTAS'],
+    ['ADMITE MASCOTAS', 'SALÓN COMUNAL'],
+    ['PISO 3', 'CLOSETS 2'],
+    ['PISO 3', 'PISO 12'],
+    ['PISO X', 'CLOSETS A'],
+    ['PISO ', 'CLOSETS'],
+    ['PISO', 'PISOS 2', 'PISO 7'],
+    ['CLOSETS 1 2'],
+    [None, 'PISO 3', 'CLOSETS 2'],
+    ['PISO 3', np.nan, 'CLOSETS 2'],
+    [5, 'JACUZZI'],
+    ['CON VIGILANCIA'],
+    ['VIGILANCIA 24H', 'VIGILANCIA'],
+    ['JACUZZI', 'JACUZZI'],
+])
+def test_list_edge_cases(caracteristicas):
+    assert_same_features(pd.Series([caracteristicas], dtype=object))
+
+@pytest.mark.parametrize('value', [np.nan, None, 'JACUZZI', 'PISO 3', 3])
+def test_values_that_are_not_lists(value):
+    assert_same_features(pd.Series([value, ['JACUZZI', 'PISO 2']], dtype=object))
+
+def test_empty_series():
+    result = extract_features.extract_all_features(pd.Series([], dtype=object))
+    assert list(result.columns) == list(ROW_FUNCTIONS)
+    assert result.empty
+
+def test_keeps_the_index():
+    caracteristicas = pd.Series([['PISO 4'], [], np.nan, ['GIMNASIO']], index=[10, 3, 7, 0], dtype=object)
+    assert_same_features(caracteristicas)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_random_rows(seed):
+    rng = np.random.default_rng(seed)
+
+    def random_row():
+        draw = rng.random()
+        if draw < 0.05:
+            return np.nan
+        if draw < 0.1:
+            return []
+        return [ITEMS[i] for i in rng.choice(len(ITEMS), size=rng.integers(1, 10), replace=False)]
+
+    assert_same_features(pd.Series([random_row() for _ in range(5000)], dtype=object))
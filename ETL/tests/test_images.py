@@ -0,0 +1,24 @@
+from src import images
+import pandas as pd
+import os
+
+def test_writer_replaces_the_file_when_closed(tmp_path):
+    path = str(tmp_path / 'images.parquet')
+    writer = images.ImagesWriter(path)
+    writer.write(['1', 2, '3'], [['https://a.co/img/1.jpg?d=400x400', None], 'x', ['https://a.co/img/3.jpg']])
+    # Una etapa interrumpida no deja un archivo truncado
+    assert not os.path.exists(path)
+
+    writer.close()
+    assert not os.path.exists(path + '.tmp')
+    expected = pd.DataFrame({'codigo': ['1', '3'], 'url_imagen': ['https://a.co/img/1.jpg?d=400x400', 'https://a.co/img/3.jpg']})
+    pd.testing.assert_frame_equal(images.read_images(path), expected, check_dtype=False)
+
+def test_export_csv(tmp_path):
+    path, csv_path = str(tmp_path / 'images.parquet'), str(tmp_path / 'images.csv')
+    writer = images.ImagesWriter(path)
+    writer.write(['1'], [['https://a.co/img/1.jpg']])
+    writer.close()
+
+    images.export_csv(path, csv_path)
+    assert pd.read_csv(csv_path, dtype=str).to_dict('records') == [{'codigo': '1', 'url_imagen': 'https://a.co/img/1.jpg'}]
@@ -0,0 +1,18 @@
+from src import interchange, mongo_reader
+
+def test_projection_only_reads_consumed_fields():
+    # 'imagenes' y 'caracteristicas' se convierten en el archivo de imagenes y las caracteristicas de la etapa 01,
+    # el resto de los campos leidos son columnas de los apartamentos procesados
+    assert set(mongo_reader.RAW_COLUMNS) - {'imagenes', 'caracteristicas'} <= set(interchange.SCHEMA)
+
+def test_read_chunks_projects_the_fields():
+    class Collection(object):
+        def find(self, query, projection, batch_size):
+            self.projection = projection
+            return iter([{'codigo': str(i), 'area': '50'} for i in range(5)])
+
+    collection = Collection()
+    chunks = list(mongo_reader.read_chunks(collection, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert collection.projection == {**{column: 1 for column in mongo_reader.RAW_COLUMNS}, '_id': 0}
+    assert list(chunks[0].columns) == mongo_reader.RAW_COLUMNS and chunks[0]['area'].dtype == 'float64'
@@ -0,0 +1,132 @@
+from src import layer_cache, nearest
+import pandas as pd
+import numpy as np
+import importlib
+import pytest
+import os
+
+enrichment = importlib.import_module('03_data_enrichment')
+
+TRANSMILENIO_PATH = os.path.join(os.path.dirname(__file__), '..', '..', layer_cache.TRANSMILENIO_PATH)
+
+def row_wise_station(row, stations):
+    """
+    The nearest station of stage 03 before the spatial index: every station, with np.argmin over the distances.
+    """
+    distances = [enrichment.haversine_m(row['latitud'], row['longitud'], station['latitud_estacion'], station['longitud_estacion']) for _, station in stations.iterrows()]
+    return stations.loc[np.argmin(distances), 'nombre_estacion'], round(min(distances), 2)
+
+def row_wise_park(row, parques):
+    """
+    The nearest park of stage 03 before the spatial index: idxmin over the distances to every park.
+    """
+    try:
+        distances = parques.apply(lambda park: enrichment.haversine_m(row['latitud'], row['longitud'], park['LATITUD'], park['LONGITUD']), axis=1)
+        park = parques.loc[distances.idxmin()]
+        return 'PARQUE ' + park['TIPO DE PARQUE'] + ' ' + park['NOMBRE DEL PARQUE O ESCENARIO'], round(distances.min(), 2)
+    except Exception:
+        return None, None
+
+def random_points(n, rng) -> tuple:
+    return rng.uniform(4.47, 4.83, n), rng.uniform(-74.22, -74.01, n)
+
+@pytest.fixture(scope='module')
+def apartments():
+    latitud, longitud = random_points(400, np.random.default_rng(0))
+    return pd.DataFrame({'latitud': latitud, 'longitud': longitud})
+
+@pytest.fixture(scope='module')
+def stations():
+    """
+    Stations at random coordinates, some of them repeated with another name.
+    """
+    latitud, longitud = random_points(120, np.random.default_rng(1))
+    stations = pd.DataFrame({'nombre_estacion': [f'ESTACION {i}' for i in range(120)], 'latitud_estacion': latitud, 'longitud_estacion': longitud})
+    repeated = stations.iloc[::10].assign(nombre_estacion=lambda df: df['nombre_estacion'] + ' BIS')
+    return pd.concat([stations, repeated], ignore_index=True)
+
+@pytest.fixture(scope='module')
+def parques():
+    """
+    Parks at random coordinates, some of them without type or name, and some repeated.
+    """
+    rng = np.random.default_rng(2)
+    latitud, longitud = random_points(300, rng)
+    parques = pd.DataFrame({
+        'TIPO DE PARQUE': rng.choice(['VECINAL', 'ZONAL', 'METROPOLITANO', None], 300),
+        'NOMBRE DEL PARQUE O ESCENARIO': [f'PARQUE {i}' if i % 17 else None for i in range(300)],
+        'LATITUD': latitud,
+        'LONGITUD': longitud,
+    })
+    return pd.concat([parques, parques.iloc[::25]], ignore_index=True)
+
+def test_estaciones_tm_cercanas(apartments, stations):
+    expected = apartments.apply(row_wise_station, axis=1, stations=stations, result_type='expand')
+    names, distances = enrichment.estaciones_tm_cercanas(apartments, stations)
+    assert list(names) == list(expected[0])
+    np.testing.assert_array_equal(np.round(distances, 2), expected[1].to_numpy(dtype='float64'))
+
+@pytest.mark.skipif(not os.path.exists(TRANSMILENIO_PATH), reason='the TransMilenio stations are not available')
+def test_estaciones_tm_cercanas_of_bogota(apartments):
+    stations = layer_cache.read_transmilenio(TRANSMILENIO_PATH)
+    expected = apartments.apply(row_wise_station, axis=1, stations=stations, result_type='expand')
+    names, distances = enrichment.estaciones_tm_cercanas(apartments, stations)
+    assert list(names) == list(expected[0])
+    np.testing.assert_array_equal(np.round(distances, 2), expected[1].to_numpy(dtype='float64'))
+
+def test_parques_cercanos(apartments, parques):
+    expected = apartments.apply(row_wise_park, axis=1, parques=parques, result_type='expand')
+    names, distances = enrichment.parques_cercanos(apartments, parques)
+    # None (new) y NaN (expand de la version fila a fila) son ambos un parque faltante
+    assert list(names) == [None if pd.isna(name) else name for name in expected[0]]
+    np.testing.assert_array_equal(distances, expected[1].to_numpy(dtype='float64'))
+
+@pytest.fixture(params=['tree', 'kernel'])
+def index(request, stations):
+    """
+    The index of the stations, queried with the KD-tree or with the NumPy kernel in small chunks.
+    """
+    index = nearest.PointIndex(stations['latitud_estacion'], stations['longitud_estacion'], chunk_size=5000)
+    if request.param == 'kernel':
+        index.tree = index.count_tree = None
+    return index
+
+def distance_matrix(apartments, stations) -> np.ndarray:
+    return nearest.haversine_m(apartments['latitud'].to_numpy()[:, None], apartments['longitud'].to_numpy()[:, None], stations['latitud_estacion'].to_numpy(), stations['longitud_estacion'].to_numpy())
+
+@pytest.mark.parametrize('k', [1, 3])
+@pytest.mark.parametrize('repeated', [False, True])
+def test_k_nearest(index, apartments, stations, k, repeated):
+    distances, positions = index.nearest(apartments['latitud'], apartments['longitud'], k=k, repeated=repeated)
+    matrix = distance_matrix(apartments, stations)
+    if not repeated:
+        # Las coordenadas repetidas solo cuentan en su primera posicion
+        matrix[:, stations.duplicated(['latitud_estacion', 'longitud_estacion']).to_numpy()] = np.inf
+
+    expected = np.sort(matrix, axis=1)[:, :k]
+    np.testing.assert_allclose(distances, expected, rtol=1e-9)
+    np.testing.assert_allclose(np.take_along_axis(matrix, positions, axis=1), expected, rtol=1e-9)
+
+def test_count_within(index, apartments, stations):
+    counts = index.count_within(apartments['latitud'], apartments['longitud'], [500, 1000, 3000])
+    matrix = distance_matrix(apartments, stations)
+    expected = np.column_stack([(matrix <= radius).sum(axis=1) for radius in (500, 1000, 3000)])
+    np.testing.assert_array_equal(counts, expected)
+
+def test_points_without_coordinates(index):
+    distances, positions = index.nearest([4.6, np.nan, None, 'x'], [-74.1, -74.1, -74.1, -74.1], k=2)
+    assert np.isfinite(distances[0]).all() and (positions[0] >= 0).all()
+    assert np.isnan(distances[1:]).all() and (positions[1:] == -1).all()
+    assert index.count_within([np.nan], [-74.1], [1000]).tolist() == [[0]]
+
+def test_layer_smaller_than_k():
+    index = nearest.PointIndex([4.6, np.nan, 4.7], [-74.1, -74.1, -74.1])
+    distances, positions = index.nearest([4.65], [-74.1], k=3)
+    assert positions.tolist() == [[0, 2, -1]] or positions.tolist() == [[2, 0, -1]]
+    assert np.isnan(distances[0, 2])
+
+def test_empty_layer():
+    index = nearest.PointIndex([], [])
+    distances, positions = index.nearest([4.6], [-74.1], k=2)
+    assert np.isnan(distances).all() and (positions == -1).all()
+    assert index.count_within([4.6], [-74.1], [500]).tolist() == [[0]]
@@ -0,0 +1,21 @@
+from src import proximity
+import pandas as pd
+import numpy as np
+
+LAYERS = {
+    'transmilenio': pd.DataFrame({'latitud_estacion': [4.6, 4.601, 4.7], 'longitud_estacion': [-74.1, -74.1, -74.1]}),
+    'paraderos_sitp': pd.DataFrame({'latitud': [4.6], 'longitud': [-74.1]}),
+    'parques': pd.DataFrame({'LATITUD': [], 'LONGITUD': []}),
+}
+
+def test_counts_without_coordinates_are_missing():
+    apartments = pd.DataFrame({'latitud': [4.6, np.nan, 4.6, None, 'x'], 'longitud': [-74.1, -74.1, np.nan, -74.1, -74.1]}, index=[10, 11, 12, 13, 14])
+    features = proximity.proximity_features(apartments, LAYERS, chunk_rows=2)
+
+    counts = features[proximity.count_columns(proximity.PROXIMITY_LAYERS[0])]
+    assert (counts.dtypes == 'Int16').all()
+    assert counts.loc[10].tolist() == [2, 2]
+    assert counts.loc[11:].isna().all().all()
+    assert features.loc[10, 'n_parque_500m'] == 0
+    assert features.loc[11:, proximity.distance_columns(proximity.PROXIMITY_LAYERS[0])].isna().all().all()
+    assert features.index.tolist() == apartments.index.tolist()
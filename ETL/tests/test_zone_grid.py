@@ -0,0 +1,71 @@
+from src import data_enrichment, zone_grid
+import pandas as pd
+import numpy as np
+import pytest
+
+CELL_SIZE = 0.005
+
+@pytest.fixture(scope='module')
+def grid(localidades, barrios):
+    return zone_grid.build_grid(localidades, barrios, CELL_SIZE, strip=7)
+
+def cell_edge_points(grid) -> pd.DataFrame:
+    """
+    Returns points on the edges and corners of the cells, where the index of a point is decided by rounding.
+    """
+    nx, ny = grid['localidad'].shape
+    minx, miny = grid['bounds']
+    ix, iy = np.meshgrid(np.arange(0, nx + 1, 3), np.arange(0, ny + 1, 3), indexing='ij')
+    longitud = np.concatenate([minx + ix.ravel() * CELL_SIZE, minx + ix.ravel() * CELL_SIZE + CELL_SIZE / 2])
+    latitud = np.concatenate([miny + iy.ravel() * CELL_SIZE + CELL_SIZE / 2, miny + iy.ravel() * CELL_SIZE])
+    return pd.DataFrame({'longitud': longitud, 'latitud': latitud})
+
+def bulk_zones(apartments, localidades, barrios) -> tuple:
+    localidad = data_enrichment.get_localidades(apartments, localidades)
+    return localidad, data_enrichment.get_barrios(apartments.assign(localidad=localidad), barrios)
+
+def row_wise_zones(apartments, localidades, barrios) -> tuple:
+    localidad = apartments.apply(data_enrichment.get_localidad, axis=1, localidades=localidades)
+    return localidad, apartments.assign(localidad=localidad).apply(data_enrichment.get_barrio, axis=1, barrios=barrios)
+
+def test_get_zones(apartments, localidades, barrios, grid):
+    points = pd.concat([apartments, cell_edge_points(grid)], ignore_index=True)
+    localidad, barrio = zone_grid.get_zones(points, localidades, barrios, grid)
+    expected_localidad, expected_barrio = bulk_zones(points, localidades, barrios)
+    pd.testing.assert_series_equal(localidad, expected_localidad)
+    pd.testing.assert_series_equal(barrio, expected_barrio)
+
+    # Solo los puntos en celdas de borde se prueban contra los poligonos
+    assert (grid['localidad'] == zone_grid.BORDER).mean() < 0.5
+    assert (grid['localidad'] >= 0).any() and (grid['barrio'] >= 0).any()
+
+def test_get_zones_matches_the_row_wise_functions(apartments, localidades, barrios, grid):
+    localidad, barrio = zone_grid.get_zones(apartments, localidades, barrios, grid)
+    expected_localidad, expected_barrio = row_wise_zones(apartments, localidades, barrios)
+    pd.testing.assert_series_equal(localidad, expected_localidad, check_dtype=False)
+    pd.testing.assert_series_equal(barrio, expected_barrio, check_dtype=False)
+
+def test_get_zones_keeps_the_index(apartments, localidades, barrios, grid):
+    points = apartments.iloc[::-1].set_axis(np.arange(len(apartments)) * 2 + 5)
+    localidad, barrio = zone_grid.get_zones(points, localidades, barrios, grid)
+    expected_localidad, expected_barrio = bulk_zones(points, localidades, barrios)
+    pd.testing.assert_series_equal(localidad, expected_localidad)
+    pd.testing.assert_series_equal(barrio, expected_barrio)
+
+def test_load_grid_uses_the_cache_until_the_sources_change(localidades, barrios, tmp_path, monkeypatch):
+    cache_path = str(tmp_path / 'zone_grid.npz')
+    grid = zone_grid.load_grid(localidades, barrios, [], cache_path, CELL_SIZE)
+
+    def build_grid(*args, **kwargs):
+        raise AssertionError('the grid was rebuilt')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(zone_grid, 'build_grid', build_grid)
+        cached = zone_grid.load_grid(localidades, barrios, [], cache_path, CELL_SIZE)
+    for name in grid:
+        np.testing.assert_array_equal(cached[name], grid[name])
+
+    # Cambiar la relacion barrio-localidad cambia la llave de la grilla
+    changed = barrios.assign(localidad=barrios['localidad'].iloc[::-1].to_numpy())
+    rebuilt = zone_grid.load_grid(localidades, changed, [], cache_path, CELL_SIZE)
+    assert not np.array_equal(rebuilt['barrio'], grid['barrio'])
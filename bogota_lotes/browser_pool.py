@@ -0,0 +1,233 @@
+"""
+This module defines a bounded pool of headless Chrome browsers for the bogota_lotes Scrapy project. Pages are
+rendered in a dedicated thread pool so Selenium never blocks the Twisted/asyncio reactor.
+
+Classes:
+    BrowserPool: A pool of N headless browsers that renders pages off the reactor thread.
+"""
+
+from selenium.webdriver.chrome.options import Options
+from twisted.internet.threads import deferToThread, deferToThreadPool
+from twisted.internet import defer
+from twisted.python.threadpool import ThreadPool
+from fake_useragent import UserAgent
+from selenium import webdriver
+import logging
+import queue
+import time
+
+# URL patterns blocked in the browser, the spiders only need the HTML and its scripts
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.css',
+]
+
+
+class BrowserPool(object):
+    """
+    A bounded pool of headless Chrome browsers that renders pages off the reactor thread.
+
+    Each browser is started on first use and recycled (quit and started again) after
+    `max_pages` renders. Renders run in a thread pool with one thread per browser, so at
+    most `size` pages are rendered at the same time and the rest wait in the pool queue.
+
+    Attributes:
+        size (int): The number of browsers in the pool.
+        max_pages (int): The number of pages a browser renders before it is recycled.
+        block_resources (bool): Whether images, fonts and CSS are blocked in the browser.
+        stats (scrapy.statscollectors.StatsCollector): Collector for the pool metrics.
+
+    Methods:
+        from_crawler(cls, crawler): Returns a pool configured from the crawler settings.
+        render(self, url, implicit_wait=None): Renders a page and returns a Deferred with its source.
+        close(self): Stops the pool off the reactor thread and returns a Deferred that fires once every browser quit.
+    """
+
+    def __init__(self, size=2, max_pages=50, block_resources=True, stats=None):
+        """
+        Initializes a new instance of the BrowserPool class.
+
+        Args:
+            size (int): The number of browsers in the pool.
+            max_pages (int): The number of pages a browser renders before it is recycled.
+            block_resources (bool): Whether images, fonts and CSS are blocked in the browser.
+            stats (scrapy.statscollectors.StatsCollector): Collector for the pool metrics.
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.block_resources = block_resources
+        self.stats = stats
+        self.logger = logging.getLogger(__name__)
+
+        # Idle browser slots, a slot is [driver, pages rendered]; drivers are started lazily
+        self._slots = queue.Queue()
+        for _ in range(size):
+            self._slots.put([None, 0])
+
+        self._threadpool = ThreadPool(minthreads=0, maxthreads=size, name='browser-pool')
+        self._threadpool.start()
+        self._closed = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """
+        Returns a pool configured from the crawler settings.
+
+        Args:
+            crawler (scrapy.crawler.Crawler): The Scrapy crawler.
+
+        Returns:
+            BrowserPool: An instance of the BrowserPool class.
+        """
+        return cls(
+            size=crawler.settings.getint('BROWSER_POOL_SIZE', 2),
+            max_pages=crawler.settings.getint('BROWSER_POOL_MAX_PAGES', 50),
+            block_resources=crawler.settings.getbool('BROWSER_POOL_BLOCK_RESOURCES', True),
+            stats=crawler.stats,
+        )
+
+    def _new_driver(self):
+        """
+        Starts a new headless Chrome browser.
+
+        Returns:
+            selenium.webdriver.Chrome: The browser.
+        """
+        chrome_options = Options()
+        chrome_options.add_argument('--headless=new')  # Run browser in headless mode (no GUI)
+        chrome_options.add_argument('--window-size=1920x1080')  # Set window size to avoid responsive design issues
+        chrome_options.add_argument(f'user-agent={UserAgent().random}')  # Use random user agent to avoid bot detection
+        chrome_options.add_argument('--disk-cache=true')  # Enable disk cache for better performance
+
+        if self.block_resources:
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+            })
+
+        driver = webdriver.Chrome(options=chrome_options)
+
+        if self.block_resources:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+
+        return driver
+
+    def _render(self, url, implicit_wait, submitted):
+        """
+        Renders a page with an idle browser. Runs in a thread of the pool.
+
+        Args:
+            url (str): The URL of the page.
+            implicit_wait (int): Seconds to wait for elements to load, or None.
+            submitted (float): The time the render was requested.
+
+        Returns:
+            tuple: The page source, the seconds spent in the queue and the seconds spent rendering.
+        """
+        slot = self._slots.get()
+        started = time.monotonic()
+        try:
+            if slot[0] is not None and slot[1] >= self.max_pages:
+                slot[0].quit()
+                slot[0], slot[1] = None, 0
+                self.logger.debug('Browser recycled')
+
+            if slot[0] is None:
+                slot[0] = self._new_driver()
+
+            slot[0].get(url)
+            if implicit_wait:
+                slot[0].implicitly_wait(implicit_wait)
+            slot[1] += 1
+
+            return slot[0].page_source, started - submitted, time.monotonic() - started
+        except Exception:
+            # A broken browser is replaced on the next render
+            if slot[0] is not None:
+                try:
+                    slot[0].quit()
+                except Exception:
+                    pass
+            slot[0], slot[1] = None, 0
+            raise
+        finally:
+            self._slots.put(slot)
+
+    def _record(self, result):
+        """
+        Records the metrics of a render in the stats collector.
+
+        Args:
+            result (tuple): The value returned by _render.
+
+        Returns:
+            str: The page source.
+        """
+        page_source, queue_wait, render_time = result
+        if self.stats is not None:
+            self.stats.inc_value('browser_pool/renders')
+            self.stats.inc_value('browser_pool/queue_wait_total', queue_wait)
+            self.stats.max_value('browser_pool/queue_wait_max', queue_wait)
+            self.stats.inc_value('browser_pool/render_time_total', render_time)
+            self.stats.max_value('browser_pool/render_time_max', render_time)
+        return page_source
+
+    def render(self, url, implicit_wait=None):
+        """
+        Renders a page in one of the browsers without blocking the reactor.
+
+        Args:
+            url (str): The URL of the page.
+            implicit_wait (int): Seconds to wait for elements to load, or None.
+
+        Returns:
+            twisted.internet.defer.Deferred: Fires with the page source.
+        """
+        # Importar el reactor aqui: importarlo al cargar el modulo instala el reactor por defecto antes
+        # de que Scrapy instale el de TWISTED_REACTOR
+        from twisted.internet import reactor
+
+        d = deferToThreadPool(reactor, self._threadpool, self._render, url, implicit_wait, time.monotonic())
+        d.addCallback(self._record)
+        return d
+
+    def close(self):
+        """
+        Stops the thread pool and quits every browser in a thread, so the reactor keeps running while the
+        renders in flight finish.
+
+        Returns:
+            twisted.internet.defer.Deferred: Fires once the pool is stopped and every browser has quit.
+        """
+        if self._closed:
+            return defer.succeed(None)
+        self._closed = True
+
+        d = deferToThread(self._shutdown)
+        d.addCallback(lambda _: self._log_stats())
+        return d
+
+    def _shutdown(self):
+        """
+        Waits for the renders in flight, stops the thread pool and quits every browser. Runs off the reactor thread.
+        """
+        self._threadpool.stop()
+        while not self._slots.empty():
+            driver, _ = self._slots.get_nowait()
+            if driver is not None:
+                driver.quit()
+
+    def _log_stats(self):
+        """
+        Logs the number of renders and their mean queue wait and render time.
+        """
+        if self.stats is not None:
+            renders = self.stats.get_value('browser_pool/renders', 0)
+            if renders:
+                self.logger.info(
+                    'Browser pool: %d renders, mean queue wait %.2fs, mean render time %.2fs',
+                    renders,
+                    self.stats.get_value('browser_pool/queue_wait_total', 0) / renders,
+                    self.stats.get_value('browser_pool/render_time_total', 0) / renders,
+                )
@@ -0,0 +1,178 @@
+"""
+This module supports the incremental crawl mode of the bogota_lotes Scrapy project. It keeps a compact snapshot of
+the listings already stored in MongoDB so the spiders can skip the detail page of listings whose search API
+payload has not changed, and bumps their `last_view` in bulk instead.
+
+Classes:
+    ListingIndex: A snapshot of the stored listings of a website used to detect unchanged listings.
+"""
+
+from datetime import datetime
+import logging
+import pymongo
+
+
+def normalize_price(value):
+    """
+    Normalizes a price the same way the ApartmentsItem processors do (int, 0 as None).
+
+    Args:
+        value: The price as returned by an API.
+
+    Returns:
+        int: The price, or None if it is missing or zero.
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value == 0 else value
+
+
+def stored_codigo(doc):
+    """
+    Returns the id of a stored listing in the search payload: its codigo.
+
+    Args:
+        doc (dict): The stored listing.
+
+    Returns:
+        The codigo of the listing.
+    """
+    return doc.get('codigo')
+
+
+class ListingIndex(object):
+    """
+    A snapshot of the stored listings of a website used to detect unchanged listings.
+
+    Attributes:
+        mongo_uri (str): The URI of the MongoDB instance.
+        mongo_db (str): The name of the MongoDB database.
+        collection (str): The name of the raw collection.
+        website (str): The website whose listings are loaded.
+        batch_size (int): The number of `last_view` bumps sent in a single update.
+        key (callable): Returns the id of a stored listing in the search payload (see `stored_codigo`).
+
+    Methods:
+        from_crawler(cls, crawler, website, key): Returns an instance configured from the crawler settings.
+        open(self): Loads the snapshot of the stored listings.
+        is_unchanged(self, listing_id, precio_venta, precio_arriendo): Checks a search payload against the snapshot.
+        touch(self, listing_id): Queues a `last_view` bump for a listing.
+        flush(self): Sends the queued `last_view` bumps.
+        close(self): Flushes and closes the MongoDB client.
+    """
+
+    def __init__(self, mongo_uri, mongo_db, collection, website, batch_size=500, key=stored_codigo):
+        """
+        Initializes a new instance of the ListingIndex class.
+
+        Args:
+            mongo_uri (str): The URI of the MongoDB instance.
+            mongo_db (str): The name of the MongoDB database.
+            collection (str): The name of the raw collection.
+            website (str): The website whose listings are loaded.
+            batch_size (int): The number of `last_view` bumps sent in a single update.
+            key (callable): Returns the id of a stored listing in the search payload.
+        """
+        self.mongo_uri = mongo_uri
+        self.mongo_db = mongo_db
+        self.collection = collection
+        self.website = website
+        self.batch_size = batch_size
+        self.key = key
+        self.logger = logging.getLogger(__name__)
+        self.prices = {}
+        self.codigos = {}
+        self.pending = []
+
+    @classmethod
+    def from_crawler(cls, crawler, website, key=stored_codigo):
+        """
+        Returns an instance configured from the crawler settings.
+
+        Args:
+            crawler (scrapy.crawler.Crawler): The Scrapy crawler.
+            website (str): The website whose listings are loaded.
+            key (callable): Returns the id of a stored listing in the search payload.
+
+        Returns:
+            ListingIndex: An instance of the ListingIndex class.
+        """
+        return cls(
+            mongo_uri=crawler.settings.get('MONGO_URI'),
+            mongo_db=crawler.settings.get('MONGO_DATABASE', 'items'),
+            collection=crawler.settings.get('MONGO_COLLECTION_RAW'),
+            website=website,
+            batch_size=crawler.settings.getint('INCREMENTAL_CRAWL_BATCH_SIZE', 500),
+            key=key,
+        )
+
+    def open(self):
+        """
+        Loads the codigo and prices of every stored listing of the website, by the id of the listing in the search
+        payload.
+        """
+        self.client = pymongo.MongoClient(self.mongo_uri)
+        self.db = self.client[self.mongo_db]
+
+        cursor = self.db[self.collection].find(
+            {'website': self.website},
+            {'_id': 0, 'codigo': 1, 'url': 1, 'precio_venta': 1, 'precio_arriendo': 1}
+        )
+        for doc in cursor:
+            listing_id = self.key(doc)
+            if listing_id is None:
+                continue
+            self.prices[listing_id] = (doc.get('precio_venta'), doc.get('precio_arriendo'))
+            self.codigos[listing_id] = doc['codigo']
+
+        self.logger.info('Loaded %d stored %s listings', len(self.prices), self.website)
+
+    def is_unchanged(self, listing_id, precio_venta=None, precio_arriendo=None):
+        """
+        Checks whether a listing is stored with the same prices as in the search payload.
+
+        Args:
+            listing_id: The id of the listing in the search payload.
+            precio_venta: The sale price in the search payload.
+            precio_arriendo: The rent price in the search payload.
+
+        Returns:
+            bool: True if the listing is stored and its prices did not change.
+        """
+        if listing_id is None or listing_id not in self.prices:
+            return False
+
+        return self.prices[listing_id] == (normalize_price(precio_venta), normalize_price(precio_arriendo))
+
+    def touch(self, listing_id):
+        """
+        Queues a `last_view` bump for a listing that was seen but not re-scraped.
+
+        Args:
+            listing_id: The id of the listing in the search payload.
+        """
+        self.pending.append(self.codigos[listing_id])
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Sets `last_view` on every queued listing with a single update.
+        """
+        if not self.pending:
+            return
+
+        self.db[self.collection].update_many(
+            {'codigo': {'$in': self.pending}},
+            {'$set': {'last_view': datetime.now()}}
+        )
+        self.pending = []
+
+    def close(self):
+        """
+        Flushes the queued `last_view` bumps and closes the MongoDB client.
+        """
+        self.flush()
+        self.client.close()
@@ -0,0 +1,130 @@
+"""
+This module manages the MongoDB indexes of the raw and processed collections of the Bogota Apartments project.
+It is used by the Scrapy pipelines when a spider opens and by the ETL scripts.
+
+Functions:
+    ensure_indexes: Creates (if needed) and verifies the indexes of a collection.
+    report_query_patterns: Logs the query patterns of the project that are not served by an index and the slow
+        queries recorded by the MongoDB profiler.
+"""
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import pymongo
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (field, unique) pairs indexed in both collections
+INDEXES = [
+    ('codigo', True),
+    ('website', False),
+    ('last_view', False),
+    ('datetime', False),
+]
+
+# Filters used by the pipelines and the ETL, checked by report_query_patterns
+QUERY_PATTERNS = [
+    {'codigo': ''},
+    {'codigo': {'$in': ['']}},
+    {'website': ''},
+]
+
+
+def ensure_indexes(collection):
+    """
+    Creates (if needed) and verifies the indexes of a collection.
+
+    If the unique index on `codigo` cannot be built because the collection has duplicated codes, a regular index
+    is created instead and the error is logged, so lookups by `codigo` are still indexed. Fields that already have
+    either index are skipped, so the failing unique build is not retried every time a spider opens or the ETL runs.
+
+    Args:
+        collection (pymongo.collection.Collection): The raw or processed collection.
+
+    Returns:
+        dict: The index information of the collection.
+    """
+    existing = collection.index_information()
+    for field, unique in INDEXES:
+        if f'{field}_1' in existing or f'{field}_nonunique_1' in existing:
+            continue
+        try:
+            collection.create_index([(field, pymongo.ASCENDING)], name=f'{field}_1', unique=unique)
+        except (DuplicateKeyError, OperationFailure) as error:
+            if not unique:
+                raise
+            logger.error('Could not create unique index on %s.%s (%s), creating a non-unique one',
+                         collection.name, field, error)
+            collection.create_index([(field, pymongo.ASCENDING)], name=f'{field}_nonunique_1')
+
+    information = collection.index_information()
+    indexed = {key[0][0] for key in (index['key'] for index in information.values())}
+    missing = [field for field, _ in INDEXES if field not in indexed]
+    if missing:
+        logger.error('Missing indexes on %s: %s', collection.name, missing)
+    else:
+        logger.info('Indexes of %s verified: %s', collection.name, sorted(information))
+
+    return information
+
+
+def plan_stages(plan):
+    """
+    Returns the stages of a query plan, including its nested input stages.
+
+    Args:
+        plan (dict): A plan from the explain output.
+
+    Returns:
+        list: The names of the stages.
+    """
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += plan_stages(child)
+    return stages
+
+
+def report_query_patterns(collection, slow_ms=100):
+    """
+    Logs the query patterns of the project that are not served by an index and the slow or unindexed queries
+    recorded by the MongoDB profiler (only available when profiling is enabled on the database).
+
+    Args:
+        collection (pymongo.collection.Collection): The raw or processed collection.
+        slow_ms (int): The duration from which a profiled query is reported as slow.
+
+    Returns:
+        list: The query patterns resolved with a collection scan.
+    """
+    unindexed = []
+    for pattern in QUERY_PATTERNS:
+        try:
+            plan = collection.find(pattern).explain()['queryPlanner']['winningPlan']
+        except (OperationFailure, KeyError) as error:
+            logger.debug('Could not explain %s: %s', pattern, error)
+            continue
+
+        if 'COLLSCAN' in plan_stages(plan):
+            unindexed.append(pattern)
+            logger.warning('Query %s on %s is not served by an index (COLLSCAN)', pattern, collection.name)
+
+    try:
+        profiled = collection.database['system.profile'].find(
+            {
+                'ns': collection.full_name,
+                '$or': [{'millis': {'$gte': slow_ms}}, {'planSummary': 'COLLSCAN'}],
+            },
+            {'op': 1, 'millis': 1, 'planSummary': 1, 'command.filter': 1},
+        ).sort('ts', pymongo.DESCENDING).limit(20)
+
+        for query in profiled:
+            logger.warning('Slow or unindexed %s on %s: %s ms, %s, filter %s',
+                           query.get('op'), collection.name, query.get('millis'), query.get('planSummary'),
+                           query.get('command', {}).get('filter'))
+    except OperationFailure as error:
+        logger.debug('Could not read the profiler of %s: %s', collection.database.name, error)
+
+    return unindexed
@@ -4,45 +4,90 @@ handles the processing of items and their storage in a MongoDB database.
 
 Classes:
     MongoDBPipeline: A class that handles the processing of items and their storage in a MongoDB database.
+    AsyncMongoDBPipeline: A MongoDBPipeline that writes its batches in a dedicated thread, off the reactor.
+    SpoolPipeline: A class that appends items to local compressed segments, loaded later by bogota_lotes.spool.
 """
 
 # useful for handling different item types with a single interface
 from bogota_lotes.items import ApartmentsItem
+from bogota_lotes.indexes import ensure_indexes, report_query_patterns
 from scrapy.exceptions import DropItem
 from scrapy.utils.project import get_project_settings
+from twisted.internet import defer, task
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+from pymongo import InsertOne, UpdateOne
+from bson import json_util
+from collections import namedtuple
 from datetime import datetime
 import logging
 import pymongo
+import gzip
+import math
+import time
+import os
+
+# Marks a field that is not present in the stored item
+MISSING = object()
+
+# Compact view of a stored item: the tracked prices, the item datetime (only kept while the timeline is empty)
+# and the timeline length (None if the item has no timeline field)
+PriceSnapshot = namedtuple('PriceSnapshot', ['precio_venta', 'precio_arriendo', 'datetime', 'timeline_len'])
 
 class MongoDBPipeline(object):
     """
     A class that handles the processing of items and their storage in a MongoDB database.
 
+    Items are buffered and written with a single bulk_write per batch. A batch is flushed when it reaches
+    `bulk_size` items, every `bulk_interval` seconds (by a LoopingCall, so a partial batch is not held until the next
+    item arrives), and when the spider closes.
+    Price changes are detected against a snapshot of the stored items loaded when the spider opens.
+
     Attributes:
         collection (str): The name of the collection in the MongoDB database.
         mongo_uri (str): The URI of the MongoDB instance.
         mongo_db (str): The name of the MongoDB database.
+        bulk_size (int): The maximum number of items in a batch.
+        bulk_interval (float): The maximum number of seconds between flushes.
 
     Methods:
         from_crawler(cls, crawler): Returns an instance of the class with the specified URI and database name.
-        open_spider(self, spider): Initializes the MongoDB client and database.
-        close_spider(self, spider): Closes the MongoDB client.
-        process_item(self, item, spider): Processes the item and stores it in the MongoDB database.
+        open_spider(self, spider): Initializes the MongoDB client and database, loads the price snapshot and starts the
+            periodic flush.
+        load_snapshot(self): Loads the codigo, prices and timeline length of every stored item.
+        close_spider(self, spider): Stops the periodic flush, flushes the pending items and closes the MongoDB client.
+        process_item(self, item, spider): Processes the item and buffers it for storage in the MongoDB database.
+        add(self, spider_name, data): Buffers the data of an item.
+        flush(self): Writes the buffered items to the MongoDB database.
+        stop_flush_loop(self): Stops the periodic flush.
     """
 
     collection = get_project_settings().get('MONGO_COLLECTION_RAW')
+    flush_loop = None
+
+    # Price fields tracked in the timeline, per spider
+    timeline_fields = {
+        'metrocuadrado': ['precio_venta', 'precio_arriendo'],
+        'habi': ['precio_venta'],
+    }
 
-    def __init__(self, mongo_uri, mongo_db):
+    def __init__(self, mongo_uri, mongo_db, bulk_size=500, bulk_interval=5):
         """
         Initializes a new instance of the MongoDBPipeline class.
 
         Args:
             mongo_uri (str): The URI of the MongoDB instance.
             mongo_db (str): The name of the MongoDB database.
+            bulk_size (int): The maximum number of items in a batch.
+            bulk_interval (float): The maximum number of seconds between flushes.
         """
         self.mongo_uri = mongo_uri
         self.mongo_db = mongo_db
+        self.bulk_size = bulk_size
+        self.bulk_interval = bulk_interval
         self.logger = logging.getLogger(__name__)
+        self.buffer = []
+        self.last_flush = time.monotonic()
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -57,12 +102,15 @@ class MongoDBPipeline(object):
         """
         return cls(
             mongo_uri=crawler.settings.get('MONGO_URI'),
-            mongo_db=crawler.settings.get('MONGO_DATABASE', 'items')
+            mongo_db=crawler.settings.get('MONGO_DATABASE', 'items'),
+            bulk_size=crawler.settings.getint('MONGO_BULK_SIZE', 500),
+            bulk_interval=crawler.settings.getfloat('MONGO_BULK_INTERVAL', 5),
         )
 
     def open_spider(self, spider):
         """
-        Initializes the MongoDB client and database.
+        Initializes the MongoDB client and database, verifies the indexes, loads the price snapshot of the stored
+        items and starts flushing every `bulk_interval` seconds (unless it is infinite).
 
         Args:
             spider (scrapy.Spider): The Scrapy spider.
@@ -71,19 +119,76 @@ class MongoDBPipeline(object):
         self.db = self.client[self.mongo_db]
         # start with a clean database
         # self.db[self.collection].delete_many({})
+        ensure_indexes(self.db[self.collection])
+        report_query_patterns(self.db[self.collection])
+        self.load_snapshot()
+
+        if math.isfinite(self.bulk_interval):
+            self.flush_loop = task.LoopingCall(self.flush)
+            self.flush_loop.start(self.bulk_interval, now=False).addErrback(self.flush_loop_failed)
+
+    def flush_loop_failed(self, failure):
+        """
+        Logs an error raised by the periodic flush, which stops it. Later batches are still flushed by size and when
+        the spider closes.
+
+        Args:
+            failure (twisted.python.failure.Failure): The error raised by flush.
+        """
+        self.logger.error('Periodic flush stopped: %s', failure.getErrorMessage())
+
+    def stop_flush_loop(self):
+        """
+        Stops the periodic flush.
+        """
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        self.flush_loop = None
+
+    def load_snapshot(self):
+        """
+        Streams the codigo, prices and timeline length of every stored item into `self.snapshot`.
+
+        The timeline and the rest of the document never leave the server, so change detection is a dictionary
+        lookup instead of a query per item.
+        """
+        cursor = self.db[self.collection].aggregate([
+            {'$project': {
+                '_id': 0,
+                'codigo': 1,
+                'precio_venta': 1,
+                'precio_arriendo': 1,
+                'datetime': 1,
+                'timeline_len': {'$cond': [{'$isArray': '$timeline'}, {'$size': '$timeline'}, None]},
+            }}
+        ], allowDiskUse=True)
+
+        self.snapshot = {}
+        for doc in cursor:
+            timeline_len = doc.get('timeline_len')
+            self.snapshot[doc['codigo']] = PriceSnapshot(
+                doc.get('precio_venta', MISSING),
+                doc.get('precio_arriendo', MISSING),
+                doc.get('datetime', MISSING) if not timeline_len else None,
+                timeline_len,
+            )
+
+        self.logger.info('Loaded price snapshot of %d items', len(self.snapshot))
 
     def close_spider(self, spider):
         """
-        Closes the MongoDB client.
+        Stops the periodic flush, flushes the pending items and closes the MongoDB client.
 
         Args:
             spider (scrapy.Spider): The Scrapy spider.
         """
+        self.stop_flush_loop()
+        self.flush()
         self.client.close()
 
     def process_item(self, item, spider):
         """
-        Processes the item and stores it in the MongoDB database.
+        Processes the item and buffers it for storage in the MongoDB database.
 
         Args:
             item (scrapy.Item): The Scrapy item.
@@ -92,88 +197,464 @@ class MongoDBPipeline(object):
         Returns:
             scrapy.Item: The processed Scrapy item.
         """
-        data = dict(ApartmentsItem(item))
+        self.add(spider.name, dict(ApartmentsItem(item)))
+        return item
 
-        if spider.name == 'metrocuadrado':
-            existing_item = self.db[self.collection].find_one({'codigo': data['codigo']})
-            data['caracteristicas'] = []
+    def add(self, spider_name, data):
+        """
+        Buffers the data of an item, flushing the buffer when it is full or old enough.
+
+        Args:
+            spider_name (str): The name of the spider that scraped the item.
+            data (dict): The item data.
+        """
+        if spider_name == 'metrocuadrado':
+            # setdefault: the items of a spooled batch already have their caracteristicas
+            data.setdefault('caracteristicas', [])
             for key in ['featured_interior', 'featured_exterior', 'featured_zona_comun', 'featured_sector']:
                 if key in data:
                     data['caracteristicas'] += data[key]
                     del data[key]
 
-            if existing_item:
-                existing_item['last_view'] = datetime.now()
-
-                if 'timeline' not in existing_item:
-                    existing_item['timeline'] = []
-
-                try:
-                    fields = ['precio_venta', 'precio_arriendo']
-                    
-                    for field in fields:
-                        if field in data and field in existing_item and data[field] != existing_item[field]:
-                            if len(existing_item['timeline']) == 0:
-                                existing_item['timeline'].append({
-                                    'fecha': existing_item['datetime'],
-                                    field: existing_item[field],
-                                })
-
-                            existing_item['timeline'].append({
-                                'fecha': datetime.now(),
-                                field: data[field],
-                            })
-                            
-                            existing_item[field] = data[field]
-                except KeyError:
-                    self.logger.error('Error al actualizar el item: %s', data['codigo'])
-                    pass
-                
-                # Actualiza el item en la base de datos
-                self.db[self.collection].update_one({'codigo': data['codigo']}, {'$set': existing_item})
+        elif spider_name == 'metrocuadrado_search':
+            return
 
-            else:
-                # Inserta el item en la base de datos si no existe
-                self.db[self.collection].insert_one(data)
+        self.buffer.append((spider_name, data))
 
-            return item
+        if len(self.buffer) >= self.bulk_size or time.monotonic() - self.last_flush >= self.bulk_interval:
+            self.flush()
+
+    def timeline_update(self, snapshot, data, fields):
+        """
+        Builds the server-side update of a stored item: new prices with $set and their timeline entries with $push.
+
+        Args:
+            snapshot (PriceSnapshot): The snapshot of the stored item.
+            data (dict): The scraped item.
+            fields (list): The price fields tracked in the timeline.
+
+        Returns:
+            tuple: The update document and the new snapshot of the item.
+        """
+        now = datetime.now()
+        set_fields = {'last_view': now}
+        timeline = []
+        prices = snapshot._asdict()
+
+        for field in fields:
+            if field in data and prices[field] is not MISSING and data[field] != prices[field]:
+                if snapshot.timeline_len in (None, 0) and not timeline:
+                    if snapshot.datetime is MISSING:
+                        self.logger.error('Error al actualizar el item: %s', data['codigo'])
+                        break
+
+                    timeline.append({
+                        'fecha': snapshot.datetime,
+                        field: prices[field],
+                    })
+
+                timeline.append({
+                    'fecha': now,
+                    field: data[field],
+                })
+
+                set_fields[field] = data[field]
+                prices[field] = data[field]
 
-        elif spider.name == 'habi':
-            existing_item = self.db[self.collection].find_one({'codigo': data['codigo']})
-            if existing_item:
-                existing_item['last_view'] = datetime.now()
-                
-                if 'timeline' not in existing_item:
-                    existing_item['timeline'] = []
-
-                try:
-                    # Actualiza el precio de venta si ha cambiado
-                    if data['precio_venta'] != existing_item['precio_venta']:
-                        if len(existing_item['timeline']) == 0:
-                            existing_item['timeline'].append({
-                                'fecha': existing_item['datetime'],
-                                'precio_venta': existing_item['precio_venta'],
-                            })
-
-                        existing_item['timeline'].append({
-                            'fecha': datetime.now(),
-                            'precio_venta': data['precio_venta'],
-                        })
-                        
-                        existing_item['precio_venta'] = data['precio_venta']
-                except KeyError:
-                    pass
-
-                self.db[self.collection].update_one({'codigo': data['codigo']}, {'$set': existing_item})
+        update = {'$set': set_fields}
+        if timeline:
+            update['$push'] = {'timeline': {'$each': timeline}}
+        elif snapshot.timeline_len is None:
+            set_fields['timeline'] = []
 
+        timeline_len = (snapshot.timeline_len or 0) + len(timeline)
+        prices['datetime'] = None if timeline_len else snapshot.datetime
+        prices['timeline_len'] = timeline_len
+        return update, PriceSnapshot(**prices)
+
+    def flush(self):
+        """
+        Writes the buffered items to the MongoDB database.
+        """
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+
+        buffer, self.buffer = self.buffer, []
+        self.write_batch(buffer)
+
+    def write_batch(self, buffer):
+        """
+        Writes a batch of items to the MongoDB database.
+
+        Changes are detected against the price snapshot: new items are upserted by `codigo` and existing items only
+        get their `last_view`, changed prices and timeline entries updated, all in a single bulk_write.
+
+        Args:
+            buffer (list): The (spider name, item data) pairs of the batch.
+        """
+        requests = []
+        # Snapshots of the batch, applied to self.snapshot only once the batch is written: if the write fails, the
+        # items of the batch are still upserted the next time they are seen
+        snapshots = {}
+        for name, data in buffer:
+            if name not in self.timeline_fields:
+                requests.append(InsertOne(data))
+                continue
+
+            snapshot = snapshots.get(data['codigo']) or self.snapshot.get(data['codigo'])
+            if snapshot:
+                # Actualiza el item en la base de datos
+                update, snapshots[data['codigo']] = self.timeline_update(snapshot, data, self.timeline_fields[name])
+                requests.append(UpdateOne({'codigo': data['codigo']}, update))
             else:
                 # Inserta el item en la base de datos si no existe
-                self.db[self.collection].insert_one(data)
+                requests.append(UpdateOne({'codigo': data['codigo']}, {'$set': data}, upsert=True))
+                snapshots[data['codigo']] = PriceSnapshot(
+                    data.get('precio_venta', MISSING),
+                    data.get('precio_arriendo', MISSING),
+                    data.get('datetime', MISSING),
+                    None,
+                )
 
+        # ordered: an item repeated in the batch is updated after it is inserted
+        self.db[self.collection].bulk_write(requests, ordered=True)
+        self.snapshot.update(snapshots)
+        self.logger.debug('Flushed %d items', len(requests))
+
+
+class AsyncMongoDBPipeline(MongoDBPipeline):
+    """
+    A MongoDBPipeline that writes its batches in a dedicated thread, off the reactor.
+
+    Batches are written in order by a single writer thread, so slow writes no longer stall downloads and parsing.
+    At most `max_pending_batches` batches can wait for the writer; past that, process_item returns a Deferred that
+    fires once a batch is written, which makes Scrapy hold new items (backpressure) until storage catches up.
+
+    Queue depth and write latency are reported in the mongodb/* stats. A batch that cannot be written is saved as a
+    spool segment in `spool_dir`, to be loaded later with `python -m bogota_lotes.spool`.
+
+    Attributes:
+        max_pending_batches (int): The maximum number of batches waiting for the writer thread.
+        spool_dir (str): The directory of the segments of the failed batches.
+        stats (scrapy.statscollectors.StatsCollector): Collector for the writer metrics.
+
+    Methods:
+        from_crawler(cls, crawler): Returns an instance of the class configured from the crawler settings.
+        open_spider(self, spider): Initializes the MongoDB client, the price snapshot and the writer thread.
+        close_spider(self, spider): Flushes, waits for the pending batches and closes the MongoDB client.
+        process_item(self, item, spider): Buffers the item, waiting if the writer queue is full.
+        flush(self): Hands the buffered items to the writer thread.
+        spool_batch(self, buffer): Saves a batch that could not be written as spool segments.
+    """
+
+    max_pending_batches = 4
+    spool_dir = 'data/spool'
+    stats = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """
+        Returns an instance of the class configured from the crawler settings.
+
+        Args:
+            crawler (scrapy.crawler.Crawler): The Scrapy crawler.
+
+        Returns:
+            AsyncMongoDBPipeline: An instance of the AsyncMongoDBPipeline class.
+        """
+        pipeline = super().from_crawler(crawler)
+        pipeline.max_pending_batches = crawler.settings.getint('MONGO_WRITER_QUEUE_SIZE', 4)
+        pipeline.spool_dir = crawler.settings.get('SPOOL_DIR', 'data/spool')
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    def open_spider(self, spider):
+        """
+        Initializes the MongoDB client, the price snapshot and the writer thread.
+
+        Args:
+            spider (scrapy.Spider): The Scrapy spider.
+        """
+        super().open_spider(spider)
+        self.pending = 0
+        self.waiters = []
+        self.spooled_batches = 0
+        self.writer = ThreadPool(minthreads=1, maxthreads=1, name='mongodb-writer')
+        self.writer.start()
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        """
+        Stops the periodic flush, flushes the pending items, waits for the writer thread and closes the MongoDB client.
+
+        Args:
+            spider (scrapy.Spider): The Scrapy spider.
+        """
+        self.stop_flush_loop()
+        self.flush()
+        while self.pending:
+            yield self.wait_for_writer()
+
+        self.writer.stop()
+        self.client.close()
+
+    def process_item(self, item, spider):
+        """
+        Buffers the item for the writer thread.
+
+        Args:
+            item (scrapy.Item): The Scrapy item.
+            spider (scrapy.Spider): The Scrapy spider.
+
+        Returns:
+            scrapy.Item: The item, or a Deferred firing with it once the writer queue has room.
+        """
+        item = super().process_item(item, spider)
+
+        if self.pending < self.max_pending_batches:
             return item
-        
-        elif spider.name == 'metrocuadrado_search':
-            return item
-            
-        self.db[self.collection].insert_one(data)
-        return item
\ No newline at end of file
+
+        if self.stats is not None:
+            self.stats.inc_value('mongodb/backpressure_waits')
+        return self.wait_for_writer().addCallback(lambda _: item)
+
+    def flush(self):
+        """
+        Hands the buffered items to the writer thread.
+        """
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+
+        buffer, self.buffer = self.buffer, []
+        self.pending += 1
+        if self.stats is not None:
+            self.stats.max_value('mongodb/queue_depth_max', self.pending)
+
+        # El reactor se importa aqui para no instalar el reactor por defecto antes que el de TWISTED_REACTOR
+        from twisted.internet import reactor
+
+        d = deferToThreadPool(reactor, self.writer, self.timed_write, buffer)
+        d.addCallbacks(self.batch_written, self.batch_failed, errbackArgs=(buffer,))
+
+    def timed_write(self, buffer):
+        """
+        Writes a batch of items and measures how long it took. Runs in the writer thread.
+
+        Args:
+            buffer (list): The (spider name, item data) pairs of the batch.
+
+        Returns:
+            tuple: The number of items and the seconds spent writing them.
+        """
+        started = time.monotonic()
+        self.write_batch(buffer)
+        return len(buffer), time.monotonic() - started
+
+    def batch_written(self, result):
+        """
+        Records the metrics of a written batch and releases the items waiting for the writer.
+
+        Args:
+            result (tuple): The value returned by timed_write.
+        """
+        count, latency = result
+        if self.stats is not None:
+            self.stats.inc_value('mongodb/batches')
+            self.stats.inc_value('mongodb/items_written', count)
+            self.stats.inc_value('mongodb/write_latency_total', latency)
+            self.stats.max_value('mongodb/write_latency_max', latency)
+        self.release_writer()
+
+    def batch_failed(self, failure, buffer):
+        """
+        Saves a batch that could not be written to the spool and releases the items waiting for the writer. If the
+        batch cannot be spooled either, the error is logged with the codigos of the lost items.
+
+        Args:
+            failure (twisted.python.failure.Failure): The error raised by the writer thread.
+            buffer (list): The (spider name, item data) pairs of the batch.
+        """
+        self.logger.error('Error writing batch of %d items to MongoDB: %s', len(buffer), failure.getErrorMessage())
+        if self.stats is not None:
+            self.stats.inc_value('mongodb/batches_failed')
+
+        try:
+            for path in self.spool_batch(buffer):
+                self.logger.error('Failed batch saved to %s, load it with `python -m bogota_lotes.spool`', path)
+            if self.stats is not None:
+                self.stats.inc_value('mongodb/items_spooled', len(buffer))
+        except Exception as error:
+            codigos = [data.get('codigo') for _, data in buffer]
+            self.logger.error('Could not spool the failed batch of %d items to %s, they are lost: %s. Codigos: %s',
+                              len(buffer), self.spool_dir, error, codigos)
+            if self.stats is not None:
+                self.stats.inc_value('mongodb/items_lost', len(buffer))
+        finally:
+            self.release_writer()
+
+    def spool_batch(self, buffer):
+        """
+        Saves a batch that could not be written as spool segments, one per spider, named so the SpoolLoader loads
+        them into the raw collection. Items the failed write did store are only updated again by the loader.
+
+        Args:
+            buffer (list): The (spider name, item data) pairs of the batch.
+
+        Returns:
+            list: The paths of the segments.
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.spooled_batches += 1
+
+        items = {}
+        for name, data in buffer:
+            items.setdefault(name, []).append(data)
+
+        paths = []
+        for name, batch in items.items():
+            path = os.path.join(self.spool_dir, f'{name}-{datetime.now():%Y%m%d%H%M%S}-failed{self.spooled_batches:05d}.jsonl.gz')
+            with gzip.open(path + '.part', 'wt', encoding='utf-8') as segment:
+                for data in batch:
+                    data.pop('_id', None)
+                    segment.write(json_util.dumps(data, ensure_ascii=False) + '\n')
+            os.replace(path + '.part', path)
+            paths.append(path)
+        return paths
+
+    def wait_for_writer(self):
+        """
+        Returns a Deferred that fires when the writer thread finishes its current batch.
+        """
+        d = defer.Deferred()
+        self.waiters.append(d)
+        return d
+
+    def release_writer(self):
+        """
+        Marks a batch as done and fires the Deferreds waiting for the writer thread.
+        """
+        self.pending -= 1
+        waiters, self.waiters = self.waiters, []
+        for d in waiters:
+            d.callback(None)
+
+
+class SpoolPipeline(object):
+    """
+    A class that appends items to local, segment-rotated, gzip-compressed JSONL files.
+
+    The crawl is decoupled from MongoDB: items are written at disk speed and ingested later (or again) with
+    `python -m bogota_lotes.spool`. A segment is written as `<spider>-<timestamp>-<n>.jsonl.gz.part` and renamed
+    without the `.part` suffix once it holds `segment_items` items or the spider closes. Segments left as `.part`
+    by a crashed crawl are finalized the next time the pipeline opens.
+
+    Attributes:
+        spool_dir (str): The directory of the segments.
+        segment_items (int): The number of items per segment.
+
+    Methods:
+        from_crawler(cls, crawler): Returns an instance of the class configured from the crawler settings.
+        open_spider(self, spider): Finalizes leftover segments and opens a new one.
+        close_spider(self, spider): Finalizes the current segment.
+        process_item(self, item, spider): Appends the item to the current segment.
+    """
+
+    def __init__(self, spool_dir, segment_items=5000):
+        """
+        Initializes a new instance of the SpoolPipeline class.
+
+        Args:
+            spool_dir (str): The directory of the segments.
+            segment_items (int): The number of items per segment.
+        """
+        self.spool_dir = spool_dir
+        self.segment_items = segment_items
+        self.logger = logging.getLogger(__name__)
+        self.segment = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """
+        Returns an instance of the class configured from the crawler settings.
+
+        Args:
+            crawler (scrapy.crawler.Crawler): The Scrapy crawler.
+
+        Returns:
+            SpoolPipeline: An instance of the SpoolPipeline class.
+        """
+        return cls(
+            spool_dir=crawler.settings.get('SPOOL_DIR', 'data/spool'),
+            segment_items=crawler.settings.getint('SPOOL_SEGMENT_ITEMS', 5000),
+        )
+
+    def open_spider(self, spider):
+        """
+        Finalizes the segments left by a crashed crawl of the spider and opens a new segment.
+
+        Args:
+            spider (scrapy.Spider): The Scrapy spider.
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for name in os.listdir(self.spool_dir):
+            if name.startswith(f'{spider.name}-') and name.endswith('.part'):
+                self.logger.warning('Recovering spool segment %s', name)
+                os.replace(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, name[:-len('.part')]))
+
+        self.prefix = f'{spider.name}-{datetime.now():%Y%m%d%H%M%S}'
+        self.segment_number = 0
+        self.open_segment()
+
+    def close_spider(self, spider):
+        """
+        Finalizes the current segment.
+
+        Args:
+            spider (scrapy.Spider): The Scrapy spider.
+        """
+        self.close_segment()
+
+    def open_segment(self):
+        """
+        Opens a new `.part` segment.
+        """
+        self.segment_number += 1
+        self.segment_path = os.path.join(self.spool_dir, f'{self.prefix}-{self.segment_number:05d}.jsonl.gz')
+        self.segment = gzip.open(self.segment_path + '.part', 'wt', encoding='utf-8')
+        self.segment_count = 0
+
+    def close_segment(self):
+        """
+        Closes the current segment and renames it so the loader can pick it up. Empty segments are removed.
+        """
+        if self.segment is None:
+            return
+
+        self.segment.close()
+        self.segment = None
+        if self.segment_count:
+            os.replace(self.segment_path + '.part', self.segment_path)
+        else:
+            os.remove(self.segment_path + '.part')
+
+    def process_item(self, item, spider):
+        """
+        Appends the item to the current segment, rotating it when full.
+
+        Args:
+            item (scrapy.Item): The Scrapy item.
+            spider (scrapy.Spider): The Scrapy spider.
+
+        Returns:
+            scrapy.Item: The Scrapy item.
+        """
+        self.segment.write(json_util.dumps(dict(item), ensure_ascii=False) + '\n')
+        self.segment_count += 1
+
+        if self.segment_count >= self.segment_items:
+            self.close_segment()
+            self.open_segment()
+
+        return item
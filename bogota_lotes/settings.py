@@ -14,10 +14,36 @@ VERSION = '2.1.0'
 MONGO_URI = 'mongodb://localhost:27017/'
 MONGO_DATABASE = 'bogota_lotes'
 
+# Items are written to MongoDB in bulk batches of up to MONGO_BULK_SIZE items, flushed at least every
+# MONGO_BULK_INTERVAL seconds
+MONGO_BULK_SIZE = 500
+MONGO_BULK_INTERVAL = 5
+# Batches allowed to wait for the writer thread of AsyncMongoDBPipeline before items are held back
+MONGO_WRITER_QUEUE_SIZE = 4
+
+# Spool segments (SpoolPipeline): directory and items per gzip JSONL segment
+SPOOL_DIR = 'data/spool'
+SPOOL_SEGMENT_ITEMS = 5000
+
 # Collection names with default values
 MONGO_COLLECTION_RAW = os.getenv('MONGO_COLLECTION_RAW', 'scrapy_bogota_lotes')
 MONGO_COLLECTION_PROCESSED = os.getenv('MONGO_COLLECTION_PROCESSED', 'scrapy_bogota_lotes_processed')
 
+# Incremental crawl: skip the detail page of stored listings whose search API payload (id, prices)
+# did not change and only bump their last_view, in batches of INCREMENTAL_CRAWL_BATCH_SIZE
+INCREMENTAL_CRAWL = os.getenv('INCREMENTAL_CRAWL', 'False').lower() in ('1', 'true', 'yes')
+INCREMENTAL_CRAWL_BATCH_SIZE = 500
+
+# Metrocuadrado detail pages: 'fallback' reads __NEXT_DATA__ from the Scrapy response and only
+# renders with Selenium when it is missing (see the metrocuadrado/browser_fallback stat),
+# 'always' renders every page in the browser
+METROCUADRADO_BROWSER_MODE = os.getenv('METROCUADRADO_BROWSER_MODE', 'fallback')
+
+# Headless browsers used to render pages off the reactor thread (bogota_lotes.browser_pool)
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', os.cpu_count() or 2))
+BROWSER_POOL_MAX_PAGES = 50  # Recycle each browser after this many pages
+BROWSER_POOL_BLOCK_RESOURCES = True  # Block images, fonts and CSS
+
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
 USER_AGENT = "bogota_lotes (+http://erik172.cloud)"
 
@@ -50,6 +76,10 @@ DOWNLOADER_MIDDLEWARES = {
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+# MongoDBPipeline writes from the reactor thread. To opt in to writing from a dedicated thread, with backpressure
+# (MONGO_WRITER_QUEUE_SIZE) and failed batches saved to SPOOL_DIR, use 'bogota_lotes.pipelines.AsyncMongoDBPipeline'
+# instead, e.g. `scrapy crawl <spider> -s ITEM_PIPELINES='{"bogota_lotes.pipelines.AsyncMongoDBPipeline": 500}'`.
+# Use 'bogota_lotes.pipelines.SpoolPipeline' to write to local segments loaded with `python -m bogota_lotes.spool`
 ITEM_PIPELINES = {
     'bogota_lotes.pipelines.MongoDBPipeline': 500
 }
@@ -5,8 +5,10 @@ from datetime import datetime
 import json
 
 # Scrapy
+from bogota_lotes.incremental import ListingIndex
 from bogota_lotes.items import ApartmentsItem
 from scrapy.loader import ItemLoader
+from scrapy import signals
 import scrapy
 
 
@@ -17,10 +19,52 @@ class HabiSpider(scrapy.Spider):
     name = 'habi'
     allowed_domains = ['habi.co', 'apiv2.habi.co']
     base_url = 'https://apiv2.habi.co/listing-global-api/get_properties'
+    page_size = 32
+    page_window = 8  # pages requested at a time when the total is known
+
+    # Search API fields. property_nid is the id in the detail page URL, which is stored in `url`: the stored codigo
+    # is the propertyId of the detail page, a different id
+    id_key = 'property_nid'
+    price_keys = ['precio_venta', 'last_price', 'price']
+    total_keys = ['total', 'total_properties', 'count']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listing_index = None
+        self.missing_fields = set()  # search API fields already reported as missing
+        self.last_offset = None  # offset of the first empty or partial page
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        """
+        Creates the spider and flushes the incremental last_view updates when the spider closes.
+        """
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
+
+    @property
+    def listing_index(self):
+        """
+        Returns the snapshot of stored habi listings by property_nid, loading it on first use.
+        Only used when INCREMENTAL_CRAWL is enabled.
+        """
+        if self._listing_index is None:
+            self._listing_index = ListingIndex.from_crawler(self.crawler, 'habi.co', key=self.stored_nid)
+            self._listing_index.open()
+
+        return self._listing_index
+
+    def spider_closed(self, spider):
+        # Flush the pending last_view updates
+        if self._listing_index is not None:
+            self._listing_index.close()
+            self._listing_index = None
 
     def start_requests(self):
         '''
-        This function is used to obtain the metrosquare API data by iterating on the operation types and API offsets.
+        This function is used to obtain the first page of the habi API data.
+        The remaining pages are scheduled by the parse function from the total reported by the API.
         
         :return: scrapy.Request
         '''
@@ -31,23 +75,60 @@ class HabiSpider(scrapy.Spider):
             'User-Agent': UserAgent().random
         }
 
-        # hay en total 817 resultados
-        for offset in range(0, 832, 32):
-            url = f'{self.base_url}?offset={offset}&limit=32&filters=%7B%22cities%22:[%22bogota%22]%7D&country=CO'
+        yield scrapy.Request(self.search_url(0), headers=headers, callback=self.parse, meta={'offset': 0})
 
-            yield scrapy.Request(url, headers=headers, callback=self.parse)
+    def search_url(self, offset):
+        '''
+        This function is used to build the URL of a page of the habi API.
+
+        :param offset: int
+        :return: str
+        '''
+        return f'{self.base_url}?offset={offset}&limit={self.page_size}&filters=%7B%22cities%22:[%22bogota%22]%7D&country=CO'
 
     def parse(self, response):
         """
         This function is used to parse the response from the start_requests function and extract the apartment data.
+
+        The first page paginates up to the total reported by the API, `page_window` pages at a time: every page
+        requests the one `page_window` pages ahead, and an empty or partial page stops the pagination. If the API
+        does not report the total, pages are followed one at a time until an empty or partial page is found.
         
         :param response: scrapy.Response
         :return: scrapy.Request
         """
-        result = json.loads(response.body)['messagge']['data']
+        body = json.loads(response.body)['messagge']
+        result = body['data']
         self.logger.info(f'Found {len(result)} apartments')
 
+        offset = response.meta['offset']
+        total = self.get_total(body) if offset == 0 else None
+        if len(result) < self.page_size:
+            # No apartments past this page: the pages ahead in the window are not requested
+            self.last_offset = offset if self.last_offset is None else min(offset, self.last_offset)
+
+        if not result:
+            self.crawler.stats.inc_value('habi/empty_pages')
+
+        elif total:
+            self.logger.info(f'Paginating pages for {total} apartments')
+            for next_offset in range(self.page_size, min(total, (self.page_window + 1) * self.page_size), self.page_size):
+                yield response.request.replace(url=self.search_url(next_offset), meta={'offset': next_offset, 'limit': total})
+
+        elif response.meta.get('limit'):
+            next_offset = offset + self.page_window * self.page_size
+            limit = response.meta['limit'] if self.last_offset is None else min(response.meta['limit'], self.last_offset)
+            if next_offset < limit:
+                yield response.request.replace(url=self.search_url(next_offset), meta={'offset': next_offset, 'limit': response.meta['limit']})
+
+        elif (offset == 0 or response.meta.get('sequential')) and len(result) == self.page_size:
+            next_offset = offset + self.page_size
+            yield response.request.replace(url=self.search_url(next_offset), meta={'offset': next_offset, 'sequential': True})
+
         for item in result:
+            if self.is_unchanged(item):
+                continue
+
             property_nid = item['property_nid']
             slug = item['slug']
 
@@ -130,6 +211,78 @@ class HabiSpider(scrapy.Spider):
 
         yield loader.load_item()
 
+    def is_unchanged(self, item):
+        """
+        In incremental mode, checks whether a listing is already stored with the same price. Listings are matched by
+        their property_nid, the id in the URL of their stored detail page. Unchanged listings only get their
+        last_view bumped (in bulk) and their detail page is skipped.
+
+        :param item: dict
+        :return: bool
+        """
+        if not self.settings.getbool('INCREMENTAL_CRAWL'):
+            return False
+
+        precio_venta = self.first_of(item, self.price_keys)
+        if precio_venta is None:
+            # Without the price a change can not be detected, the detail page is always scraped
+            self.report_missing('price', self.price_keys)
+            return False
+
+        property_nid = str(item[self.id_key])
+        if not self.listing_index.is_unchanged(property_nid, precio_venta):
+            return False
+
+        self.listing_index.touch(property_nid)
+        self.crawler.stats.inc_value('habi/unchanged_skipped')
+        return True
+
+    def get_total(self, body):
+        """
+        Returns the total number of apartments reported by the API, or None if it is not reported.
+        """
+        total = self.first_of(body, self.total_keys)
+        if isinstance(total, int):
+            return total
+
+        self.report_missing('total', self.total_keys)
+        return None
+
+    def report_missing(self, field, keys):
+        """
+        Warns once, and counts every time, that a field is not in the search API payload.
+
+        :param field: str
+        :param keys: list
+        """
+        self.crawler.stats.inc_value(f'habi/missing_{field}')
+        if field not in self.missing_fields:
+            self.missing_fields.add(field)
+            self.logger.warning(f'The habi search API does not report the {field} in any of {keys}')
+
+    @staticmethod
+    def stored_nid(doc):
+        """
+        Returns the property_nid of a stored listing, from its detail page URL, or None if it has no URL.
+
+        :param doc: dict
+        :return: str
+        """
+        url = doc.get('url')
+        if not url or not url.startswith('https://habi.co/page-data/venta-apartamentos/'):
+            return None
+        return url.split('/')[-3]
+
+    def first_of(self, dictionary, keys: list):
+        """
+        Returns the value of the first key present (and not None) in a dictionary, or None.
+        """
+        for key in keys:
+            value = self.try_get(dictionary, [key])
+            if value is not None:
+                return value
+        return None
+
     def try_get(self, dictionary, keys: list):
         """
         Tries to get a value from a nested data structure and returns None if the key is not found or if an index is out of range.
@@ -1,14 +1,17 @@
 # Import necessary libraries for browser automation
-from selenium.webdriver.chrome.options import Options  # For configuring Chrome browser options
+from bogota_lotes.browser_pool import BrowserPool  # Pool of headless browsers for rendered pages
+from bogota_lotes.incremental import ListingIndex  # Snapshot of stored listings for incremental crawls
 from fake_useragent import UserAgent  # For generating random user agents to avoid detection
-from selenium import webdriver  # For browser automation
+from urllib.parse import urlencode  # For building the partition filters
 from datetime import datetime  # For timestamping data
 import json  # For parsing JSON responses
 
 # Import Scrapy-specific components
 from bogota_lotes.items import ApartmentsItem  # Custom item class for structured data storage
+from scrapy.utils.defer import maybe_deferred_to_future  # For awaiting Deferreds in callbacks
 from scrapy.selector import Selector  # For parsing HTML responses
 from scrapy.loader import ItemLoader  # For loading data into the item
+from scrapy import signals  # For hooking into the spider lifecycle
 import scrapy  # Main Scrapy framework
 import logging  # For logging events and errors
 
@@ -22,36 +25,101 @@ class MetrocuadradoSpider(scrapy.Spider):
     name = 'metrocuadrado'  # Unique identifier for the spider
     allowed_domains = ['metrocuadrado.com']  # Restricts crawling to these domains
     base_url = 'https://www.metrocuadrado.com/rest-search/search'  # API endpoint for search results
+    page_size = 50  # Results per page of the search API
+    max_results = 10000  # The search API does not return results past from + size = 10000
+    page_window = 8  # Pages of a partition requested at a time when the total is known
+    # Price filters used to partition queries that do not fit in the result window
+    price_filters = {
+        'venta': ('salePriceFrom', 'salePriceTo'),
+        'arriendo': ('rentPriceFrom', 'rentPriceTo'),
+    }
+    # Price fields of the search results, to check that the API applied the price filter
+    price_keys = {
+        'venta': ['salePrice', 'mvalorventa'],
+        'arriendo': ['rentPrice', 'mvalorarriendo'],
+    }
+    initial_price_split = {'venta': 500_000_000, 'arriendo': 3_000_000}
+    max_partition_depth = 12
     logger = logging.getLogger(__name__)  # Initialize logger for this spider
 
-    def __init__(self):
+    def __init__(self, *args, **kwargs):
         """
-        Initializes the spider with a headless Chrome browser instance
-        
-        Sets up Chrome with specific options for web scraping:
-        - Headless mode (no visible browser)
-        - Window size to mimic a real browser
-        - Random user agent to avoid detection
-        - Disk cache for performance
+        Initializes the spider without starting a browser
+
+        Headless Chrome is only needed for detail pages whose HTML does not
+        ship the __NEXT_DATA__ payload, so the browser pool is created lazily
+        the first time a page has to be rendered (see `browser_pool`).
+        """
+        super().__init__(*args, **kwargs)
+        self._browser_pool = None
+        self._listing_index = None
+        self.seen_ids = set()  # propertyIds already requested, partitions may overlap
+        self.last_offsets = {}  # offset of the first empty or partial page of each partition
+        self.splits = {}  # split partitions waiting for the totals of their price bands
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        """
+        Creates the spider and quits the browser pool when the spider closes
+        """
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
+
+    @property
+    def browser_pool(self):
+        """
+        Returns the pool of headless browsers, creating it on first use
+
+        The pool size, recycling and resource blocking are configured with the
+        BROWSER_POOL_* settings.
+        """
+        if self._browser_pool is None:
+            self._browser_pool = BrowserPool.from_crawler(self.crawler)
+
+        return self._browser_pool
+
+    @property
+    def listing_index(self):
         """
-        # Configure Chrome options for headless operation
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # Run browser in headless mode (no GUI)
-        chrome_options.add_argument('--headless=new')  # Use new headless implementation
-        chrome_options.add_argument('--window-size=1920x1080')  # Set window size to avoid responsive design issues
-        chrome_options.add_argument(f'user-agent={UserAgent().random}')  # Use random user agent to avoid bot detection
-        chrome_options.add_argument('--disk-cache=true')  # Enable disk cache for better performance
+        Returns the snapshot of stored metrocuadrado listings, loading it on first use
 
-        # Initialize Chrome WebDriver with the configured options
-        self.driver = webdriver.Chrome(options=chrome_options)
+        Only used when INCREMENTAL_CRAWL is enabled.
+        """
+        if self._listing_index is None:
+            self._listing_index = ListingIndex.from_crawler(self.crawler, 'metrocuadrado.com')
+            self._listing_index.open()
+
+        return self._listing_index
+
+    def spider_closed(self, spider):
+        """
+        Quits the browsers (if any were started) and flushes the incremental
+        `last_view` updates when the spider finishes
+
+        Returns a Deferred that fires once the browsers have quit, so Scrapy
+        waits for them without blocking the reactor
+        """
+        closed = None
+        if self._browser_pool is not None:
+            closed = self._browser_pool.close()
+            self._browser_pool = None
+
+        if self._listing_index is not None:
+            self._listing_index.close()
+            self._listing_index = None
+
+        return closed
 
     def start_requests(self):
         """
         Generates the initial requests to scrape apartment data
         
-        Creates requests to the API endpoint for both sale and rent listings,
-        paginating through results in batches of 50 up to a maximum of 9950 results.
-        Each request includes appropriate headers including an API key.
+        Requests the first page of the API endpoint for both sale and rent listings.
+        The remaining pages (or partitions, see `split_partition`) are scheduled
+        from `parse` once the first response reports how many listings there are,
+        so both operation types are crawled concurrently. Each request includes
+        appropriate headers including an API key.
         """
         # Set up headers for API requests
         headers = {
@@ -61,160 +129,473 @@ class MetrocuadradoSpider(scrapy.Spider):
 
         # Iterate through both property types (sale and rent)
         for type in ['venta', 'arriendo']:
-            # Paginate through results in batches of 50
-            for offset in range(0, 9950, 50):
-                self.logger.info(f'Getting {type} apartments from offset {offset}')
-                # Construct URL with proper parameters for filtering apartments in Bogotá
-                url = f'{self.base_url}?realEstateTypeList=apartamento&realEstateBusinessList={type}&city=bogot%C3%A1&from={offset}&size=50'
+            self.logger.info(f'Getting {type} apartments from offset 0')
+            yield scrapy.Request(
+                self.search_url(type, 0),
+                headers=headers,
+                callback=self.parse,
+                meta={'type': type, 'offset': 0, 'partition': {}, 'partition_depth': 0}
+            )
 
-                # Yield a request to the constructed URL
-                yield scrapy.Request(url, headers=headers, callback=self.parse)
+    def search_url(self, type, offset, partition=None):
+        """
+        Builds the URL of a page of the search API
+
+        Args:
+            type (str): Operation type ('venta' or 'arriendo')
+            offset (int): Index of the first result of the page
+            partition (dict): Extra query filters of the partition, if any
+
+        Returns:
+            The URL filtering apartments in Bogotá for the given page
+        """
+        url = f'{self.base_url}?realEstateTypeList=apartamento&realEstateBusinessList={type}&city=bogot%C3%A1&from={offset}&size={self.page_size}'
+        if partition:
+            url += '&' + urlencode(partition)
+        return url
+
+    def page_request(self, response, offset, **meta):
+        """
+        Builds the request for another page of the same operation type and partition as `response`
+
+        Args:
+            response (scrapy.http.Response): A response of the search API
+            offset (int): Index of the first result of the page
+            **meta: Meta keys to add or override
+
+        Returns:
+            A scrapy.Request for the page
+        """
+        meta = {
+            'type': response.meta['type'],
+            'offset': offset,
+            'partition': response.meta.get('partition', {}),
+            'partition_depth': response.meta.get('partition_depth', 0),
+            **meta
+        }
+        return response.request.replace(
+            url=self.search_url(meta['type'], offset, meta['partition']),
+            meta=meta
+        )
 
-        
     def parse(self, response):
         """
-        Parses the response from the initial requests and generates requests to scrape detailed apartment pages
+        Parses the response from the search API and generates requests to scrape detailed apartment pages
         
         Extracts apartment listings from the JSON response and creates
-        a new request for each individual apartment detail page.
+        a new request for each individual apartment detail page. Listings
+        already seen in another page or partition are skipped.
+
+        The first page of each operation type (or partition) paginates up to the
+        total reported by the API, `page_window` pages at a time: every page
+        requests the one `page_window` pages ahead, and an empty or partial page
+        stops the partition. If the total does not fit in the API's result
+        window the query is split into partitions instead (see `check_split`
+        for the listings that fall in none of them). If the total is not
+        reported, pages are followed one at a time until an empty or partial
+        page is found.
         """
-        logging.info('Parsing response')
+        self.logger.info('Parsing response')
         # Parse JSON response and extract results array
-        result = json.loads(response.body)['results']
+        body = json.loads(response.body)
+        result = body['results']
         self.logger.info(f'Found {len(result)} apartments')
 
+        type = response.meta['type']
+        offset = response.meta['offset']
+        total = (self.try_get(body, ['totalHits']) or self.try_get(body, ['totalEntries'])) if offset == 0 else None
+
+        if offset == 0 and response.meta.get('parent'):
+            yield from self.check_split(response, len(result) if total is None else total)
+
+        if len(result) < self.page_size:
+            # No listings past this page: the pages ahead in the window are not requested
+            key = self.partition_key(type, response.meta['partition'])
+            self.last_offsets[key] = min(offset, self.last_offsets.get(key, offset))
+
+        if not result:
+            self.crawler.stats.inc_value('metrocuadrado/empty_pages')
+
+        elif offset == 0:
+            partitions = self.split_partition(response, total, result) if total and total > self.max_results else []
+            if partitions:
+                # The listings of this page are still requested below, the duplicates are skipped
+                yield from partitions
+
+            elif total:
+                if total > self.max_results:
+                    self.logger.warning(f'{total} {type} apartments reported in {response.meta["partition"]}, only the first {self.max_results} can be paginated')
+                self.logger.info(f'Paginating {type} pages for {total} apartments')
+                yield from self.first_window(response, total)
+            elif len(result) == self.page_size:
+                yield from self.next_page(response, offset)
+
+        elif response.meta.get('limit'):
+            yield from self.window_page(response, offset)
+
+        elif response.meta.get('sequential') and len(result) == self.page_size:
+            yield from self.next_page(response, offset)
+
         # For each apartment in the results, request its detail page
         for item in result:
+            codigo = self.first_of(item, ['propertyId', 'midinmueble'])
+            if codigo is not None:
+                if codigo in self.seen_ids:
+                    self.crawler.stats.inc_value('metrocuadrado/duplicates')
+                    continue
+                self.seen_ids.add(codigo)
+
+            if self.is_unchanged(item):
+                continue
+
             yield scrapy.Request(
                 url=f'https://metrocuadrado.com{item["link"]}',  # Construct full URL to detail page
                 callback=self.details_parse  # Use details_parse method to handle the response
             )
 
-    def details_parse(self, response):
+    def split_partition(self, response, total, result):
+        """
+        Splits the query of `response` in two price bands that are crawled concurrently
+
+        Bounded bands are halved; the open-ended top band is split at twice its
+        lower bound (or at `initial_price_split` for the first split). Splitting
+        stops at `max_partition_depth`, or when the first page of the partition
+        has listings priced outside its band, which means the API ignored the
+        price filter.
+
+        Args:
+            response (scrapy.http.Response): The first page of the partition
+            total (int): Total number of listings reported for the partition
+            result (list): The listings of the first page
+
+        Returns:
+            A list with the requests for the first page of each new partition,
+            empty if the partition cannot be split
+        """
+        type = response.meta['type']
+        partition = response.meta['partition']
+        depth = response.meta['partition_depth']
+
+        price_from, price_to = self.price_filters[type]
+        low = partition.get(price_from, 0)
+        high = partition.get(price_to)
+
+        if depth >= self.max_partition_depth or self.outside_band(result, type, low, high):
+            return []
+
+        if high is None:
+            middle = low * 2 if low else self.initial_price_split[type]
+        else:
+            middle = (low + high) // 2
+            if middle <= low:
+                return []
+
+        lower = {**partition, price_from: low, price_to: middle}
+        upper = {**partition, price_from: middle}
+        if high is not None:
+            upper[price_to] = high
+
+        self.logger.info(f'Splitting {type} {partition} ({total} apartments) at {middle}')
+        self.crawler.stats.inc_value('metrocuadrado/partitions', 2)
+        key = self.partition_key(type, partition)
+        self.splits[key] = {'response': response, 'total': total, 'totals': {}}
+        return [
+            self.page_request(response, 0, partition=sub, partition_depth=depth + 1, parent=key)
+            for sub in (lower, upper)
+        ]
+
+    def outside_band(self, result, type, low, high):
+        """
+        Checks whether any listing is priced outside a price band (bounds included)
+
+        Args:
+            result (list): Listings from the search API results
+            type (str): Operation type ('venta' or 'arriendo')
+            low (int): Lower bound of the band
+            high (int): Upper bound of the band, None if it is open-ended
+
+        Returns:
+            True if a listing has a price below `low` or above `high`
+        """
+        for item in result:
+            price = self.first_of(item, self.price_keys[type])
+            if isinstance(price, (int, float)) and (price < low or (high is not None and price > high)):
+                return True
+        return False
+
+    def check_split(self, response, total):
+        """
+        Records the total of a price band and, once both bands of a split are in,
+        compares their sum with the total of the split partition
+
+        Listings without a price (or with one the API does not filter on) match
+        no price band. When the bands add up to less than their parent, the gap
+        is added to the `metrocuadrado/partition_gap` stat and the parent's own
+        pages are crawled, up to the API's result window, to recover them.
+
+        Args:
+            response (scrapy.http.Response): The first page of the price band
+            total (int): Total number of listings reported for the price band
+
+        Yields:
+            The requests for the pages of the parent partition, if there is a gap
+        """
+        split = self.splits.get(response.meta['parent'])
+        if split is None:
+            return
+
+        split['totals'][self.partition_key(response.meta['type'], response.meta['partition'])] = total
+        if len(split['totals']) < 2:
+            return
+
+        del self.splits[response.meta['parent']]
+        gap = split['total'] - sum(split['totals'].values())
+        if gap <= 0:
+            return
+
+        parent = split['response']
+        self.crawler.stats.inc_value('metrocuadrado/partition_gap', gap)
+        self.logger.warning(f'{gap} of the {split["total"]} {parent.meta["type"]} apartments in {parent.meta["partition"]} are in no price band, crawling its pages')
+        yield from self.first_window(parent, split['total'])
+
+    def first_window(self, response, total):
+        """
+        Yields the requests for the first `page_window` pages after the first page of a partition
+
+        Args:
+            response (scrapy.http.Response): The first page of the partition
+            total (int): Total number of listings reported for the partition
+        """
+        limit = min(total, self.max_results)
+        for next_offset in range(self.page_size, min(limit, (self.page_window + 1) * self.page_size), self.page_size):
+            yield self.page_request(response, next_offset, limit=limit)
+
+    def partition_key(self, type, partition):
+        """
+        Returns a hashable key of an operation type and partition
+        """
+        return type, tuple(sorted(partition.items()))
+
+    def window_page(self, response, offset):
+        """
+        Yields the request for the page `page_window` pages after `offset` when the total is known
+
+        Nothing is yielded past the total (`limit` meta key) or past an empty or
+        partial page of the same partition.
+        """
+        key = self.partition_key(response.meta['type'], response.meta['partition'])
+        limit = min(response.meta['limit'], self.last_offsets.get(key, self.max_results))
+        next_offset = offset + self.page_window * self.page_size
+        if next_offset < limit:
+            yield self.page_request(response, next_offset, limit=response.meta['limit'])
+
+    def next_page(self, response, offset):
+        """
+        Yields the request for the page after `offset` when the total is unknown
+
+        Nothing is yielded past the API's result window.
+        """
+        next_offset = offset + self.page_size
+        if next_offset >= self.max_results:
+            return
+
+        yield self.page_request(response, next_offset, sequential=True)
+
+    def is_unchanged(self, item):
+        """
+        Checks whether a search result can skip its detail page in an incremental crawl
+
+        With INCREMENTAL_CRAWL enabled, a listing that is already stored with the
+        same prices only gets its `last_view` bumped (in bulk) instead of being
+        scraped again. Results without an id are always scraped.
+
+        Args:
+            item (dict): A listing from the search API results
+
+        Returns:
+            True if the detail page should be skipped
+        """
+        if not self.settings.getbool('INCREMENTAL_CRAWL'):
+            return False
+
+        codigo = self.first_of(item, ['propertyId', 'midinmueble'])
+        precio_venta = self.first_of(item, ['salePrice', 'mvalorventa'])
+        precio_arriendo = self.first_of(item, ['rentPrice', 'mvalorarriendo'])
+
+        if not self.listing_index.is_unchanged(codigo, precio_venta, precio_arriendo):
+            return False
+
+        self.listing_index.touch(codigo)
+        self.crawler.stats.inc_value('metrocuadrado/unchanged_skipped')
+        return True
+
+    async def details_parse(self, response):
         """
         Parses the response from the apartment detail pages and extracts comprehensive data
-        
-        Uses Selenium to load the page (necessary for JavaScript content),
-        then extracts data from the page's React state stored in a script tag.
+
+        Reads the page's React state from the __NEXT_DATA__ script tag. By default
+        (METROCUADRADO_BROWSER_MODE = 'fallback') the payload is taken straight
+        from the Scrapy response and the browser pool is only used when it is
+        missing; with 'always' every page is rendered in the browser.
         Populates an ApartmentsItem with the extracted data.
         """
-        # Load the page with Selenium to render JavaScript content
-        self.driver.get(response.url)   
-        
         self.logger.info(f'Getting details from {response.url}')
 
-        # Extract the React app state data from __NEXT_DATA__ script tag
-        script_data = Selector(text=self.driver.page_source).xpath(
-            '//script[@id="__NEXT_DATA__"]/text()'
-        ).get()
+        script_data = None
+        if self.settings.get('METROCUADRADO_BROWSER_MODE', 'fallback') != 'always':
+            # Fast path: the payload is server-side rendered into the HTML
+            script_data = response.xpath('//script[@id="__NEXT_DATA__"]/text()').get()
 
-        # If script data not found, retry with an implicit wait
         if not script_data:
-            self.logger.error('No script data found')
-            self.driver.get(response.url)
-            self.driver.implicitly_wait(10)  # Wait up to 10 seconds for elements to load
-            script_data = Selector(text=self.driver.page_source).xpath('//script[@id="__NEXT_DATA__"]/text()').get()
+            # Render the page in the browser pool to get the JavaScript content
+            self.crawler.stats.inc_value('metrocuadrado/browser_fallback')
+            script_data = await self.render_next_data(response.url)
+
+        if not script_data:
+            self.logger.error(f'No script data found for {response.url}')
+            return
 
         # Parse the JSON data from the script tag
         try:
             script_data = json.loads(script_data)['props']['initialProps']['pageProps']['realEstate']
-        except json.JSONDecodeError as e:
-            logging.error(f'Error decoding JSON: {e}')
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            self.logger.error(f'Error decoding JSON: {e}')
+            return
 
-        # Process each apartment item from the script data
-        for item in script_data:
-            # Initialize an ItemLoader with the ApartmentsItem
-            loader = ItemLoader(item=ApartmentsItem(), selector=item)
+        # Initialize an ItemLoader with the ApartmentsItem
+        loader = ItemLoader(item=ApartmentsItem())
 
-            # Add all the extracted data to the ItemLoader
-            #codigo - Unique identifier for the apartment
-            loader.add_value('codigo', script_data['propertyId'])
-            
-            #tipo_propiedad - Type of property (apartment, house, etc.)
-            loader.add_value('tipo_propiedad', script_data['propertyType']['nombre'])
-            
-            #tipo_operacion - Type of operation (sale, rent)
-            loader.add_value('tipo_operacion', script_data['businessType'])
-            
-            #precio_venta - Sale price
-            loader.add_value('precio_venta', script_data['salePrice'])
-            
-            #precio_arriendo - Rent price
-            loader.add_value('precio_arriendo', script_data['rentPrice'])
-            
-            #area - Area in square meters
-            loader.add_value('area', script_data['area'])
-            
-            #habitaciones - Number of rooms
-            loader.add_value('habitaciones', script_data['rooms'])
-            
-            #banos - Number of bathrooms
-            loader.add_value('banos', script_data['bathrooms'])
-            
-            #administracion - Monthly administration fee
-            loader.add_value('administracion', script_data['detail']['adminPrice'])
-            
-            #parqueaderos - Number of parking spaces
-            loader.add_value('parqueaderos', script_data['garages'])
-            
-            #sector - Neighborhood/sector
-            loader.add_value('sector', self.try_get(script_data, ['sector', 'nombre']))
-            
-            #estrato - Socioeconomic stratum (Colombian classification system)
-            loader.add_value('estrato', script_data['stratum'] if 'stratum' in script_data else None)
-            
-            #antiguedad - Age of the property
-            loader.add_value('antiguedad', script_data['builtTime'])
-            
-            #estado - State of the property (new, used)
-            loader.add_value('estado', script_data['propertyState'])
-            
-            #longitud - Longitude coordinate
-            loader.add_value('longitud', script_data['coordinates']['lon'])
-            
-            #latitud - Latitude coordinate
-            loader.add_value('latitud', script_data['coordinates']['lat'])
-            
-            #featured_interior - Interior features
-            loader.add_value('featured_interior', self.try_get(script_data, ['featured', 0, 'items']))
-            
-            #featured_exterior - Exterior features
-            loader.add_value('featured_exterior', self.try_get(script_data, ['featured', 1, 'items']))
-            
-            #featured_zona_comun - Common area features
-            loader.add_value('featured_zona_comun', self.try_get(script_data, ['featured', 2, 'items']))
-            
-            #featured_sector - Sector/neighborhood features
-            loader.add_value('featured_sector', self.try_get(script_data, ['featured', 3, 'items']))
-            
-            #Imagenes - List of image URLs
-            try:
-                imagenes = []
-                for img in script_data['images']:
-                    imagenes.append(img['image'])
-
-                loader.add_value('imagenes', imagenes)
-            except:
-                pass
-                
-            #compania - Company or real estate agency listing the property
-            loader.add_value('compañia', script_data['companyName'] if 'companyName' in script_data else None)
-            
-            #descripcion - Full description of the property
-            loader.add_value('descripcion', script_data['comment'])
-            
-            #website - Source website
-            loader.add_value('website', 'metrocuadrado.com')
-            
-            # last_view - Last time the scraper visited this listing
-            loader.add_value('last_view', datetime.now())
+        # Add all the extracted data to the ItemLoader
+        #codigo - Unique identifier for the apartment
+        loader.add_value('codigo', script_data['propertyId'])
+        
+        #tipo_propiedad - Type of property (apartment, house, etc.)
+        loader.add_value('tipo_propiedad', script_data['propertyType']['nombre'])
+        
+        #tipo_operacion - Type of operation (sale, rent)
+        loader.add_value('tipo_operacion', script_data['businessType'])
+        
+        #precio_venta - Sale price
+        loader.add_value('precio_venta', script_data['salePrice'])
+        
+        #precio_arriendo - Rent price
+        loader.add_value('precio_arriendo', script_data['rentPrice'])
+        
+        #area - Area in square meters
+        loader.add_value('area', script_data['area'])
+        
+        #habitaciones - Number of rooms
+        loader.add_value('habitaciones', script_data['rooms'])
+        
+        #banos - Number of bathrooms
+        loader.add_value('banos', script_data['bathrooms'])
+        
+        #administracion - Monthly administration fee
+        loader.add_value('administracion', script_data['detail']['adminPrice'])
+        
+        #parqueaderos - Number of parking spaces
+        loader.add_value('parqueaderos', script_data['garages'])
+        
+        #sector - Neighborhood/sector
+        loader.add_value('sector', self.try_get(script_data, ['sector', 'nombre']))
+        
+        #estrato - Socioeconomic stratum (Colombian classification system)
+        loader.add_value('estrato', script_data['stratum'] if 'stratum' in script_data else None)
+        
+        #antiguedad - Age of the property
+        loader.add_value('antiguedad', script_data['builtTime'])
+        
+        #estado - State of the property (new, used)
+        loader.add_value('estado', script_data['propertyState'])
+        
+        #longitud - Longitude coordinate
+        loader.add_value('longitud', script_data['coordinates']['lon'])
+        
+        #latitud - Latitude coordinate
+        loader.add_value('latitud', script_data['coordinates']['lat'])
+        
+        #featured_interior - Interior features
+        loader.add_value('featured_interior', self.try_get(script_data, ['featured', 0, 'items']))
+        
+        #featured_exterior - Exterior features
+        loader.add_value('featured_exterior', self.try_get(script_data, ['featured', 1, 'items']))
+        
+        #featured_zona_comun - Common area features
+        loader.add_value('featured_zona_comun', self.try_get(script_data, ['featured', 2, 'items']))
+        
+        #featured_sector - Sector/neighborhood features
+        loader.add_value('featured_sector', self.try_get(script_data, ['featured', 3, 'items']))
+        
+        #Imagenes - List of image URLs
+        try:
+            imagenes = []
+            for img in script_data['images']:
+                imagenes.append(img['image'])
+
+            loader.add_value('imagenes', imagenes)
+        except:
+            pass
             
-            #datetime - Timestamp of when the data was scraped
-            loader.add_value('datetime', datetime.now())
+        #compania - Company or real estate agency listing the property
+        loader.add_value('compañia', script_data['companyName'] if 'companyName' in script_data else None)
+        
+        #descripcion - Full description of the property
+        loader.add_value('descripcion', script_data['comment'])
+        
+        #website - Source website
+        loader.add_value('website', 'metrocuadrado.com')
+        
+        # last_view - Last time the scraper visited this listing
+        loader.add_value('last_view', datetime.now())
+        
+        #datetime - Timestamp of when the data was scraped
+        loader.add_value('datetime', datetime.now())
 
         # Yield the populated item
         yield loader.load_item()
 
+    async def render_next_data(self, url):
+        """
+        Renders the page in the browser pool and returns the raw __NEXT_DATA__ text
+
+        Retries once with an implicit wait if the script tag is not present yet.
+
+        Args:
+            url (str): URL of the apartment detail page
+
+        Returns:
+            The contents of the __NEXT_DATA__ script tag or None if not found
+        """
+        page_source = await maybe_deferred_to_future(self.browser_pool.render(url))
+        script_data = Selector(text=page_source).xpath(
+            '//script[@id="__NEXT_DATA__"]/text()'
+        ).get()
+
+        # If script data not found, retry with an implicit wait
+        if not script_data:
+            self.logger.warning(f'No script data found in rendered page, retrying {url}')
+            page_source = await maybe_deferred_to_future(self.browser_pool.render(url, implicit_wait=10))
+            script_data = Selector(text=page_source).xpath('//script[@id="__NEXT_DATA__"]/text()').get()
+
+        return script_data
+
+    def first_of(self, dictionary, keys: list):
+        """
+        Returns the value of the first key present (and not None) in a dictionary
+
+        Args:
+            dictionary: The dictionary to extract the value from
+            keys: Candidate keys, in order of preference
+
+        Returns:
+            The first value found or None
+        """
+        for key in keys:
+            value = self.try_get(dictionary, [key])
+            if value is not None:
+                return value
+        return None
+
     def try_get(self, dictionary, keys: list):
         """
         Safely accesses nested dictionary or list values by path
@@ -0,0 +1,169 @@
+"""
+This module loads the segments written by the SpoolPipeline into the raw MongoDB collection. It contains a
+SpoolLoader class and can be run with `python -m bogota_lotes.spool`.
+
+Items go through the same batching and price timeline logic as the MongoDBPipeline. Progress is checkpointed after
+every batch in `checkpoint.json`, so a crashed load resumes where it stopped, and fully loaded segments are moved to
+the `loaded/` subdirectory, from where they can be moved back to re-run the ingestion without re-crawling.
+
+Classes:
+    SpoolLoader: A class that bulk-ingests spool segments into the raw collection.
+"""
+
+from bogota_lotes.pipelines import MongoDBPipeline
+from scrapy.utils.project import get_project_settings
+from bson import json_util
+import logging
+import json
+import gzip
+import os
+
+
+class SpoolLoader(object):
+    """
+    A class that bulk-ingests spool segments into the raw collection.
+
+    Attributes:
+        spool_dir (str): The directory of the segments.
+        mongo_uri (str): The URI of the MongoDB instance.
+        mongo_db (str): The name of the MongoDB database.
+        batch_size (int): The number of items written (and checkpointed) at a time.
+
+    Methods:
+        from_settings(cls, settings): Returns an instance of the class configured from the project settings.
+        segments(self): Returns the finalized segments, oldest first.
+        read_segment(self, path): Yields the items of a segment.
+        load(self): Loads every finalized segment.
+    """
+
+    def __init__(self, spool_dir, mongo_uri, mongo_db, batch_size=1000):
+        """
+        Initializes a new instance of the SpoolLoader class.
+
+        Args:
+            spool_dir (str): The directory of the segments.
+            mongo_uri (str): The URI of the MongoDB instance.
+            mongo_db (str): The name of the MongoDB database.
+            batch_size (int): The number of items written (and checkpointed) at a time.
+        """
+        self.spool_dir = spool_dir
+        self.mongo_uri = mongo_uri
+        self.mongo_db = mongo_db
+        self.batch_size = batch_size
+        self.checkpoint_path = os.path.join(spool_dir, 'checkpoint.json')
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Returns an instance of the class configured from the project settings.
+
+        Args:
+            settings (scrapy.settings.Settings): The project settings.
+
+        Returns:
+            SpoolLoader: An instance of the SpoolLoader class.
+        """
+        return cls(
+            spool_dir=settings.get('SPOOL_DIR', 'data/spool'),
+            mongo_uri=settings.get('MONGO_URI'),
+            mongo_db=settings.get('MONGO_DATABASE', 'items'),
+            batch_size=settings.getint('MONGO_BULK_SIZE', 1000),
+        )
+
+    def segments(self):
+        """
+        Returns the finalized segments, oldest first.
+
+        Returns:
+            list: The file names of the segments.
+        """
+        if not os.path.isdir(self.spool_dir):
+            return []
+        return sorted(name for name in os.listdir(self.spool_dir) if name.endswith('.jsonl.gz'))
+
+    def read_segment(self, path):
+        """
+        Yields the items of a segment. A segment recovered from a crashed crawl may end in a truncated record,
+        everything before it is still read.
+
+        Args:
+            path (str): The path of the segment.
+
+        Yields:
+            dict: The item data.
+        """
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as segment:
+                for line in segment:
+                    yield json_util.loads(line)
+        except (EOFError, ValueError) as error:
+            self.logger.warning('Segment %s is truncated, stopping at the last complete record: %s', path, error)
+
+    def read_checkpoint(self):
+        """
+        Returns the number of items already loaded from each segment.
+        """
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as checkpoint:
+            return json.load(checkpoint)
+
+    def write_checkpoint(self, checkpoint):
+        """
+        Atomically saves the number of items already loaded from each segment.
+        """
+        with open(self.checkpoint_path + '.tmp', 'w') as tmp:
+            json.dump(checkpoint, tmp)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def load(self):
+        """
+        Loads every finalized segment into the raw collection, resuming from the checkpoint.
+
+        Returns:
+            int: The number of items loaded.
+        """
+        segments = self.segments()
+        if not segments:
+            self.logger.info('No spool segments to load')
+            return 0
+
+        pipeline = MongoDBPipeline(self.mongo_uri, self.mongo_db, bulk_size=float('inf'), bulk_interval=float('inf'))
+        pipeline.open_spider(None)
+        checkpoint = self.read_checkpoint()
+        loaded_dir = os.path.join(self.spool_dir, 'loaded')
+        os.makedirs(loaded_dir, exist_ok=True)
+        total = 0
+
+        try:
+            for name in segments:
+                spider_name = name.rsplit('-', 2)[0]
+                done = checkpoint.get(name, 0)
+                self.logger.info('Loading %s from item %d', name, done)
+
+                for position, data in enumerate(self.read_segment(os.path.join(self.spool_dir, name))):
+                    if position < done:
+                        continue
+
+                    pipeline.add(spider_name, data)
+                    total += 1
+                    if len(pipeline.buffer) >= self.batch_size:
+                        pipeline.flush()
+                        checkpoint[name] = position + 1
+                        self.write_checkpoint(checkpoint)
+
+                pipeline.flush()
+                os.replace(os.path.join(self.spool_dir, name), os.path.join(loaded_dir, name))
+                checkpoint.pop(name, None)
+                self.write_checkpoint(checkpoint)
+        finally:
+            pipeline.client.close()
+
+        self.logger.info('Loaded %d items from %d segments', total, len(segments))
+        return total
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    SpoolLoader.from_settings(get_project_settings()).load()
@@ -1,35 +1,61 @@
 # Author: Erik Garcia (@erik172)
 # Version: Stable
 from datetime import datetime
-import subprocess
+import argparse
 import logging
+import sys
+import os
 
 filename = f'logs/data_processing.log'
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
 
-def run_data_processing():
+from ETL.data_pipeline import build_layers, run_pipeline
+
+def run_data_processing(workers=1):
     """
     Runs the data processing pipeline.
 
-    This function executes a series of data processing steps, including initial transformations,
-    data correction, data enrichment, and data saving. It logs the start and end times of the
-    pipeline execution.
+    This function runs the initial transformations, data correction, data enrichment and data
+    saving stages in this process (see ETL/data_pipeline.py), passing the data from one stage to
+    the next in memory. It logs the start and end times of the pipeline execution.
+
+    Run with --incremental to only process the listings that are new or changed since the
+    last successful run (see ETL/src/incremental.py), with --csv to also export the processed
+    data to CSV for the public release (see ETL/src/interchange.py) and with --workers N to run
+    up to N independent stages at the same time. --build-layers only rebuilds the cache of the
+    external layers (see ETL/src/layer_cache.py). The TransMilenio stations are the ones last fetched
+    or the bundled GeoJSON; --refresh-transmilenio fetches them again from the ArcGIS service
+    (see ETL/src/transmilenio.py).
 
+    Args:
+        workers (int): The number of independent stages that can run at the same time.
     """
     logging.info(f'Start data pipeline at {datetime.now()}')
-
-    logging.info('Start data processing')
-    subprocess.run(['python3.11', 'ETL/01_initial_transformations.py'])
-    subprocess.run(['python3.11', 'ETL/02_data_correction.py'])
-    subprocess.run(['python3.11', 'ETL/03_data_enrichment.py'])    
-    logging.info('End data processing')
-
-    logging.info('Start data saving')
-    subprocess.run(['python3.11', 'ETL/04_data_save.py'])
-    logging.info('End data saving')
-
+    run_pipeline(workers=workers)
     logging.info(f'End data pipeline at {datetime.now()}')
 
 if __name__ == '__main__':
-    run_data_processing()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Runs the data processing pipeline.')
+    parser.add_argument('--incremental', action='store_true', help='only process new or changed listings')
+    parser.add_argument('--csv', action='store_true', help='also export the processed data to CSV')
+    parser.add_argument('--workers', type=int, default=1, help='independent stages run at the same time')
+    parser.add_argument('--build-layers', action='store_true', help='only rebuild the cache of the external layers')
+    parser.add_argument('--refresh-transmilenio', action='store_true', help='fetch the TransMilenio stations from the ArcGIS service')
+    args = parser.parse_args()
+
+    if args.incremental:
+        os.environ['ETL_INCREMENTAL'] = '1'
+    if args.csv:
+        os.environ['ETL_EXPORT_CSV'] = '1'
+    if args.refresh_transmilenio:
+        os.environ['ETL_REFRESH_TRANSMILENIO'] = '1'
+
+    try:
+        if args.build_layers:
+            build_layers()
+        else:
+            run_data_processing(args.workers)
+    except Exception:
+        logging.exception('Data pipeline failed')
+        sys.exit(1)
@@ -7,6 +7,8 @@ from datetime import datetime
 import subprocess
 # Import logging to track progress and errors during execution
 import logging
+# Import sys to exit with an error code when a step fails
+import sys
 
 # Define log file path with descriptive name
 filename = f'logs/data_pipeline.log'
@@ -15,6 +17,11 @@ filename = f'logs/data_pipeline.log'
 # This helps in debugging and monitoring the pipeline execution
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filename=filename)
 
+# The spool loader and the ETL stages run in this process
+from scrapy.utils.project import get_project_settings
+from bogota_lotes.spool import SpoolLoader
+from ETL.data_pipeline import run_pipeline
+
 def run_data_pipeline():
     """
     Main function that orchestrates the complete data pipeline:
@@ -30,14 +37,20 @@ def run_data_pipeline():
     logging.info('Start web scraping HABI')
     # Run the HABI spider using Scrapy's crawl command
     # This will extract apartment data from habi.co
-    subprocess.run(['scrapy', 'crawl', 'habi'])
+    # check=True stops the pipeline if the crawl fails
+    subprocess.run(['scrapy', 'crawl', 'habi'], check=True)
     
     # Log the start of METROCUADRADO scraping process
     logging.info('Start web scraping METROCUADRADO')
     # Run the METROCUADRADO spider using Scrapy's crawl command
     # This will extract apartment data from metrocuadrado.com
-    subprocess.run(['scrapy', 'crawl', 'metrocuadrado'])
+    subprocess.run(['scrapy', 'crawl', 'metrocuadrado'], check=True)
     
+    # Load the items spooled to data/spool into the raw collection
+    # This is a no-op unless the SpoolPipeline is enabled in settings.py
+    logging.info('Start loading spooled items')
+    SpoolLoader.from_settings(get_project_settings()).load()
+
     # Log completion of web scraping phase
     logging.info('End web scraping')
 
@@ -45,37 +58,24 @@ def run_data_pipeline():
     # Log the start of data processing
     logging.info('Start data processing')
     
-    # Run initial transformations script
-    # This script connects to MongoDB, retrieves data, and performs basic transformations
-    # such as exploding images and extracting features from apartment characteristics
-    subprocess.run(['python3.11', 'ETL/01_initial_transformations.py'])
-    
-    # Run data correction script
-    # This script performs geographical data correction and enrichment
-    # including adding/correcting locality and neighborhood information
-    subprocess.run(['python3.11', 'ETL/02_data_correction.py'])
-    
-    # Run data enrichment script
-    # This script adds additional information like nearby TransMilenio stations 
-    # and parks, with calculated distances
-    subprocess.run(['python3.11', 'ETL/03_data_enrichment.py'])
-    
+    # Run the ETL stages in this process (see ETL/data_pipeline.py):
+    # initial transformations, data correction, data enrichment and data saving.
+    # The stages pass the data in memory and share one MongoDB connection,
+    # and the first error stops the pipeline
+    run_pipeline()
+
     # Log completion of data processing phase
     logging.info('End data processing')
 
-    # ---- DATA SAVING PHASE ----
-    # Log the start of data saving process
-    logging.info('Start data saving')
-    # Run the data saving script which stores processed data back to MongoDB
-    # in the processed collection
-    subprocess.run(['python3.11', 'ETL/04_data_save.py'])
-    # Log completion of data saving phase
-    logging.info('End data saving')
-
     # Log the pipeline end time to track total execution duration
     logging.info(f'End data pipeline at {datetime.now()}')
 
 # Standard Python idiom to allow the file to be imported or run directly
 if __name__ == '__main__':
     # Execute the data pipeline when this script is run directly
-    run_data_pipeline()
\ No newline at end of file
+    # and exit with an error code if any step fails
+    try:
+        run_data_pipeline()
+    except Exception:
+        logging.exception('Data pipeline failed')
+        sys.exit(1)